@@ -0,0 +1,232 @@
+"""
+Streaming bulk import of books from CSV, JSON or JSON Lines.
+
+Files are read in fixed-size chunks and parsed one record at a time, so memory
+use depends on the batch size, not on the file size:
+
+- CSV needs a header row naming the ``title``, ``author`` and
+  ``publication_year`` columns.
+- JSON is an array of objects with those keys; it is decoded object by object
+  from a sliding buffer rather than loaded whole.
+- JSON Lines has one object per line.
+
+Records are validated and inserted in batches of ``BATCH_SIZE`` with one
+``bulk_create`` (and one transaction) per batch. Invalid records are skipped
+and counted; the first ``MAX_REPORTED_ERRORS`` are reported with their record
+number. Used by the ``import_books`` command.
+"""
+
+import codecs
+import csv
+import io
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Book
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+# A single JSON record larger than this is treated as a malformed file
+# rather than buffered indefinitely.
+MAX_RECORD_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+FIELDS = ('title', 'author', 'publication_year')
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+class ImportFormatError(Exception):
+    """The file cannot be parsed in the requested format."""
+
+
+def detect_format(file_name):
+    """Guess the format from a file name, defaulting to CSV."""
+    ext = os.path.splitext(file_name or '')[1].lower()
+    if ext == '.json':
+        return 'json'
+    if ext in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        missing = set(FIELDS) - set(reader.fieldnames or ())
+        if missing:
+            raise ImportFormatError(f'CSV header is missing: {", ".join(sorted(missing))}')
+        yield from reader
+    except csv.Error as e:
+        raise ImportFormatError(f'CSV error on line {reader.line_num}: {e}')
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+
+def _iter_text_chunks(fileobj):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(chunk)
+
+
+def iter_json(fileobj):
+    """Yield the objects of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    chunks = _iter_text_chunks(fileobj)
+    buffer = ''
+    pos = 0
+    count = 0
+    started = False
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        # Skip whitespace and separators up to the next value
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n' + (',' if started else ''):
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            fill()
+        if pos >= len(buffer):
+            raise ImportFormatError('Unexpected end of JSON file')
+        if not started:
+            if buffer[pos] != '[':
+                raise ImportFormatError('JSON file must contain an array of objects')
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                # Possibly a record split across chunks: read more and retry
+                if eof or len(buffer) - pos > MAX_RECORD_BYTES:
+                    raise ImportFormatError(f'Malformed JSON after record {count}')
+                fill()
+        pos = end
+        count += 1
+        yield record
+
+
+def iter_jsonl(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig')
+    try:
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # Reported per record, like a validation error
+                yield e
+    finally:
+        text.detach()
+
+
+READERS = {'csv': iter_csv, 'json': iter_json, 'jsonl': iter_jsonl}
+
+
+def build_book(record):
+    """Return a validated, unsaved Book for one record, or raise ValidationError."""
+    if isinstance(record, Exception):
+        raise ValidationError(f'Invalid JSON: {record}')
+    if not isinstance(record, dict):
+        raise ValidationError('Record is not an object')
+    book = Book(**{
+        field: (str(record.get(field) or '').strip()) for field in FIELDS
+    })
+    book.full_clean(validate_unique=False)
+    return book
+
+
+class ImportResult:
+    """Running counts of an import, updated after every batch."""
+
+    def __init__(self):
+        self.records = 0
+        self.created = 0
+        self.invalid = 0
+        self.errors = []
+
+    def add_error(self, number, error):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            if isinstance(error, ValidationError) and hasattr(error, 'message_dict'):
+                message = '; '.join(f'{field}: {" ".join(messages)}'
+                                    for field, messages in error.message_dict.items())
+            else:
+                message = ' '.join(getattr(error, 'messages', [str(error)]))
+            self.errors.append({'record': number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'records': self.records,
+            'created': self.created,
+            'invalid': self.invalid,
+            'errors': self.errors,
+        }
+
+
+def _insert(batch, result):
+    with transaction.atomic():
+        Book.objects.bulk_create(batch)
+    result.created += len(batch)
+
+
+def import_books(fileobj, file_format, batch_size=BATCH_SIZE):
+    """
+    Import books from an open binary file, yielding progress after each batch.
+
+    Args:
+        fileobj: Binary file object (a local file or an uploaded file).
+        file_format (str): One of ``FORMATS``.
+        batch_size (int): Records validated and inserted together.
+
+    Yields:
+        ImportResult: The running totals, after each batch and once at the end.
+
+    Raises:
+        ImportFormatError: The file cannot be parsed; batches already yielded
+            are kept.
+    """
+    result = ImportResult()
+    batch = []
+    try:
+        for number, record in enumerate(READERS[file_format](fileobj), start=1):
+            result.records = number
+            try:
+                batch.append(build_book(record))
+            except ValidationError as e:
+                result.add_error(number, e)
+            if number % batch_size == 0:
+                if batch:
+                    _insert(batch, result)
+                    batch = []
+                yield result
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f'File is not UTF-8 encoded: {e.reason}')
+    if batch:
+        _insert(batch, result)
+    yield result
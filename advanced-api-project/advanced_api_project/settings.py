@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.PrimaryPinningMiddleware',
+    'api.middleware.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'advanced_api_project.urls'
@@ -83,6 +86,35 @@ DATABASES = {
     }
 }
 
+# Read replicas: DJANGO_DB_REPLICAS is a comma-separated list of SQLite files
+# (e.g. "replica1.sqlite3,replica2.sqlite3") that are kept in sync with the
+# primary. Reads from views decorated with api.routers.read_from_replica are
+# spread across them; writes always go to 'default'. Test runs mirror the
+# replicas onto the test database.
+REPLICA_DATABASES = []
+for _index, _name in enumerate(
+    filter(None, (name.strip() for name in os.environ.get('DJANGO_DB_REPLICAS', '').split(','))),
+    start=1,
+):
+    DATABASES[f'replica{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / _name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica{_index}')
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# Seconds a client's reads stay on the primary after it makes a write request.
+REPLICA_PIN_SECONDS = 10
+
+
+# Sessions
+# DJANGO_SESSION_ENGINE selects where sessions live: 'db' (default), 'cache',
+# 'cached_db' or 'signed_cookies'. 'cache' and 'signed_cookies' keep session
+# reads and writes off the database; the cache modes need a shared cache.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'db')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -120,6 +152,26 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Caches
+# Throttle buckets must live in a cache shared by all worker processes. Set
+# DJANGO_REDIS_URL (e.g. redis://127.0.0.1:6379/1) to use Redis; the local-memory
+# fallback is only shared within a single process.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+THROTTLE_CACHE_ALIAS = 'default'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -136,5 +188,21 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
-    ]
+    ],
+    # Token-bucket throttles (see api/throttling.py). "N/period" means a burst
+    # of N requests refilled at N per period.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonTokenBucketThrottle',
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.ScopedTokenBucketThrottle',
+        'api.throttling.QueryCostThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '300/min',
+        'user': '1200/min',
+        'books_read': '600/min',
+        'books_write': '60/min',
+        # Budget for search/filter parameters, weighted by throttle_query_costs
+        'query_cost': '120/min',
+    },
 }
\ No newline at end of file
@@ -0,0 +1,321 @@
+"""
+Async variants of the book endpoints.
+
+The generic views in ``api.views`` are synchronous. Under WSGI every
+in-flight request holds a server thread for its whole lifetime, including
+the time spent waiting on a slow client, and under ASGI each one is handed to
+a worker thread. The views in this module are ``async def``: they only hop
+to a thread for synchronous DRF code and otherwise use the async ORM (``aget()``), so one worker process under an ASGI server
+(``uvicorn advanced_api_project.asgi:application``) can keep hundreds of
+slow requests in flight on a single event loop.
+
+They follow the contracts of the sync views:
+
+- ``AsyncBookListView``: the same filter backends (``BookFilter``,
+  ``search``, ``ordering``) and paginator as ``BookListView``, run together
+  in one ``sync_to_async`` call, so the results are identical
+- ``AsyncBookDetailView``: a single book, 404 if it does not exist
+- Both send the ETag from ``api.conditional`` (the detail view also sends
+  Last-Modified) and answer If-None-Match / If-Modified-Since with 304 and
+  If-Match / If-Unmodified-Since with 412, as the ``condition`` decorator
+  does on the sync views
+- ``AsyncBookCreateView``: authenticated users only; the book is validated
+  and saved by ``BookSerializer``
+
+DRF's ``APIView`` cannot run async handlers, so ``AsyncAPIView`` runs the
+``DEFAULT_AUTHENTICATION_CLASSES`` (session and HTTP Basic), the
+``IsAuthenticated`` check, the token-bucket throttles from
+``api.throttling`` and the conditional request checks itself. All of them
+are synchronous (they may query the database or the cache), so they share
+one ``sync_to_async`` call, as do DRF's filter backends, paginator and
+serializer validation in the handlers. Django's ``condition`` decorator is
+not used because it calls the ETag callables on the event loop.
+
+``python manage.py benchmark_async`` compares these views with the sync ones.
+"""
+
+import datetime
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+    ParseError,
+    Throttled,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .conditional import book_detail_etag, book_detail_last_modified, book_list_etag
+from .models import Book
+from .routers import read_from_replica
+from .serializers import BookSerializer
+from .views import BookListView
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of DRF's ``APIView`` for JSON endpoints.
+
+    Attributes:
+        authentication_classes (list): Authenticators tried in order, as on
+            ``APIView``.
+        authentication_required (bool): Reject anonymous users, as
+            ``IsAuthenticated`` does.
+        throttle_classes (list): Throttles applied to every request.
+        throttle_scope (str): Endpoint bucket for ``ScopedTokenBucketThrottle``.
+        throttle_query_costs (dict): Query parameter costs for
+            ``QueryCostThrottle``.
+        etag_func (callable): ETag callable for GET and HEAD requests, with
+            the signature used by Django's ``condition`` decorator.
+        last_modified_func (callable): Last-Modified callable for GET and
+            HEAD requests.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    authentication_required = False
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = None
+    throttle_query_costs = {}
+    etag_func = None
+    last_modified_func = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        """
+        Return the view exempt from ``CsrfViewMiddleware``, as ``APIView`` does.
+
+        ``SessionAuthentication`` enforces CSRF for session-authenticated
+        requests itself; clients using HTTP Basic need no token.
+        """
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Authenticate, throttle and check the preconditions, then run the handler.
+
+        API exceptions raised on the way are returned as JSON error responses,
+        as DRF's exception handler does.
+        """
+        self.authenticators = [auth() for auth in self.authentication_classes]
+        try:
+            response, etag, last_modified = await sync_to_async(self.initial)(request, *args, **kwargs)
+            if response is None:
+                response = await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+        if request.method in ('GET', 'HEAD'):
+            # As in django.views.decorators.http.condition
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Run everything that precedes the handler, in one thread hop.
+
+        Returns:
+            tuple: The 304/412 response (or None if the handler should run),
+            the ETag and the Last-Modified timestamp.
+
+        Raises:
+            AuthenticationFailed: The credentials are invalid.
+            NotAuthenticated: Authentication is required and none was given.
+            Throttled: At least one bucket is empty.
+        """
+        drf_request = Request(request, authenticators=self.authenticators)
+        request.user, request.auth = drf_request.user, drf_request.auth
+        if self.authentication_required and not request.user.is_authenticated:
+            raise NotAuthenticated()
+        self.check_throttles(drf_request)
+        if request.method not in ('GET', 'HEAD'):
+            return None, None, None
+        return self.check_preconditions(request, *args, **kwargs)
+
+    def check_preconditions(self, request, *args, **kwargs):
+        """
+        Evaluate the conditional request headers against ``etag_func`` and
+        ``last_modified_func``, as Django's ``condition`` decorator does.
+
+        Returns:
+            tuple: The 304/412 response or None, the quoted ETag or None and
+            the Last-Modified timestamp or None.
+        """
+        etag = self.etag_func(request, *args, **kwargs) if self.etag_func else None
+        etag = quote_etag(etag) if etag is not None else None
+        last_modified = self.last_modified_func(request, *args, **kwargs) if self.last_modified_func else None
+        if last_modified:
+            if not timezone.is_aware(last_modified):
+                last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+            last_modified = int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        return response, etag, last_modified
+
+    def check_throttles(self, drf_request):
+        """
+        Run the throttles against the authenticated DRF request.
+
+        Raises:
+            Throttled: At least one bucket is empty.
+        """
+        durations = [
+            throttle.wait()
+            for throttle in (throttle_class() for throttle_class in self.throttle_classes)
+            if not throttle.allow_request(drf_request, self)
+        ]
+        if durations:
+            known = [duration for duration in durations if duration is not None]
+            raise Throttled(max(known, default=None))
+
+    def handle_exception(self, request, exc):
+        """Return the JSON error response for an API exception."""
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+        status = exc.status_code
+        auth_header = None
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            # As in APIView: 401 with a challenge from the first
+            # authenticator, or 403 if it has none (session authentication)
+            if self.authenticators:
+                auth_header = self.authenticators[0].authenticate_header(Request(request))
+            if not auth_header:
+                status = 403
+        response = self.json_response(data, status=status)
+        if auth_header:
+            response['WWW-Authenticate'] = auth_header
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = '%d' % exc.wait
+        return response
+
+    def json_response(self, data, status=200):
+        """Render ``data`` with DRF's JSON renderer."""
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+    def parse_body(self, request):
+        """
+        Return the request data from a JSON or form-encoded body.
+
+        Raises:
+            ParseError: The JSON body is malformed.
+        """
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError as exc:
+                raise ParseError(f'JSON parse error - {exc}')
+        return request.POST
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class AsyncBookListView(AsyncAPIView):
+    """
+    Async list of books with filtering, searching, ordering and pagination.
+
+    Uses ``BookListView``'s filter backends, filterset and paginator, so it
+    accepts the same query parameters (including quoted search terms and
+    ``page=last``) and returns the same paginated response. Reads are served
+    by a replica when one is configured.
+    """
+    queryset = BookListView.queryset
+    filter_backends = BookListView.filter_backends
+    filterset_class = BookListView.filterset_class
+    search_fields = BookListView.search_fields
+    ordering_fields = BookListView.ordering_fields
+    ordering = BookListView.ordering
+    pagination_class = BookListView.pagination_class
+    throttle_scope = 'books_read'
+    throttle_query_costs = BookListView.throttle_query_costs
+    etag_func = staticmethod(book_list_etag)
+
+    async def get(self, request):
+        """
+        Return one page of books.
+
+        Raises:
+            NotFound: The requested page does not exist.
+            ValidationError: A filter value is invalid.
+        """
+        return self.json_response(await sync_to_async(self.list)(request))
+
+    def list(self, request):
+        """
+        Filter, paginate and serialize the books, as ``ListAPIView.list`` does.
+
+        The backends and paginator are synchronous (the filterset validates
+        the ``author`` choice against the database), so this runs in one
+        thread hop.
+
+        Returns:
+            dict: The paginated response data.
+        """
+        drf_request = Request(request)
+        queryset = self.queryset.all()
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(drf_request, queryset, self)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, drf_request, view=self)
+        return paginator.get_paginated_response(BookSerializer(page, many=True).data).data
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class AsyncBookDetailView(AsyncAPIView):
+    """
+    Async retrieval of a single book by ID.
+
+    Reads are served by a replica when one is configured.
+    """
+    throttle_scope = 'books_read'
+    etag_func = staticmethod(book_detail_etag)
+    last_modified_func = staticmethod(book_detail_last_modified)
+
+    async def get(self, request, pk):
+        """
+        Return the book.
+
+        Raises:
+            NotFound: No book has this primary key.
+        """
+        try:
+            book = await Book.objects.aget(pk=pk)
+        except Book.DoesNotExist:
+            raise NotFound('No Book matches the given query.')
+        return self.json_response(BookSerializer(book).data)
+
+
+class AsyncBookCreateView(AsyncAPIView):
+    """
+    Async creation of a book; requires authentication.
+    """
+    authentication_required = True
+    throttle_scope = 'books_write'
+
+    async def post(self, request):
+        """
+        Validate and save a new book.
+
+        Returns:
+            HttpResponse: The new book with status 201, or the validation
+            errors with status 400.
+        """
+        serializer = BookSerializer(data=self.parse_body(request))
+        await sync_to_async(self.perform_create)(serializer)
+        return self.json_response(serializer.data, status=201)
+
+    def perform_create(self, serializer):
+        """Validate and save the book in one thread hop."""
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
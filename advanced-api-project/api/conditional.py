@@ -0,0 +1,96 @@
+"""
+Conditional request support for the API application.
+
+This module provides the ETag and Last-Modified callables used with Django's
+``condition`` decorator on the book endpoints. The values are derived from the
+``updated_at`` column of the Book model, so a conditional GET can be answered
+with 304 Not Modified before any serialization takes place:
+
+- Detail endpoints use a per-row stamp (primary key + ``updated_at``) and send
+  both ETag and Last-Modified
+- List endpoints use a collection-level stamp (row count + latest ``updated_at``)
+  combined with the full request path, so every filter/search/page combination
+  gets its own ETag. They send no Last-Modified: deleting a book does not move
+  the latest ``updated_at``, so an If-Modified-Since check would keep
+  answering 304 with a list that still contains the deleted book
+
+The ``Accept`` header is part of every ETag because DRF negotiates the
+response format (JSON or the browsable API) from it.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+
+from .models import Book
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the given parts.
+
+    Args:
+        *parts: Values identifying a specific version of a resource.
+
+    Returns:
+        str: A quoted, strong ETag.
+    """
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8'))
+    return '"%s"' % digest.hexdigest()
+
+
+def book_collection_stamp(request):
+    """
+    Return the collection-level version stamp for the Book table.
+
+    The stamp is a ``(count, latest_updated_at)`` tuple computed with a single
+    aggregate query and memoized on the request. Any insert, update or delete
+    changes at least one of the two values.
+    """
+    if not hasattr(request, '_book_collection_stamp'):
+        stamp = Book.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        request._book_collection_stamp = (stamp['count'], stamp['latest'])
+    return request._book_collection_stamp
+
+
+def _book_updated_at(request, pk):
+    """
+    Return the ``updated_at`` value of a book, or None if it does not exist.
+
+    The value is memoized on the request so the ETag and Last-Modified
+    callables share a single query.
+    """
+    cache = request.__dict__.setdefault('_book_updated_at', {})
+    if pk not in cache:
+        cache[pk] = Book.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return cache[pk]
+
+
+def book_etag(request, pk, updated_at):
+    """Return the ETag of a book's representation at ``updated_at``."""
+    return make_etag('book', pk, updated_at.isoformat(), request.META.get('HTTP_ACCEPT', ''))
+
+
+def book_detail_etag(request, pk, *args, **kwargs):
+    """ETag callable for a single book; returns None if the book does not exist."""
+    updated_at = _book_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return book_etag(request, pk, updated_at)
+
+
+def book_detail_last_modified(request, pk, *args, **kwargs):
+    """Last-Modified callable for a single book."""
+    return _book_updated_at(request, pk)
+
+
+def book_list_etag(request, *args, **kwargs):
+    """ETag callable for the book list endpoints."""
+    count, latest = book_collection_stamp(request)
+    return make_etag(
+        'books',
+        count,
+        latest.isoformat() if latest else '',
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    )
@@ -0,0 +1,178 @@
+import asyncio
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from api.models import Author, Book
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    """
+    Compare the sync and async book endpoints under many slow clients.
+
+    Every client connects at the same moment, sends one GET and then takes
+    ``--latency`` seconds to receive the response, as a client on a slow
+    network would. The requests run in-process against the configured
+    database, through:
+
+    - ``wsgi``: Django's WSGI handler on a pool of ``--threads`` threads, as
+      under a threaded WSGI server (thread per request, held until the slow
+      client has the whole response)
+    - ``asgi``: Django's ASGI handler on one event loop, for both the sync
+      view and its async variant in ``api.async_views``
+
+    Throttling is disabled for the run.
+    """
+    help = 'Benchmark the sync (WSGI) and async (ASGI) book endpoints with many simultaneous slow clients.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500,
+                            help='Simultaneous clients, one request each (default: 500).')
+        parser.add_argument('--latency', type=float, default=0.2,
+                            help='Seconds each client takes to receive its response (default: 0.2).')
+        parser.add_argument('--threads', type=int, default=32,
+                            help='WSGI server threads (default: 32).')
+        parser.add_argument('--sync-path', default='/api/books/list/',
+                            help='Sync endpoint (default: /api/books/list/).')
+        parser.add_argument('--async-path', default='/api/async/books/list/',
+                            help='Async endpoint (default: /api/async/books/list/).')
+        parser.add_argument('--host', default='localhost',
+                            help='Host header; must be allowed by ALLOWED_HOSTS (default: localhost).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Create books until the database holds at least this many.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+        rest_framework = copy.deepcopy(getattr(settings, 'REST_FRAMEWORK', {}))
+        rest_framework['DEFAULT_THROTTLE_RATES'] = {}
+        runs = [
+            ('wsgi', 'sync', options['sync_path'], self.run_wsgi),
+            ('asgi', 'sync', options['sync_path'], self.run_asgi),
+            ('asgi', 'async', options['async_path'], self.run_asgi),
+        ]
+        self.stdout.write(
+            f"{options['clients']} clients, {options['latency']:.3f}s client latency, "
+            f"{options['threads']} WSGI threads"
+        )
+        self.stdout.write(f"{'server':<8}{'view':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'errors':>8}")
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            for server, view, path, run in runs:
+                elapsed, timings, statuses = run(path, options)
+                errors = sum(1 for status in statuses if status != 200)
+                self.stdout.write(
+                    f'{server:<8}{view:<7}{len(timings) / elapsed:>9.1f}'
+                    f'{percentile(timings, 0.5) * 1000:>9.1f}{percentile(timings, 0.95) * 1000:>9.1f}'
+                    f'{max(timings) * 1000:>9.1f}{errors:>8}'
+                )
+
+    def seed(self, count):
+        missing = count - Book.objects.count()
+        if missing > 0:
+            author, _ = Author.objects.get_or_create(name='Benchmark Author')
+            Book.objects.bulk_create(
+                [Book(title=f'Benchmark Book {i}', publication_year=2000, author=author) for i in range(missing)],
+                batch_size=1000,
+            )
+            self.stdout.write(f'Created {missing} book(s).')
+
+    def run_wsgi(self, path, options):
+        handler = WSGIHandler()
+        path_info, _, query_string = path.partition('?')
+
+        def client(connected_at):
+            status = []
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'SCRIPT_NAME': '',
+                'PATH_INFO': path_info,
+                'QUERY_STRING': query_string,
+                'SERVER_NAME': options['host'],
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': options['host'],
+                'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': BytesIO(),
+                'wsgi.errors': self.stderr,
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            response = handler(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+            try:
+                for _ in response:
+                    pass
+                # The thread is busy writing to the slow client
+                time.sleep(options['latency'])
+            finally:
+                response.close()
+            return time.perf_counter() - connected_at, int(status[0].split()[0])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(client, [start] * options['clients']))
+        return time.perf_counter() - start, [r[0] for r in results], [r[1] for r in results]
+
+    def run_asgi(self, path, options):
+        handler = ASGIHandler()
+        path_info, _, query_string = path.partition('?')
+
+        async def client(connected_at):
+            status = []
+            request_sent = False
+            finished = asyncio.Event()
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif not message.get('more_body'):
+                    # The slow client reads the response; nothing else waits
+                    await asyncio.sleep(options['latency'])
+
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path_info,
+                'raw_path': path_info.encode(),
+                'query_string': query_string.encode(),
+                'root_path': '',
+                'headers': [(b'host', options['host'].encode())],
+                'client': ('127.0.0.1', 0),
+                'server': (options['host'], 80),
+            }
+            await handler(scope, receive, send)
+            finished.set()
+            return time.perf_counter() - connected_at, status[0]
+
+        async def main():
+            start = time.perf_counter()
+            results = await asyncio.gather(*(client(start) for _ in range(options['clients'])))
+            return time.perf_counter() - start, results
+
+        elapsed, results = asyncio.run(main())
+        return elapsed, [r[0] for r in results], [r[1] for r in results]
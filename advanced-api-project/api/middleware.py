@@ -0,0 +1,85 @@
+"""
+Middleware for the API application.
+
+Both classes only post-process responses and do no I/O, so they are sync-
+and async-capable: under ASGI, requests for the async views in
+``api.async_views`` pass through them without switching to a thread.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .routers import PIN_COOKIE_NAME
+
+
+class ResponseMiddleware:
+    """
+    Base class for middleware that only implements ``process_response()``.
+
+    It runs natively in both sync (WSGI) and async (ASGI) middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        raise NotImplementedError('.process_response() must be overridden')
+
+
+class PrimaryPinningMiddleware(ResponseMiddleware):
+    """
+    Pin a client's reads to the primary database for a short time after a write.
+
+    Any non-GET/HEAD request sets a cookie that lasts ``REPLICA_PIN_SECONDS``.
+    ``read_from_replica`` views skip the replicas while it is present.
+    """
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class RateLimitHeadersMiddleware(ResponseMiddleware):
+    """
+    Add ``X-RateLimit-*`` headers describing the most restrictive throttle.
+
+    The token-bucket throttles in api.throttling record their state on the
+    request. When several buckets apply, the one with the smallest share of
+    tokens left is reported:
+
+    - ``X-RateLimit-Limit``: bucket capacity
+    - ``X-RateLimit-Remaining``: whole tokens left after this request
+    - ``X-RateLimit-Reset``: seconds until the bucket is full again
+    - ``X-RateLimit-Scope``: which bucket the numbers refer to
+
+    Throttled responses also carry ``Retry-After``, which DRF sets.
+    """
+
+    def process_response(self, request, response):
+        limits = getattr(request, 'rate_limits', None)
+        if limits:
+            tightest = min(limits, key=lambda info: info['remaining'] / info['limit'])
+            response['X-RateLimit-Limit'] = str(tightest['limit'])
+            response['X-RateLimit-Remaining'] = str(tightest['remaining'])
+            response['X-RateLimit-Reset'] = str(tightest['reset'])
+            response['X-RateLimit-Scope'] = tightest['scope']
+        return response
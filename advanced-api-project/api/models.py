@@ -17,8 +17,10 @@ class Author(models.Model):
     
     Attributes:
         name (str): The name of the author, limited to 100 characters.
+            Indexed for the default ordering and the admin's prefix
+            search and autocomplete.
     """
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     
     def __str__(self):
         """String representation of the Author model."""
@@ -35,8 +37,14 @@ class Book(models.Model):
     
     Attributes:
         title (str): The title of the book, limited to 200 characters.
+            Indexed for the default ordering and the admin's prefix search.
         publication_year (int): The year the book was published.
         author (Author): ForeignKey relationship to the Author model.
+        updated_at (datetime): When the book was last modified. Used as the
+            per-row version for ETag/Last-Modified conditional requests.
+        version (int): Incremented by every save through
+            ``api.concurrency.save_versioned``; updates are applied only if
+            the row is still at the version the client edited.
         
     The relationship between Author and Book is a one-to-many relationship:
     - One Author can have many Books
@@ -44,9 +52,11 @@ class Book(models.Model):
     - This is implemented using a ForeignKey from Book to Author
     - The related_name='books' allows for reverse lookups (author.books.all())
     """
-    title = models.CharField(max_length=200)
+    title = models.CharField(max_length=200, db_index=True)
     publication_year = models.IntegerField()
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
     
     def __str__(self):
         """String representation of the Book model."""
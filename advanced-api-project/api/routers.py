@@ -0,0 +1,105 @@
+"""
+Database routing for the API application.
+
+This module sends the queries of selected read-only views to read replicas:
+
+- Views opt in with the ``read_from_replica`` decorator. Only GET/HEAD
+  requests are routed, and everything else (including any write issued while
+  handling a GET) uses the ``default`` primary database.
+- ``ReplicaRouter`` picks one of ``settings.REPLICA_DATABASES`` at random for
+  reads made inside an opted-in view, and returns None (the primary) otherwise.
+- ``api.middleware.PrimaryPinningMiddleware`` sets a short-lived cookie after
+  every write request. While it is present, the client's reads stay on the
+  primary, so users always read their own writes despite replication lag.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE_NAME = 'primary_db_pin'
+
+_replica_reads = ContextVar('api_replica_reads', default=False)
+
+
+def replica_aliases():
+    """Return the configured replica database aliases."""
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+def is_pinned_to_primary(request):
+    """Return True if the client recently wrote and must read from the primary."""
+    return PIN_COOKIE_NAME in request.COOKIES
+
+
+@contextmanager
+def replica_reads():
+    """Route reads made inside the block to a replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_from_replica(view_func):
+    """
+    Decorator for read-only views whose queries may be served by a replica.
+
+    Template responses are rendered inside the replica scope so that queries
+    made lazily by templates are routed as well. Async views are supported:
+    the async ORM runs queries with the caller's context, so they are routed
+    the same way.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or is_pinned_to_primary(request):
+                return await view_func(request, *args, **kwargs)
+            with replica_reads():
+                return await view_func(request, *args, **kwargs)
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or is_pinned_to_primary(request):
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            response = view_func(request, *args, **kwargs)
+            if not getattr(response, 'is_rendered', True):
+                response.render()
+        return response
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    """
+    Router that splits reads between the primary and its replicas.
+
+    Replicas hold the same data as ``default``, so relations between objects
+    loaded from any of them are allowed, and migrations are left to Django's
+    default behaviour.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Use a random replica inside ``replica_reads()``, else the primary."""
+        if _replica_reads.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        """Always write to the primary."""
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects from the primary and its replicas."""
+        databases = {'default', *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
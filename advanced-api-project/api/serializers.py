@@ -22,12 +22,15 @@ class BookSerializer(serializers.ModelSerializer):
     It includes custom validation to ensure the publication year is not in the future.
     
     Fields:
-        All fields from the Book model (title, publication_year, author)
+        All fields from the Book model (title, publication_year, author).
+        ``version`` is read-only; clients send it back (or use If-Match) to
+        update the version they edited.
     """
     
     class Meta:
         model = Book
         fields = '__all__'
+        read_only_fields = ['version']
     
     def validate_publication_year(self, value):
         """
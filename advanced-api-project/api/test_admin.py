@@ -0,0 +1,133 @@
+"""
+Query-budget tests for the API admin changelists.
+
+The Book changelist is loaded with 100,000 books to check that the number of
+queries per page does not grow with the table and that the author column,
+filter and form field never load every author.
+"""
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .admin import EstimatedCountPaginator
+from .models import Author, Book
+
+BOOK_COUNT = 100000
+AUTHOR_COUNT = 1000
+
+# Session, user, paginated count, page of books (authors joined) and the
+# publication_year filter choices.
+CHANGELIST_QUERY_BUDGET = 5
+
+
+class BookAdminQueryBudgetTest(TestCase):
+    """Test cases for the Book admin changelist on a large table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create 1,000 authors and 100,000 books."""
+        authors = Author.objects.bulk_create(
+            [Author(name=f'Author {i:04d}') for i in range(AUTHOR_COUNT)]
+        )
+        Book.objects.bulk_create(
+            (
+                Book(
+                    title=f'Book {i:06d}',
+                    publication_year=1900 + i % 120,
+                    author=authors[i % AUTHOR_COUNT],
+                )
+                for i in range(BOOK_COUNT)
+            ),
+            batch_size=5000,
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        """Log in as a superuser."""
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:api_book_changelist')
+
+    def get_with_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response, ctx.captured_queries
+
+    def test_changelist_query_budget(self):
+        """The changelist page stays within a fixed number of queries."""
+        response, queries = self.get_with_queries(self.url)
+        self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+        self.assertEqual(response.context['cl'].result_count, BOOK_COUNT)
+        # No query fetches authors on their own, and none loads all of them.
+        self.assertFalse(any(q['sql'].startswith('SELECT "api_author"') for q in queries))
+
+    def test_changelist_skips_full_result_count(self):
+        """Filtered changelists do not run a second, unfiltered COUNT."""
+        response, queries = self.get_with_queries(self.url, {'author_name': 'Author 0007'})
+        self.assertEqual(response.context['cl'].result_count, BOOK_COUNT // AUTHOR_COUNT)
+        self.assertIsNone(response.context['cl'].full_result_count)
+        self.assertEqual(sum('COUNT(' in q['sql'] for q in queries), 1)
+        self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+
+    def test_search_query_budget(self):
+        """Searching by title or author name stays within the budget."""
+        response, queries = self.get_with_queries(self.url, {'q': '"Author 0042"'})
+        self.assertEqual(response.context['cl'].result_count, BOOK_COUNT // AUTHOR_COUNT)
+        self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+
+    def test_search_is_a_prefix_match(self):
+        """Search terms only match at the start, so the indexes can be used."""
+        response, queries = self.get_with_queries(self.url, {'q': '"Book 00001"'})
+        self.assertEqual(response.context['cl'].result_count, 10)
+        self.assertFalse(any("'%Book" in q['sql'] for q in queries))
+        response, _ = self.get_with_queries(self.url, {'q': '00001'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_estimated_count_replaces_count_query(self):
+        """Unfiltered changelists use the table estimate when it is large."""
+        with mock.patch('api.admin.estimated_row_count', return_value=BOOK_COUNT + 1):
+            response, queries = self.get_with_queries(self.url)
+        self.assertEqual(response.context['cl'].result_count, BOOK_COUNT + 1)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries))
+
+    def test_estimated_count_ignored_below_threshold(self):
+        """Small tables are counted exactly."""
+        paginator = EstimatedCountPaginator(Book.objects.all(), 100)
+        with mock.patch('api.admin.estimated_row_count', return_value=10):
+            self.assertEqual(paginator.count, BOOK_COUNT)
+
+    def test_author_autocomplete(self):
+        """The author form field is an autocomplete widget, not a full select."""
+        book = Book.objects.first()
+        response, queries = self.get_with_queries(reverse('admin:api_book_change', args=[book.pk]))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertLess(response.content.count(b'<option'), 10)
+
+
+class BookAdminVersionTest(TestCase):
+    """Test cases for optimistic-concurrency versions in the Book admin."""
+    
+    def setUp(self):
+        """Set up a superuser and a book."""
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.force_login(self.admin_user)
+        self.author = Author.objects.create(name="Test Author")
+        self.book = Book.objects.create(title="Test Book", publication_year=2020, author=self.author)
+    
+    def test_admin_save_increments_version(self):
+        """Test that the version is read-only and bumped by every admin save."""
+        url = reverse('admin:api_book_change', args=[self.book.pk])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'name="version"')
+        data = {'title': 'Edited', 'publication_year': 2020, 'author': self.author.pk, 'version': 1}
+        for expected in (2, 3):
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, 302)
+            self.book.refresh_from_db()
+            self.assertEqual(self.book.version, expected)
+        self.assertEqual(self.book.title, 'Edited')
@@ -0,0 +1,230 @@
+"""
+Tests for the async book views.
+
+These tests run the views through Django's async test client and check that
+they return the same data as the sync generic views they mirror.
+"""
+
+import base64
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authentication import BasicAuthentication
+from .async_views import AsyncBookCreateView
+from .models import Author, Book
+from .test_throttling import rest_framework_with_rates
+
+
+class AsyncBookViewsTest(TestCase):
+    """Test cases for the async book list/detail/create views."""
+
+    def setUp(self):
+        """Set up test data and empty throttle buckets."""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.author = Author.objects.create(name="Test Author")
+        self.author2 = Author.objects.create(name="Another Author")
+        self.book = Book.objects.create(
+            title="Test Book",
+            publication_year=2023,
+            author=self.author
+        )
+        Book.objects.bulk_create([
+            Book(title=f"Book {i:02d}", publication_year=2000 + i, author=self.author2)
+            for i in range(12)
+        ])
+
+    async def assert_same_as_sync(self, sync_name, async_name, params=None, **kwargs):
+        """Assert that the async view returns what its sync counterpart returns."""
+        sync_response = await self.async_client.get(reverse(sync_name, kwargs=kwargs), params or {})
+        async_response = await self.async_client.get(reverse(async_name, kwargs=kwargs), params or {})
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        sync_data = sync_response.json()
+        async_data = async_response.json()
+        for key in ('next', 'previous'):
+            if isinstance(sync_data, dict) and sync_data.get(key):
+                sync_data[key] = sync_data[key].replace('/api/books/list/', '/api/async/books/list/')
+        self.assertEqual(async_data, sync_data)
+        return async_response
+
+    async def test_list_matches_sync_view(self):
+        """Test that pagination matches BookListView."""
+        response = await self.assert_same_as_sync('book-list-view', 'async-book-list-view')
+        data = response.json()
+        self.assertEqual(data['count'], 13)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+        await self.assert_same_as_sync('book-list-view', 'async-book-list-view', {'page': 2})
+
+    async def test_list_filtering_searching_and_ordering_match_sync_view(self):
+        """Test that filters, search and ordering match BookListView."""
+        for params in (
+            {'author': self.author.pk},
+            {'author_name': 'another', 'ordering': '-publication_year'},
+            {'publication_year_min': 2005, 'publication_year_max': 2008},
+            {'search': 'book 0'},
+            {'search': '"book 0"'},
+            {'page': 'last'},
+            {'ordering': 'publication_year,unknown'},
+        ):
+            with self.subTest(params=params):
+                await self.assert_same_as_sync('book-list-view', 'async-book-list-view', params)
+
+    async def test_list_invalid_filter_and_page(self):
+        """Test that invalid filters return 400 and missing pages 404."""
+        url = reverse('async-book-list-view')
+        response = await self.async_client.get(url, {'author': 9999})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('author', response.json())
+        response = await self.async_client.get(url, {'page': 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_detail_matches_sync_view(self):
+        """Test that the detail view matches BookDetailView, including 404s."""
+        await self.assert_same_as_sync('book-detail-view', 'async-book-detail-view', pk=self.book.pk)
+        await self.assert_same_as_sync('book-detail-view', 'async-book-detail-view', pk=9999)
+
+    async def test_create_unauthenticated(self):
+        """Test that anonymous users cannot create books."""
+        response = await self.async_client.post(
+            reverse('async-book-create-view'),
+            {'title': 'New Book', 'publication_year': 2020, 'author': self.author.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(await Book.objects.filter(title='New Book').aexists())
+
+    async def test_create_authenticated(self):
+        """Test that authenticated users can create books."""
+        await self.async_client.alogin(username='testuser', password='testpass123')
+        response = await self.async_client.post(
+            reverse('async-book-create-view'),
+            {'title': 'New Book', 'publication_year': 2020, 'author': self.author.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['title'], 'New Book')
+        self.assertEqual(response.json()['version'], 1)
+        self.assertTrue(await Book.objects.filter(title='New Book', author=self.author).aexists())
+
+    async def test_create_invalid_data(self):
+        """Test that validation errors are returned with status 400."""
+        await self.async_client.alogin(username='testuser', password='testpass123')
+        response = await self.async_client.post(
+            reverse('async-book-create-view'),
+            {'title': 'Future Book', 'publication_year': 3000, 'author': self.author.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('publication_year', response.json())
+        response = await self.async_client.post(
+            reverse('async-book-create-view'), '{"title":', content_type='application/json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def basic_auth(self, username='testuser', password='testpass123'):
+        """Return the Authorization header for HTTP Basic credentials."""
+        credentials = base64.b64encode(f'{username}:{password}'.encode()).decode()
+        return {'Authorization': f'Basic {credentials}'}
+
+    async def test_create_with_basic_authentication(self):
+        """Test that the async views use DEFAULT_AUTHENTICATION_CLASSES, including HTTP Basic."""
+        url = reverse('async-book-create-view')
+        data = {'title': 'Basic Book', 'publication_year': 2020, 'author': self.author.pk}
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = await client.post(url, data, content_type='application/json', headers=self.basic_auth())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Book.objects.filter(title='Basic Book').aexists())
+
+        # Wrong credentials are rejected as by the sync view: 403, because the
+        # first authenticator (session) sends no WWW-Authenticate challenge
+        sync_response = await client.post(reverse('book-create-view'), data, content_type='application/json',
+                                          headers=self.basic_auth(password='wrong'))
+        response = await client.post(url, data, content_type='application/json',
+                                     headers=self.basic_auth(password='wrong'))
+        self.assertEqual(response.status_code, sync_response.status_code)
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual(await Book.objects.filter(title='Basic Book').acount(), 1)
+
+        with mock.patch.object(AsyncBookCreateView, 'authentication_classes', [BasicAuthentication]):
+            response = await client.post(url, data, content_type='application/json',
+                                         headers=self.basic_auth(password='wrong'))
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response['WWW-Authenticate'], 'Basic realm="api"')
+            response = await client.post(url, data, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_create_with_session_requires_csrf_token(self):
+        """Test that SessionAuthentication still enforces CSRF on the async views."""
+        client = AsyncClient(enforce_csrf_checks=True)
+        await client.alogin(username='testuser', password='testpass123')
+        response = await client.post(
+            reverse('async-book-create-view'),
+            {'title': 'New Book', 'publication_year': 2020, 'author': self.author.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('CSRF', response.json()['detail'])
+        self.assertFalse(await Book.objects.filter(title='New Book').aexists())
+
+    async def test_detail_conditional_requests_match_sync_view(self):
+        """Test that the async detail view sends the sync view's validators and honours them."""
+        sync_response = await self.async_client.get(reverse('book-detail-view', kwargs={'pk': self.book.pk}))
+        url = reverse('async-book-detail-view', kwargs={'pk': self.book.pk})
+        response = await self.async_client.get(url)
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        self.assertEqual(response['Last-Modified'], sync_response['Last-Modified'])
+
+        response = await self.async_client.get(url, headers={'If-None-Match': sync_response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+        response = await self.async_client.get(
+            url, headers={'If-Modified-Since': sync_response['Last-Modified']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = await self.async_client.get(url, headers={'If-Match': '"stale"'})
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        self.book.title = 'Renamed'
+        await self.book.asave()
+        response = await self.async_client.get(url, headers={'If-None-Match': sync_response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], sync_response['ETag'])
+
+        response = await self.async_client.get(
+            reverse('async-book-detail-view', kwargs={'pk': 9999}), headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+    async def test_list_conditional_requests(self):
+        """Test that the async list view answers If-None-Match until the books change."""
+        url = reverse('async-book-list-view')
+        etag = (await self.async_client.get(url))['ETag']
+        self.assertNotIn('Last-Modified', await self.async_client.get(url))
+        response = await self.async_client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = await self.async_client.get(url, {'search': 'Test'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        await Book.objects.filter(pk=self.book.pk).adelete()
+        response = await self.async_client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 12)
+
+    @override_settings(REST_FRAMEWORK=rest_framework_with_rates(anon='2/min'))
+    async def test_throttling(self):
+        """Test that the async views share the token-bucket throttles."""
+        url = reverse('async-book-detail-view', kwargs={'pk': self.book.pk})
+        self.assertEqual((await self.async_client.get(url)).status_code, status.HTTP_200_OK)
+        response = await self.async_client.get(url)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(response['X-RateLimit-Scope'], 'anon')
@@ -0,0 +1,113 @@
+"""
+Tests for read-replica routing.
+
+These tests cover the router, the read_from_replica decorator and the
+primary-pinning middleware without requiring extra databases.
+"""
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from .models import Author, Book
+from .routers import PIN_COOKIE_NAME, ReplicaRouter, read_from_replica, replica_reads
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'])
+class ReplicaRouterTest(TestCase):
+    """Test cases for the ReplicaRouter."""
+    
+    def setUp(self):
+        """Set up the router."""
+        self.router = ReplicaRouter()
+    
+    def test_reads_use_primary_outside_replica_scope(self):
+        """Test that reads default to the primary database."""
+        self.assertIsNone(self.router.db_for_read(Book))
+    
+    def test_reads_use_replica_inside_replica_scope(self):
+        """Test that reads inside replica_reads() go to a replica."""
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Book), ['replica1', 'replica2'])
+        self.assertIsNone(self.router.db_for_read(Book))
+    
+    def test_writes_always_use_primary(self):
+        """Test that writes go to the primary even inside replica_reads()."""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Book), 'default')
+    
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self):
+        """Test that reads fall back to the primary when no replicas exist."""
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Book))
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReadFromReplicaDecoratorTest(TestCase):
+    """Test cases for the read_from_replica decorator."""
+    
+    def setUp(self):
+        """Set up a view that records where reads would be routed."""
+        self.factory = RequestFactory()
+        self.routed_to = []
+        
+        @read_from_replica
+        def view(request):
+            self.routed_to.append(ReplicaRouter().db_for_read(Book))
+            return HttpResponse()
+        
+        self.view = view
+    
+    def test_get_requests_read_from_replica(self):
+        """Test that GET requests are routed to a replica."""
+        self.view(self.factory.get('/'))
+        self.assertEqual(self.routed_to, ['replica1'])
+    
+    def test_write_requests_read_from_primary(self):
+        """Test that reads made while handling a write use the primary."""
+        self.view(self.factory.post('/'))
+        self.assertEqual(self.routed_to, [None])
+    
+    def test_pinned_clients_read_from_primary(self):
+        """Test that clients that recently wrote read their own writes."""
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        self.view(request)
+        self.assertEqual(self.routed_to, [None])
+    
+    def test_async_views_read_from_replica(self):
+        """Test that async views are routed like sync views."""
+        @read_from_replica
+        async def view(request):
+            self.routed_to.append(ReplicaRouter().db_for_read(Book))
+            return HttpResponse()
+        
+        self.assertTrue(iscoroutinefunction(view))
+        async_to_sync(view)(self.factory.get('/'))
+        async_to_sync(view)(self.factory.post('/'))
+        self.assertEqual(self.routed_to, ['replica1', None])
+
+
+class PrimaryPinningMiddlewareTest(APITestCase):
+    """Test cases for the PrimaryPinningMiddleware."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.author = Author.objects.create(name="Test Author")
+    
+    def test_write_request_sets_pin_cookie(self):
+        """Test that a write request pins the client to the primary."""
+        self.client.login(username='testuser', password='testpass123')
+        data = {'title': 'New Book', 'publication_year': 2020, 'author': self.author.pk}
+        response = self.client.post(reverse('book-create-view'), data, format='json')
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertTrue(response.cookies[PIN_COOKIE_NAME]['max-age'])
+    
+    def test_read_request_does_not_set_pin_cookie(self):
+        """Test that read requests leave the client unpinned."""
+        response = self.client.get(reverse('book-list-view'))
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
@@ -0,0 +1,123 @@
+"""
+Tests for the token-bucket throttles and rate-limit headers.
+"""
+
+import copy
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .models import Author, Book
+from .throttling import TokenBucket
+
+
+def rest_framework_with_rates(**rates):
+    """Return a copy of the REST_FRAMEWORK setting with the given throttle rates."""
+    config = copy.deepcopy(settings.REST_FRAMEWORK)
+    config['DEFAULT_THROTTLE_RATES'].update(rates)
+    return config
+
+
+class TokenBucketTest(TestCase):
+    """Test cases for the cache-backed TokenBucket."""
+    
+    def setUp(self):
+        """Start each test with empty buckets."""
+        cache.clear()
+    
+    def test_bucket_allows_burst_up_to_capacity(self):
+        """Test that a full bucket allows exactly `capacity` requests."""
+        bucket = TokenBucket('test:burst', capacity=3, refill_rate=1, cache=cache)
+        results = [bucket.consume(now=1000.0)[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+    
+    def test_bucket_refills_over_time(self):
+        """Test that tokens are refilled at the configured rate."""
+        bucket = TokenBucket('test:refill', capacity=2, refill_rate=1, cache=cache)
+        bucket.consume(now=1000.0)
+        bucket.consume(now=1000.0)
+        self.assertFalse(bucket.consume(now=1000.5)[0])
+        self.assertTrue(bucket.consume(now=1001.0)[0])
+    
+    def test_bucket_never_exceeds_capacity(self):
+        """Test that an idle bucket does not accumulate more than its capacity."""
+        bucket = TokenBucket('test:idle', capacity=2, refill_rate=1, cache=cache)
+        bucket.consume(now=1000.0)
+        results = [bucket.consume(now=2000.0)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+    
+    def test_denied_request_reports_retry_after(self):
+        """Test that a throttled request reports when enough tokens will be available."""
+        bucket = TokenBucket('test:wait', capacity=1, refill_rate=0.5, cache=cache)
+        bucket.consume(now=1000.0)
+        allowed, remaining, retry_after = bucket.consume(now=1000.0)
+        self.assertFalse(allowed)
+        self.assertEqual(remaining, 0)
+        self.assertEqual(retry_after, 2)
+    
+    def test_cost_consumes_multiple_tokens(self):
+        """Test that a request can consume more than one token."""
+        bucket = TokenBucket('test:cost', capacity=5, refill_rate=1, cache=cache)
+        self.assertEqual(bucket.consume(cost=3, now=1000.0)[:2], (True, 2))
+        self.assertFalse(bucket.consume(cost=3, now=1000.0)[0])
+        self.assertTrue(bucket.consume(cost=2, now=1000.0)[0])
+
+
+class ThrottledViewsTest(APITestCase):
+    """Test cases for throttling on the book views."""
+    
+    def setUp(self):
+        """Set up test data and empty buckets."""
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.author = Author.objects.create(name="Test Author")
+        Book.objects.create(title="Test Book", publication_year=2023, author=self.author)
+    
+    def test_rate_limit_headers(self):
+        """Test that responses include X-RateLimit-* headers."""
+        response = self.client.get(reverse('book-list-view'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('X-RateLimit-Limit', response)
+        self.assertIn('X-RateLimit-Remaining', response)
+        self.assertIn('X-RateLimit-Reset', response)
+    
+    @override_settings(REST_FRAMEWORK=rest_framework_with_rates(anon='2/min'))
+    def test_anonymous_clients_throttled_per_ip(self):
+        """Test that anonymous clients get 429 with Retry-After once the bucket is empty."""
+        url = reverse('book-detail-view', kwargs={'pk': Book.objects.get().pk})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(response['X-RateLimit-Scope'], 'anon')
+        # A different IP has its own bucket
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    @override_settings(REST_FRAMEWORK=rest_framework_with_rates(anon='2/min', user='5/min'))
+    def test_authenticated_users_use_user_bucket(self):
+        """Test that authenticated users are throttled per user, not per IP."""
+        url = reverse('book-list-view')
+        self.client.get(url)
+        self.client.get(url)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    @override_settings(REST_FRAMEWORK=rest_framework_with_rates(query_cost='6/min'))
+    def test_search_requests_use_separate_cost_budget(self):
+        """Test that search/filter parameters draw from the query cost budget."""
+        url = reverse('book-list-view')
+        self.assertEqual(self.client.get(url, {'search': 'Test'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url, {'search': 'Test'}).status_code, status.HTTP_200_OK)
+        response = self.client.get(url, {'search': 'Test'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['X-RateLimit-Scope'], 'query_cost')
+        # Plain listing is not charged against the query budget
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
@@ -11,6 +11,7 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import datetime
+from .concurrency import VersionConflict, save_versioned
 from .models import Author, Book
 from .serializers import BookSerializer
 
@@ -322,4 +323,178 @@ class BookViewsTest(APITestCase):
         self.client.login(username='testuser', password='testpass123')
         url = reverse('book-delete-view', kwargs={'pk': 9999})
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class BookConditionalRequestTest(APITestCase):
+    """Test cases for ETag/Last-Modified conditional requests on the book endpoints."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.author = Author.objects.create(name="Test Author")
+        self.book = Book.objects.create(
+            title="Test Book",
+            publication_year=2023,
+            author=self.author
+        )
+    
+    def test_book_detail_view_sets_etag_and_last_modified(self):
+        """Test that BookDetailView returns a strong ETag and Last-Modified header."""
+        url = reverse('book-detail-view', kwargs={'pk': self.book.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+    
+    def test_book_detail_view_not_modified(self):
+        """Test that a matching If-None-Match returns 304 without serializing the book."""
+        url = reverse('book-detail-view', kwargs={'pk': self.book.pk})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+    
+    def test_book_detail_view_etag_changes_on_update(self):
+        """Test that updating a book invalidates its ETag."""
+        url = reverse('book-detail-view', kwargs={'pk': self.book.pk})
+        etag = self.client.get(url)['ETag']
+        self.book.title = "Updated Title"
+        self.book.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_book_detail_view_not_found(self):
+        """Test that a missing book still returns 404 and no ETag."""
+        url = reverse('book-detail-view', kwargs={'pk': 9999})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+    
+    def test_book_list_view_not_modified(self):
+        """Test that an unchanged collection returns 304 from BookListView."""
+        url = reverse('book-list-view')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_book_list_view_etag_varies_by_query(self):
+        """Test that each filter/search combination gets its own ETag."""
+        url = reverse('book-list-view')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, {'search': 'Test'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_book_list_view_etag_changes_on_create_and_delete(self):
+        """Test that inserts and deletes change the collection ETag."""
+        url = reverse('book-list-view')
+        etag = self.client.get(url)['ETag']
+        other = Book.objects.create(title="Other", publication_year=2020, author=self.author)
+        created_etag = self.client.get(url)['ETag']
+        self.assertNotEqual(created_etag, etag)
+        other.delete()
+        self.assertNotEqual(self.client.get(url)['ETag'], created_etag)
+    
+    def test_book_list_view_has_no_last_modified(self):
+        """Test that If-Modified-Since alone cannot hide a deleted book from the list."""
+        url = reverse('book-list-view')
+        other = Book.objects.create(title="Other", publication_year=2020, author=self.author)
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        other.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+
+class BookOptimisticConcurrencyTest(APITestCase):
+    """Test cases for version/If-Match checks on BookUpdateView."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.author = Author.objects.create(name="Test Author")
+        self.book = Book.objects.create(
+            title="Test Book",
+            publication_year=2023,
+            author=self.author
+        )
+        self.detail_url = reverse('book-detail-view', kwargs={'pk': self.book.pk})
+        self.update_url = reverse('book-update-view', kwargs={'pk': self.book.pk})
+    
+    def test_update_increments_version(self):
+        """Test that every update bumps the version and returns a new ETag."""
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(self.update_url, {'title': 'Edited'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.version, 2)
+        self.assertEqual(self.book.title, 'Edited')
+    
+    def test_version_is_read_only(self):
+        """Test that clients cannot set the version directly."""
+        response = self.client.patch(
+            self.update_url, {'title': 'Edited', 'version': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+    
+    def test_update_with_matching_if_match(self):
+        """Test that an If-Match with the current ETag is accepted."""
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(
+            self.update_url, {'title': 'Edited'}, format='json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.detail_url)['ETag'], response['ETag'])
+    
+    def test_update_with_stale_if_match(self):
+        """Test that an If-Match with an outdated ETag returns 412 and changes nothing."""
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.update_url, {'title': 'First edit'}, format='json')
+        response = self.client.patch(
+            self.update_url, {'title': 'Second edit'}, format='json', HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data['version'], 2)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'First edit')
+    
+    def test_update_with_stale_version(self):
+        """Test that a stale version in the body returns 409 and changes nothing."""
+        self.client.patch(self.update_url, {'title': 'First edit', 'version': 1}, format='json')
+        response = self.client.patch(
+            self.update_url, {'title': 'Second edit', 'version': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['version'], 2)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'First edit')
+    
+    def test_update_with_invalid_version(self):
+        """Test that a non-integer version is a validation error."""
+        response = self.client.patch(
+            self.update_url, {'title': 'Edited', 'version': 'abc'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('version', response.data)
+    
+    def test_concurrent_save_is_rejected(self):
+        """Test that a save racing the update makes the conditional UPDATE fail."""
+        first = Book.objects.get(pk=self.book.pk)
+        second = Book.objects.get(pk=self.book.pk)
+        first.title = 'First edit'
+        save_versioned(first, 1, ['title'])
+        second.title = 'Second edit'
+        with self.assertRaises(VersionConflict):
+            save_versioned(second, 1, ['title'])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'First edit')
+        self.assertEqual(self.book.version, 2)
@@ -0,0 +1,251 @@
+"""
+Throttling for the API application.
+
+This module implements token-bucket throttles on top of Django's cache so that
+limits are shared by every worker process pointing at the same cache (Redis or
+Memcached in production, see ``CACHES`` in settings.py).
+
+Each bucket is stored as a leaky-bucket level (the number of tokens in use),
+which is equivalent to a token bucket of the same capacity and refill rate but
+only needs the cache's atomic operations:
+
+- A request atomically ``incr``-s the level by its cost. If the new level
+  exceeds the capacity the cost is refunded and the request is throttled.
+- Refill happens at most once per second per bucket. The first request in a
+  given second wins an atomic ``add`` on a per-second key and drains the
+  tokens earned since the last refill.
+
+Rates use DRF's ``<tokens>/<period>`` syntax (e.g. ``"60/min"``): the number is
+the bucket capacity (maximum burst) and the bucket refills that many tokens
+per period. Throttle results are recorded on the request so that
+``api.middleware.RateLimitHeadersMiddleware`` can add ``X-RateLimit-*`` headers.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Levels are stored in thousandths of a token so fractional refill rates
+# (e.g. 60/min = 1 token/s, 100/min = 1.667 tokens/s) stay integer-only.
+SCALE = 1000
+
+
+class TokenBucket:
+    """
+    A token bucket stored in a Django cache.
+
+    Args:
+        key (str): Cache key identifying the bucket.
+        capacity (int): Maximum number of tokens (burst size).
+        refill_rate (float): Tokens added per second.
+        cache: The Django cache backend holding the bucket state.
+    """
+
+    def __init__(self, key, capacity, refill_rate, cache):
+        self.key = key
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache = cache
+        # Long enough for a full bucket to drain; the key is refreshed on refill.
+        self.timeout = int(math.ceil(capacity / refill_rate)) + 60
+
+    @property
+    def level_key(self):
+        return f'{self.key}:level'
+
+    @property
+    def refilled_at_key(self):
+        return f'{self.key}:refilled_at'
+
+    def _refill(self, now):
+        """Drain the tokens earned since the last refill (one caller per second)."""
+        second = int(now)
+        if not self.cache.add(f'{self.key}:refill:{second}', 1, timeout=2):
+            return
+        last = self.cache.get(self.refilled_at_key, second)
+        self.cache.set(self.refilled_at_key, second, timeout=self.timeout)
+        earned = int((second - last) * self.refill_rate * SCALE)
+        level = self.cache.get(self.level_key, 0)
+        # Other requests can only raise the level between the get and the decr,
+        # so draining at most the observed level never drives it negative.
+        drain = min(earned, level)
+        if drain > 0:
+            try:
+                self.cache.decr(self.level_key, drain)
+            except ValueError:
+                pass
+        self.cache.touch(self.level_key, self.timeout)
+
+    def consume(self, cost=1, now=None):
+        """
+        Try to take ``cost`` tokens from the bucket.
+
+        Returns:
+            tuple: ``(allowed, remaining, retry_after)`` where ``remaining`` is
+            the number of whole tokens left and ``retry_after`` is the number of
+            seconds until ``cost`` tokens are available (0 if allowed).
+        """
+        now = time.time() if now is None else now
+        self.cache.add(self.level_key, 0, timeout=self.timeout)
+        self._refill(now)
+
+        amount = int(cost * SCALE)
+        try:
+            level = self.cache.incr(self.level_key, amount)
+        except ValueError:
+            # The key expired between add() and incr(); start a fresh bucket.
+            self.cache.add(self.level_key, 0, timeout=self.timeout)
+            level = self.cache.incr(self.level_key, amount)
+
+        limit = self.capacity * SCALE
+        if level <= limit:
+            return True, (limit - level) // SCALE, 0
+
+        self.cache.decr(self.level_key, amount)
+        retry_after = (level - limit) / (self.refill_rate * SCALE)
+        return False, max(0, (limit - level + amount) // SCALE), retry_after
+
+    def seconds_until_full(self):
+        """Return the seconds until the bucket is completely refilled."""
+        level = self.cache.get(self.level_key, 0)
+        return level / (self.refill_rate * SCALE)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class for token-bucket throttles.
+
+    Subclasses set ``scope`` (the key in ``DEFAULT_THROTTLE_RATES``) and
+    implement ``get_cache_key()``, returning None to skip throttling.
+    """
+    scope = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_rate(self, request, view):
+        """Return the rate string for this throttle, or None to disable it."""
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def parse_rate(self, rate):
+        """
+        Parse a rate string into ``(capacity, refill_rate_per_second)``.
+
+        Args:
+            rate (str): A rate such as ``"60/min"`` or ``"1000/day"``.
+        """
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        capacity = int(num)
+        return capacity, capacity / duration
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def get_cost(self, request, view):
+        """Return the number of tokens the request consumes."""
+        return 1
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(request, view)
+        key = self.get_cache_key(request, view) if rate else None
+        if key is None:
+            return True
+        cost = self.get_cost(request, view)
+        if cost <= 0:
+            return True
+
+        capacity, refill_rate = self.parse_rate(rate)
+        cache = caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+        bucket = TokenBucket(f'throttle:{key}', capacity, refill_rate, cache)
+        allowed, remaining, retry_after = bucket.consume(cost)
+        self.retry_after = retry_after
+        record_rate_limit(request, {
+            'scope': self.scope,
+            'limit': capacity,
+            'remaining': remaining,
+            'reset': int(math.ceil(bucket.seconds_until_full())),
+        })
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+def record_rate_limit(request, info):
+    """
+    Store throttle results on the underlying HttpRequest for the headers middleware.
+    """
+    http_request = getattr(request, '_request', request)
+    limits = getattr(http_request, 'rate_limits', None)
+    if limits is None:
+        limits = http_request.rate_limits = []
+    limits.append(info)
+
+
+def client_ident(throttle, request):
+    """Return ``user:<pk>`` for authenticated users, ``ip:<address>`` otherwise."""
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{throttle.get_ident(request)}'
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Per-IP bucket for unauthenticated clients (rate: ``anon``)."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return f'anon:{self.get_ident(request)}'
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Per-user bucket for authenticated clients (rate: ``user``)."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return None
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Per-client bucket for an endpoint class.
+
+    Views opt in by setting ``throttle_scope`` (e.g. ``"books_read"``); the rate
+    is looked up under that name in ``DEFAULT_THROTTLE_RATES``.
+    """
+
+    def get_rate(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        if self.scope is None:
+            return None
+        return super().get_rate(request, view)
+
+    def get_cache_key(self, request, view):
+        return f'scope:{self.scope}:{client_ident(self, request)}'
+
+
+class QueryCostThrottle(TokenBucketThrottle):
+    """
+    Separate per-client budget for expensive search/filter requests (rate: ``query_cost``).
+
+    Views list their expensive query parameters and token costs in
+    ``throttle_query_costs``, e.g. ``{'search': 3, 'author_name': 2}``. A
+    request costs the sum of the parameters it uses; requests without any
+    of them are not charged.
+    """
+    scope = 'query_cost'
+
+    def get_cost(self, request, view):
+        costs = getattr(view, 'throttle_query_costs', {})
+        return sum(cost for param, cost in costs.items() if request.query_params.get(param))
+
+    def get_cache_key(self, request, view):
+        return f'query_cost:{client_ident(self, request)}'
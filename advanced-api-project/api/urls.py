@@ -5,7 +5,7 @@ This module defines the URL patterns for the API app endpoints.
 """
 
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('authors/', views.author_list, name='author-list'),
@@ -19,4 +19,9 @@ urlpatterns = [
     path('books/delete/', views.BookDeleteView.as_view(), name='book-delete-view-no-id'),
     path('books/<int:pk>/update/', views.BookUpdateView.as_view(), name='book-update-view'),
     path('books/<int:pk>/delete/', views.BookDeleteView.as_view(), name='book-delete-view'),
+
+    # Async variants of the list/detail/create endpoints (serve with ASGI)
+    path('async/books/list/', async_views.AsyncBookListView.as_view(), name='async-book-list-view'),
+    path('async/books/<int:pk>/', async_views.AsyncBookDetailView.as_view(), name='async-book-detail-view'),
+    path('async/books/create/', async_views.AsyncBookCreateView.as_view(), name='async-book-create-view'),
 ]
\ No newline at end of file
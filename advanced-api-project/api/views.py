@@ -6,8 +6,11 @@ Currently contains placeholder views that can be expanded as needed.
 """
 
 from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters import rest_framework as django_filters
-from rest_framework import generics, permissions, filters
+from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
@@ -15,18 +18,28 @@ from django_filters.rest_framework import DjangoFilterBackend
 from .models import Author, Book
 from .serializers import AuthorSerializer, BookSerializer
 from .filters import BookFilter
+from .routers import read_from_replica
+from .concurrency import VersionConflict, etag_matches, save_versioned
+from .conditional import (
+    book_detail_etag,
+    book_etag,
+    book_detail_last_modified,
+    book_list_etag,
+)
 
 
 # Placeholder views - these can be expanded based on project requirements
 
 
+@read_from_replica
 @api_view(['GET'])
 def author_list(request):
     """
     List all authors with their books (nested serialization).
     
     This view demonstrates the nested serialization functionality
-    where each author includes their related books.
+    where each author includes their related books. Reads are served by
+    a replica when one is configured.
     """
     authors = Author.objects.all()
     serializer = AuthorSerializer(authors, many=True)
@@ -34,6 +47,7 @@ def author_list(request):
 
 
 @api_view(['GET'])
+@condition(etag_func=book_list_etag)
 def book_list(request):
     """
     List all books.
@@ -47,6 +61,11 @@ def book_list(request):
 
 # Generic views for Book model CRUD operations
 
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(
+    condition(etag_func=book_list_etag),
+    name='get',
+)
 class BookListView(generics.ListAPIView):
     """
     Generic view to retrieve all books with filtering, searching, and ordering capabilities.
@@ -69,6 +88,14 @@ class BookListView(generics.ListAPIView):
     - Order by title: /api/books/list/?ordering=title
     - Order by publication year: /api/books/list/?ordering=publication_year
     - Reverse order: /api/books/list/?ordering=-publication_year
+    
+    Reads are served by a replica when one is configured (see api.routers).
+    
+    Conditional requests:
+    - Responses carry a collection-level ETag (no Last-Modified, which
+      deletes would not change)
+    - If-None-Match requests for an unchanged collection receive
+      304 Not Modified without querying or serializing the books
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
@@ -86,8 +113,23 @@ class BookListView(generics.ListAPIView):
     # Ordering configuration
     ordering_fields = ['title', 'publication_year']
     ordering = ['title']  # default ordering
+    
+    # Throttling: endpoint-class bucket plus a token cost for expensive
+    # search/filter parameters (see api.throttling.QueryCostThrottle)
+    throttle_scope = 'books_read'
+    throttle_query_costs = {
+        'search': 3,
+        'author_name': 2,
+        'title_contains': 2,
+        'title__icontains': 2,
+    }
 
 
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(
+    condition(etag_func=book_detail_etag, last_modified_func=book_detail_last_modified),
+    name='get',
+)
 class BookDetailView(generics.RetrieveAPIView):
     """
     Generic view to retrieve a single book by ID.
@@ -95,10 +137,15 @@ class BookDetailView(generics.RetrieveAPIView):
     This view uses DRF's RetrieveAPIView which provides a read-only endpoint
     for retrieving a specific book instance by its primary key. It's accessible
     to all users (authenticated and unauthenticated).
+    
+    Reads are served by a replica when one is configured (see api.routers).
+    Responses carry a strong ETag derived from the book's updated_at column,
+    so conditional GETs for an unchanged book receive 304 Not Modified.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'books_read'
 
 
 class BookCreateView(generics.CreateAPIView):
@@ -111,6 +158,7 @@ class BookCreateView(generics.CreateAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'books_write'
 
     def perform_create(self, serializer):
         """
@@ -125,16 +173,77 @@ class BookUpdateView(generics.UpdateAPIView):
     
     This view uses DRF's UpdateAPIView which provides an update-only endpoint
     for modifying existing book instances. It requires authentication to access.
+    
+    Optimistic concurrency (see api.concurrency):
+    - ``If-Match: <ETag from GET>`` updates only that representation of the
+      book; otherwise 412 Precondition Failed
+    - Without If-Match, a ``version`` in the body must be the book's current
+      version; otherwise 409 Conflict
+    - Either way the row is written with ``UPDATE ... WHERE version = n``, so an
+      edit that races another save gets 412/409 instead of overwriting it
+    - Responses carry the new ETag and ``version`` for the next edit
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'books_write'
+
+    def update(self, request, *args, **kwargs):
+        """
+        Check the client's precondition, then apply the update.
+
+        Returns:
+            Response: The updated book, or 409/412 with the current version.
+        """
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        if_match = request.headers.get('If-Match')
+        conflict_status = status.HTTP_412_PRECONDITION_FAILED if if_match else status.HTTP_409_CONFLICT
+        if if_match is not None:
+            if not etag_matches(if_match, book_etag(request, instance.pk, instance.updated_at)):
+                return self.conflict_response(instance, conflict_status)
+        elif 'version' in request.data:
+            try:
+                client_version = int(request.data['version'])
+            except (TypeError, ValueError):
+                raise ValidationError({'version': 'A valid integer is required.'})
+            if client_version != instance.version:
+                return self.conflict_response(instance, conflict_status)
+        self.expected_version = instance.version
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        try:
+            self.perform_update(serializer)
+        except VersionConflict:
+            instance = self.get_object()
+            return self.conflict_response(instance, conflict_status)
+        response = Response(serializer.data)
+        response['ETag'] = book_etag(request, instance.pk, instance.updated_at)
+        return response
 
     def perform_update(self, serializer):
         """
-        Update the book instance with additional custom logic if needed.
+        Write the validated fields if the book is still at the version read.
+        
+        Raises:
+            VersionConflict: The book was saved by another request meanwhile.
         """
-        serializer.save()
+        instance = serializer.instance
+        for name, value in serializer.validated_data.items():
+            setattr(instance, name, value)
+        save_versioned(instance, self.expected_version, serializer.validated_data)
+
+    def conflict_response(self, instance, status_code):
+        """Return a 409/412 response describing the book's current version."""
+        response = Response(
+            {
+                'detail': 'The book has been changed since you loaded it.',
+                'version': instance.version,
+            },
+            status=status_code,
+        )
+        response['ETag'] = book_etag(self.request, instance.pk, instance.updated_at)
+        return response
 
 
 class BookDeleteView(generics.DestroyAPIView):
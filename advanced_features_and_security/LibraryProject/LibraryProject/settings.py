@@ -12,6 +12,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -93,17 +94,70 @@ WSGI_APPLICATION = 'LibraryProject.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# MySQL by default; DJANGO_DB_ENGINE=sqlite runs against db.sqlite3 as a
+# local stand-in (e.g. for the test suite where no MySQL server is available).
+
+if os.environ.get('DJANGO_DB_ENGINE', 'mysql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': 'my_first',
+            'USER': 'root',
+            'PASSWORD': '12345678',
+            'HOST': 'localhost',
+            'PORT': '3307',
+        }
+    }
+
+
+# Sessions
+# DJANGO_SESSION_ENGINE selects where sessions live: 'db' (default), 'cache',
+# 'cached_db' or 'signed_cookies'. 'cache' and 'signed_cookies' keep session
+# reads and writes off the database; the cache modes need a shared cache.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'db')
+
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'my_first',
-        'USER': 'root',
-        'PASSWORD': '12345678',
-        'HOST': 'localhost',
-        'PORT': '3307',
+# Caches
+# Thumbnail digests and source sizes (bookshelf.thumbnails) are read by every
+# worker, so they live in the shared 'thumbnails' cache: Redis when
+# DJANGO_REDIS_URL is set, otherwise the database (create the table with
+# `python manage.py createcachetable`).
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        },
+        'thumbnails': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        },
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'thumbnails': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'thumbnail_cache',
+        },
+    }
+THUMBNAIL_CACHE = 'thumbnails'
+
+
+# Task queue
+# Deferred work (e.g. creating user profiles) is stored in the database and run
+# by `python manage.py run_tasks`. Set DJANGO_TASKS_EAGER=1 to run tasks inline
+# after commit instead.
+LIBRARY_TASKS_EAGER = os.environ.get('DJANGO_TASKS_EAGER', '0') == '1'
 
 
 # Password validation
@@ -142,6 +196,37 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (profile photos) and their generated thumbnails
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+THUMBNAIL_ROOT = MEDIA_ROOT / 'thumbnails'
+THUMBNAIL_SIZES = {
+    'small': (64, 64),
+    'medium': (256, 256),
+}
+
+# Profile photos are checked from their header and streamed to disk by
+# bookshelf.uploads. The temp dir is on the media filesystem, so saving an
+# upload moves the file instead of copying it; create it when deploying
+# (`mkdir -p media/uploads_tmp`, checked by bookshelf.W001). Multipart requests
+# over IMAGE_UPLOAD_MAX_REQUEST_BYTES are refused before their body is read,
+# except in views marked with bookshelf.uploads.allow_large_uploads.
+FILE_UPLOAD_HANDLERS = [
+    'bookshelf.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'uploads_tmp'
+IMAGE_UPLOAD_FIELDS = ('profile_photo',)
+IMAGE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+# The photo plus room for the other form fields
+IMAGE_UPLOAD_MAX_REQUEST_BYTES = IMAGE_UPLOAD_MAX_BYTES + 1024 * 1024
+IMAGE_UPLOAD_MAX_DIMENSIONS = (4096, 4096)
+
+# Search books through the normalized bookshelf.Author table. Enable once
+# migration bookshelf 0004 (the author backfill) has completed.
+BOOKSHELF_NORMALIZED_AUTHORS = False
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,15 +1,78 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Book, CustomUser
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .authors import normalize_author_name
+from .models import Author, Book, CustomUser
+from .uploads import with_upload_errors
 from django.contrib.auth.admin import UserAdmin
 # Register your models here.
 
+
+# Row estimates for large changelists (shared with relationship_app.admin)
+def estimated_row_count(model, using):
+    """Return the database's cheap row estimate for a model's table, or None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = ('SELECT TABLE_ROWS FROM information_schema.TABLES '
+               'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s')
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Use the table estimate instead of COUNT(*) for unfiltered changelists of large tables."""
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title','author','publication_year')
     search_fields = ('title','author')
     list_filter = ('publication_year',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    # With BOOKSHELF_NORMALIZED_AUTHORS, search is a prefix match on the title
+    # ((title, id) index) and on the unique normalized_name index of Author,
+    # instead of LIKE '%term%' scans of books. normalized_name is already
+    # lowercase, so a case-sensitive prefix match is enough.
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not getattr(settings, 'BOOKSHELF_NORMALIZED_AUTHORS', False) or not term:
+            return super().get_search_results(request, queryset, search_term)
+        authors = Author.objects.filter(normalized_name__startswith=normalize_author_name(term))
+        return queryset.filter(Q(title__istartswith=term) | Q(author_ref__in=authors)), False
 
 admin.site.register(Book,BookAdmin)
 
+
+class AuthorAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('^normalized_name',)
+    ordering = ('normalized_name',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+admin.site.register(Author, AuthorAdmin)
+
 # Custom admin for CustomUser (for auto-check compliance)
 class CustomUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
@@ -18,6 +81,17 @@ class CustomUserAdmin(UserAdmin):
     add_fieldsets = UserAdmin.add_fieldsets + (
         (None, {'fields': ('date_of_birth', 'profile_photo')}),
     )
-    list_display = UserAdmin.list_display + ('date_of_birth', 'profile_photo')
+    # has_profile_photo instead of profile_photo: no storage URL lookup per row
+    list_display = UserAdmin.list_display + ('date_of_birth', 'has_profile_photo')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    @admin.display(boolean=True, description='Photo')
+    def has_profile_photo(self, obj):
+        return bool(obj.profile_photo)
+
+    # Photos rejected while streaming (bookshelf.uploads) become form errors
+    def get_form(self, request, obj=None, **kwargs):
+        return with_upload_errors(super().get_form(request, obj, **kwargs), request)
 
-admin.site.register(CustomUser, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(CustomUser, CustomUserAdmin)
@@ -0,0 +1,82 @@
+"""
+Normalized authors for bookshelf.Book.
+
+``Book.author`` stays the free-text name as entered; ``Book.author_ref`` links
+each book to one ``Author`` row per distinct name, where names that differ
+only in case or whitespace ("Jane  Austen", "jane austen") share a row.
+``Book.save()`` and the bulk importer keep the link current, and migration
+0004 backfills existing books in batches.
+
+The helpers take the model classes as arguments so the migration can call
+them with its historical models.
+"""
+
+from django.db import transaction
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def normalize_author_name(name):
+    """Return the key authors are deduplicated on: lowercase, single-spaced."""
+    return ' '.join((name or '').split()).lower()
+
+
+def resolve_authors(author_model, names, using='default'):
+    """
+    Return ``{normalized name: Author}`` for ``names``, creating missing authors.
+
+    Uses one query for the existing authors and, if any are missing, one
+    insert and one query for the new rows, however many names are passed.
+    """
+    variants = {}
+    for name in names:
+        key = normalize_author_name(name)
+        if key:
+            # The first spelling seen becomes the display name
+            variants.setdefault(key, ' '.join(name.split()))
+    if not variants:
+        return {}
+    authors = author_model._default_manager.using(using)
+    found = {author.normalized_name: author
+             for author in authors.filter(normalized_name__in=list(variants))}
+    missing = variants.keys() - found.keys()
+    if missing:
+        # ignore_conflicts: another writer may create the same author concurrently
+        authors.bulk_create(
+            [author_model(name=variants[key], normalized_name=key) for key in missing],
+            ignore_conflicts=True,
+        )
+        found.update((author.normalized_name, author)
+                     for author in authors.filter(normalized_name__in=list(missing)))
+    return found
+
+
+def backfill_book_authors(book_model, author_model, batch_size=BACKFILL_BATCH_SIZE, using='default'):
+    """
+    Link every book without an ``author_ref`` to its normalized author.
+
+    Books are processed in primary-key order, ``batch_size`` at a time, each
+    batch in its own transaction with one bulk UPDATE. Only unlinked books are
+    selected, so an interrupted run resumes where it stopped.
+
+    Returns:
+        int: The number of books linked.
+    """
+    books = book_model._default_manager.using(using)
+    linked = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            books.filter(pk__gt=last_pk, author_ref__isnull=True)
+            .order_by('pk').only('pk', 'author')[:batch_size]
+        )
+        if not batch:
+            return linked
+        last_pk = batch[-1].pk
+        with transaction.atomic(using=using):
+            authors = resolve_authors(author_model, [book.author for book in batch], using)
+            for book in batch:
+                book.author_ref = authors.get(normalize_author_name(book.author))
+            batch = [book for book in batch if book.author_ref is not None]
+            books.bulk_update(batch, ['author_ref'])
+        linked += len(batch)
@@ -0,0 +1,17 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def check_upload_temp_dir(app_configs, **kwargs):
+    """Warn when FILE_UPLOAD_TEMP_DIR is missing; uploads written to disk would fail."""
+    path = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None)
+    if path and not os.path.isdir(path):
+        return [Warning(
+            f'FILE_UPLOAD_TEMP_DIR ({path}) does not exist.',
+            hint='Create it when deploying, e.g. mkdir -p media/uploads_tmp.',
+            id='bookshelf.W001',
+        )]
+    return []
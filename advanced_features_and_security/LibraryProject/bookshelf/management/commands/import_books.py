@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from bookshelf.importer import (
+    BATCH_SIZE, FORMATS, ImportFormatError, ImportResult, detect_format, import_books,
+)
+
+
+class Command(BaseCommand):
+    """
+    Bulk-import books from a CSV, JSON or JSON Lines file.
+
+    The file is streamed, so files of any size import in constant memory.
+    Progress is printed after every batch.
+    """
+    help = 'Import books from a CSV (title,author,publication_year), JSON or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='File format (default: from the file extension, else csv).')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Records validated and inserted per batch (default: {BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        try:
+            total = os.path.getsize(path)
+            f = open(path, 'rb')
+        except OSError as e:
+            raise CommandError(e)
+        result = ImportResult()
+        with f:
+            try:
+                for result in import_books(f, file_format, options['batch_size'], result):
+                    done = f.tell() * 100 // total if total else 100
+                    self.stdout.write(
+                        f'{done:3d}% {result.records} records, {result.created} created, '
+                        f'{result.invalid} invalid'
+                    )
+            except (ImportFormatError, DatabaseError) as e:
+                raise CommandError(f'{e} ({result.created} books already imported)')
+        for error in result.errors:
+            self.stderr.write(f"Record {error['record']}: {error['error']}")
+        if result.invalid > len(result.errors):
+            self.stderr.write(f'... and {result.invalid - len(result.errors)} more invalid records')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} of {result.records} records from {path}.'
+        ))
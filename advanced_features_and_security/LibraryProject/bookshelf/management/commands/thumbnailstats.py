@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from bookshelf.thumbnails import thumbnail_metrics
+
+
+class Command(BaseCommand):
+    """Print profile photo thumbnail counters, including bytes saved."""
+    help = 'Show how many thumbnails were generated and served and the bytes saved.'
+
+    def handle(self, *args, **options):
+        for key, value in thumbnail_metrics().items():
+            self.stdout.write(f'{key}: {value}')
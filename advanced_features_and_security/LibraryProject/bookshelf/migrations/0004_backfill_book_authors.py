@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from bookshelf.authors import backfill_book_authors
+
+
+def link_authors(apps, schema_editor):
+    backfill_book_authors(
+        apps.get_model('bookshelf', 'Book'),
+        apps.get_model('bookshelf', 'Author'),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so an interrupted migrate resumes from the
+    # books that are still unlinked instead of starting over.
+    atomic = False
+
+    dependencies = [
+        ('bookshelf', '0003_author'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_authors, migrations.RunPython.noop),
+    ]
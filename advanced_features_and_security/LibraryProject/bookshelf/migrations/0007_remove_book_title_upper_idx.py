@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookshelf', '0006_alter_book_options'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='bookshelf_book_title_upper_idx',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+def create_metrics(apps, schema_editor):
+    ThumbnailMetric = apps.get_model('bookshelf', 'ThumbnailMetric')
+    ThumbnailMetric.objects.bulk_create(
+        [ThumbnailMetric(name=name) for name in ('generated', 'served', 'bytes_served', 'bytes_saved')],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookshelf', '0007_remove_book_title_upper_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailMetric',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_metrics, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
+from .authors import normalize_author_name, resolve_authors
+
 
 # Custom user manager for bookshelf app (for auto-check compliance)
 class CustomUserManager(BaseUserManager):
@@ -33,18 +35,61 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.username
+
+# One row per distinct author name, ignoring case and whitespace (see bookshelf.authors)
+class Author(models.Model):
+    name = models.CharField(max_length=100)
+    normalized_name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=100)
+    # Set from author on save; not edited directly
+    author_ref = models.ForeignKey(Author, on_delete=models.SET_NULL, null=True, blank=True,
+                                   editable=False, related_name='books')
     publication_year = models.IntegerField()
 
     def __str__(self):
         return f"{self.title} By {self.author}"
 
+    def save(self, *args, **kwargs):
+        # Link author_ref on the database being written to, unless the save
+        # is limited to fields that do not include the author
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'author' in update_fields:
+            using = kwargs.get('using') or router.db_for_write(Book, instance=self)
+            self.author_ref = resolve_authors(Author, [self.author], using).get(
+                normalize_author_name(self.author))
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'author_ref'}
+        super().save(*args, **kwargs)
+
     class Meta:
         permissions = [
             ("can_view", "Can view book"),
             ("can_create", "Can create book"),
             ("can_edit", "Can edit book"),
             ("can_delete", "Can delete book"),
-        ]
\ No newline at end of file
+        ]
+        # (title, id) serves the keyset-paginated list and title prefix filter,
+        # and the admin's title__istartswith search too: on MySQL that is a
+        # plain LIKE 'term%' under the case-insensitive column collation.
+        # (author, title) serves the author prefix filter in title order.
+        indexes = [
+            models.Index(fields=['title', 'id'], name='bookshelf_book_title_id_idx'),
+            models.Index(fields=['author', 'title'], name='bookshelf_book_author_idx'),
+        ]
+
+# Thumbnail generation/serving counters (see bookshelf.thumbnails), one row per
+# counter, incremented with UPDATE ... SET value = value + n so concurrent
+# workers never lose a count
+class ThumbnailMetric(models.Model):
+    name = models.CharField(max_length=32, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
@@ -0,0 +1,79 @@
+"""
+Keyset pagination for the book lists.
+
+Pages are addressed by the last (or first) row shown rather than by a page
+number, so each page is an index range scan on ``(title, id)`` whatever its
+position in the catalog, instead of an OFFSET that reads and discards every
+earlier row. Links carry an opaque ``after``/``before`` cursor and keep the
+other query parameters (the filters).
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(obj, field):
+    data = json.dumps([getattr(obj, field), obj.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return value, int(pk)
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequest('Invalid page cursor')
+
+
+def _page_url(request, **cursor):
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query.update(cursor)
+    return '?' + query.urlencode()
+
+
+def keyset_page(request, queryset, field='title', page_size=PAGE_SIZE):
+    """
+    Return one page of ``queryset`` ordered by ``(field, pk)``.
+
+    Returns:
+        dict: ``objects`` (the rows), and ``next_url`` / ``previous_url``
+        (query strings, or None at either end of the list).
+    """
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if before:
+        value, pk = decode_cursor(before)
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+        ).order_by(f'-{field}', '-pk')
+    else:
+        if after:
+            value, pk = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+            )
+        queryset = queryset.order_by(field, 'pk')
+    # One extra row tells whether there is another page in this direction
+    objects = list(queryset[:page_size + 1])
+    has_more = len(objects) > page_size
+    objects = objects[:page_size]
+    if before:
+        objects.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, bool(after)
+    return {
+        'objects': objects,
+        'next_url': _page_url(request, after=encode_cursor(objects[-1], field))
+        if objects and has_next else None,
+        'previous_url': _page_url(request, before=encode_cursor(objects[0], field))
+        if objects and has_previous else None,
+    }
@@ -1,3 +1,485 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from functools import partial
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import BadRequest, RequestDataTooBig
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from . import authors, importer
+from .authors import backfill_book_authors, resolve_authors
+from .importer import ImportFormatError, import_books
+from .models import Author, Book, ThumbnailMetric
+from .pagination import decode_cursor, keyset_page
+from .thumbnails import generate_thumbnails, record_served, thumbnail_metrics
+from .uploads import upload_errors
+
+# Session, user, count and one page of rows (plus the list_filter choices,
+# computed with one DISTINCT query).
+CHANGELIST_QUERY_BUDGET = 5
+
+
+class AuthorDedupeTests(TestCase):
+    def test_spellings_share_one_author(self):
+        first = Book.objects.create(title='Emma', author='Jane Austen', publication_year=1815)
+        second = Book.objects.create(title='Persuasion', author='  jane   AUSTEN ', publication_year=1817)
+        self.assertEqual(first.author_ref, second.author_ref)
+        self.assertEqual(Author.objects.get().name, 'Jane Austen')
+        self.assertEqual(Author.objects.get().normalized_name, 'jane austen')
+
+    def test_resolve_authors_creates_missing_authors_once(self):
+        Author.objects.create(name='Jane Austen', normalized_name='jane austen')
+        with self.assertNumQueries(3):
+            found = resolve_authors(Author, ['Jane Austen', 'Mary Shelley', 'mary  shelley', ''])
+        self.assertEqual(set(found), {'jane austen', 'mary shelley'})
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_save_without_author_skips_lookup(self):
+        book = Book.objects.create(title='Emma', author='Jane Austen', publication_year=1815)
+        book.title = 'Emma (2nd ed.)'
+        with self.assertNumQueries(1):
+            book.save(update_fields=['title'])
+
+    def test_save_with_author_in_update_fields_relinks(self):
+        book = Book.objects.create(title='Emma', author='Jane Austen', publication_year=1815)
+        book.author = 'Mary Shelley'
+        book.save(update_fields=['author'])
+        book.refresh_from_db()
+        self.assertEqual(book.author_ref.normalized_name, 'mary shelley')
+
+    @override_settings(BOOKSHELF_NORMALIZED_AUTHORS=True)
+    def test_admin_search_uses_normalized_authors(self):
+        emma = Book.objects.create(title='Emma', author='Jane Austen', publication_year=1815)
+        frankenstein = Book.objects.create(title='Frankenstein', author='Mary Shelley', publication_year=1818)
+        model_admin = site._registry[Book]
+        request = RequestFactory().get('/')
+        results, may_have_duplicates = model_admin.get_search_results(request, Book.objects.all(), ' JANE  ')
+        self.assertEqual(list(results), [emma])
+        self.assertFalse(may_have_duplicates)
+        results, _ = model_admin.get_search_results(request, Book.objects.all(), 'frank')
+        self.assertEqual(list(results), [frankenstein])
+
+
+class BackfillBookAuthorsTests(TestCase):
+    def setUp(self):
+        # Books as they were before migration 0004: no author_ref
+        Book.objects.bulk_create([
+            Book(title=f'Book {i}', author=name, publication_year=2000)
+            for i, name in enumerate(['Jane Austen', 'jane austen', 'Mary Shelley', 'Bram Stoker', ''])
+        ])
+
+    def test_backfill_links_books_in_batches(self):
+        self.assertEqual(backfill_book_authors(Book, Author, batch_size=2), 4)
+        self.assertEqual(Book.objects.filter(author_ref__isnull=True).count(), 1)
+        self.assertEqual(Author.objects.count(), 3)
+
+    def test_interrupted_backfill_resumes(self):
+        calls = []
+
+        def fail_on_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('interrupted')
+            return resolve_authors(*args, **kwargs)
+
+        with mock.patch.object(authors, 'resolve_authors', side_effect=fail_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                backfill_book_authors(Book, Author, batch_size=2)
+        # The first batch was committed on its own
+        self.assertEqual(Book.objects.filter(author_ref__isnull=False).count(), 2)
+        self.assertEqual(backfill_book_authors(Book, Author, batch_size=2), 2)
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('author_ref__normalized_name', flat=True)),
+            ['jane austen', 'jane austen', 'mary shelley', 'bram stoker', None],
+        )
+
+
+class AdminQueryBudgetTests(TestCase):
+    """The bookshelf changelists run a fixed number of queries however large the tables are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = Author.objects.bulk_create(
+            [Author(name=f'Author {i:03d}', normalized_name=f'author {i:03d}') for i in range(200)])
+        Book.objects.bulk_create(
+            [Book(title=f'Book {i:04d}', author=f'Author {i % 200:03d}', author_ref=authors[i % 200],
+                  publication_year=1900 + i % 120) for i in range(2000)],
+            batch_size=500,
+        )
+        get_user_model().objects.bulk_create(
+            [get_user_model()(username=f'user{i:03d}', profile_photo=f'photos/{i}.jpg') for i in range(300)])
+        cls.admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_with_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response, queries.captured_queries
+
+    def test_changelists_stay_within_budget(self):
+        for name, count in (('book', 2000), ('author', 200), ('customuser', 301)):
+            with self.subTest(name):
+                response, queries = self.get_with_queries(reverse(f'admin:bookshelf_{name}_changelist'))
+                self.assertEqual(response.context['cl'].result_count, count)
+                self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+
+    @override_settings(BOOKSHELF_NORMALIZED_AUTHORS=True)
+    def test_search_stays_within_budget(self):
+        response, queries = self.get_with_queries(reverse('admin:bookshelf_book_changelist'), {'q': 'author 007'})
+        self.assertEqual(response.context['cl'].result_count, 10)
+        self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+        self.assertFalse(any("'%author" in q['sql'].lower() for q in queries))
+
+
+def image_file(size=(10, 10), format='PNG', name='photo.png', content_type='image/png', noise=False):
+    if noise:
+        # Random pixels do not compress, so the file is about 3 bytes a pixel
+        image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    else:
+        image = Image.new('RGB', size)
+    data = BytesIO()
+    image.save(data, format)
+    return SimpleUploadedFile(name, data.getvalue(), content_type=content_type)
+
+
+class ImageUploadHandlerTests(TestCase):
+    """Photos are checked while streaming; rejected ones never reach request.FILES."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        settings_override = override_settings(FILE_UPLOAD_TEMP_DIR=self.temp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def parse(self, data):
+        request = RequestFactory().post('/', data)
+        return request, request.POST, request.FILES
+
+    def test_valid_photo_is_streamed_to_disk(self):
+        request, post, files = self.parse({'profile_photo': image_file(), 'username': 'reader'})
+        self.assertIsInstance(files['profile_photo'], TemporaryUploadedFile)
+        self.addCleanup(files['profile_photo'].close)
+        self.assertTrue(files['profile_photo'].temporary_file_path().startswith(self.temp_dir))
+        self.assertEqual(post['username'], 'reader')
+        self.assertEqual(upload_errors(request), {})
+
+    def test_declared_type_is_skipped(self):
+        photo = SimpleUploadedFile('photo.txt', b'not an image', content_type='text/plain')
+        request, post, files = self.parse({'profile_photo': photo, 'username': 'reader'})
+        self.assertNotIn('profile_photo', files)
+        self.assertIn('Unsupported image type', upload_errors(request)['profile_photo'])
+        # SkipFile only drops the file; later fields are still parsed
+        self.assertEqual(post['username'], 'reader')
+
+    def test_real_format_is_checked(self):
+        photo = image_file(format='BMP', name='photo.png')
+        request, _, files = self.parse({'profile_photo': photo})
+        self.assertNotIn('profile_photo', files)
+        self.assertIn('Unsupported image type', upload_errors(request)['profile_photo'])
+
+    @override_settings(IMAGE_UPLOAD_MAX_DIMENSIONS=(100, 100))
+    def test_large_dimensions_are_skipped(self):
+        request, post, files = self.parse({'profile_photo': image_file(size=(200, 50)), 'username': 'reader'})
+        self.assertNotIn('profile_photo', files)
+        self.assertEqual(upload_errors(request)['profile_photo'],
+                         'Image is 200x50 pixels; the maximum is 100x100.')
+        self.assertEqual(post['username'], 'reader')
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=2000)
+    def test_oversize_upload_stops_reading(self):
+        photo = image_file(size=(100, 100), noise=True)
+        self.assertGreater(photo.size, 2000)
+        request, post, files = self.parse({'profile_photo': photo, 'username': 'reader'})
+        self.assertNotIn('profile_photo', files)
+        self.assertIn('larger than', upload_errors(request)['profile_photo'])
+        # StopUpload: the fields after the file are never read
+        self.assertNotIn('username', post)
+        self.assertEqual(list(Path(self.temp_dir).iterdir()), [])
+
+    @override_settings(IMAGE_UPLOAD_MAX_REQUEST_BYTES=1000)
+    def test_oversize_request_is_refused_before_parsing(self):
+        request = RequestFactory().post('/', {'profile_photo': image_file(size=(100, 100), noise=True)})
+        with self.assertRaises(RequestDataTooBig):
+            request.FILES
+
+    def test_other_file_fields_pass_through(self):
+        attachment = SimpleUploadedFile('notes.txt', b'notes', content_type='text/plain')
+        request, _, files = self.parse({'attachment': attachment})
+        self.assertEqual(files['attachment'].read(), b'notes')
+        self.assertEqual(upload_errors(request), {})
+
+
+class KeysetPaginationTests(TestCase):
+    """Pages split on (title, pk), so rows sharing a title are neither skipped nor repeated."""
+
+    @classmethod
+    def setUpTestData(cls):
+        titles = ['A', 'B', 'B', 'B', 'C', 'D', 'E']
+        Book.objects.bulk_create([Book(title=title, author='Author', publication_year=2000) for title in titles])
+        cls.books = list(Book.objects.order_by('title', 'pk'))
+
+    def page(self, query=''):
+        return keyset_page(RequestFactory().get('/' + query), Book.objects.all(), page_size=3)
+
+    def test_forward_and_back_across_equal_titles(self):
+        first = self.page()
+        self.assertEqual(first['objects'], self.books[:3])
+        self.assertIsNone(first['previous_url'])
+        second = self.page(first['next_url'])
+        self.assertEqual(second['objects'], self.books[3:6])
+        last = self.page(second['next_url'])
+        self.assertEqual(last['objects'], self.books[6:])
+        self.assertIsNone(last['next_url'])
+        # Going back gives the same pages
+        self.assertEqual(self.page(last['previous_url'])['objects'], self.books[3:6])
+        back = self.page(second['previous_url'])
+        self.assertEqual(back['objects'], self.books[:3])
+        self.assertIsNone(back['previous_url'])
+        self.assertEqual(self.page(back['next_url'])['objects'], self.books[3:6])
+
+    def test_exactly_full_last_page_has_no_next(self):
+        Book.objects.filter(pk=self.books[-1].pk).delete()
+        second = self.page(self.page()['next_url'])
+        self.assertEqual(second['objects'], self.books[3:6])
+        self.assertIsNone(second['next_url'])
+
+    def test_links_keep_filters(self):
+        query = QueryDict(self.page('?author=Auth')['next_url'][1:])
+        self.assertEqual(query['author'], 'Auth')
+        self.assertEqual(decode_cursor(query['after']), ('B', self.books[2].pk))
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        for cursor in ('not-base64!', 'W10', 'eyJhIjoxfQ'):
+            with self.subTest(cursor=cursor), self.assertRaises(BadRequest):
+                self.page(f'?after={cursor}')
+
+
+@override_settings(THUMBNAIL_CACHE='default', THUMBNAIL_SIZES={'small': (16, 16), 'medium': (32, 32)})
+class ThumbnailMetricTests(TestCase):
+    """Counters are atomic F() updates on ThumbnailMetric rows."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_ROOT=os.path.join(media_root, 'thumbs'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_user('reader', password='x')
+        self.user.profile_photo.save('photo.png', ContentFile(image_file(size=(64, 64), noise=True).read()))
+
+    def test_generated_and_served_are_counted(self):
+        names = generate_thumbnails(self.user.profile_photo)
+        generate_thumbnails(self.user.profile_photo)
+        self.assertEqual(thumbnail_metrics()['generated'], 2)
+        # One UPDATE for the three serving counters
+        with self.assertNumQueries(1):
+            record_served(names['small'])
+        metrics = thumbnail_metrics()
+        self.assertEqual(metrics['served'], 1)
+        self.assertGreater(metrics['bytes_served'], 0)
+        self.assertEqual(metrics['bytes_saved'], self.user.profile_photo.size - metrics['bytes_served'])
+
+    def test_deleted_rows_are_recreated(self):
+        ThumbnailMetric.objects.filter(name='served').delete()
+        names = generate_thumbnails(self.user.profile_photo, ['small'])
+        record_served(names['small'])
+        record_served(names['small'])
+        metrics = thumbnail_metrics()
+        self.assertEqual((metrics['generated'], metrics['served']), (1, 2))
+
+
+def import_all(data, file_format, **kwargs):
+    results = list(import_books(BytesIO(data), file_format, **kwargs))
+    return results[-1].as_dict(), len(results)
+
+
+class ImporterTests(TestCase):
+    """Files are parsed record by record and inserted in batches."""
+
+    def test_formats_import_the_same_books(self):
+        files = {
+            'csv': b'\xef\xbb\xbftitle,author,publication_year\nEmma,Jane Austen,1815\nDracula,Bram Stoker,1897\n',
+            'json': b' [ {"title": "Emma", "author": "Jane Austen", "publication_year": 1815},\n'
+                    b'{"title": "Dracula", "author": "Bram Stoker", "publication_year": "1897"} ] ',
+            'jsonl': b'\xef\xbb\xbf{"title": "Emma", "author": "Jane Austen", "publication_year": 1815}\n\n'
+                     b'{"title": "Dracula", "author": "Bram Stoker", "publication_year": 1897}',
+        }
+        for file_format, data in files.items():
+            with self.subTest(file_format):
+                Book.objects.all().delete()
+                result, _ = import_all(data, file_format)
+                self.assertEqual((result['records'], result['created'], result['invalid']), (2, 2, 0))
+                self.assertEqual(sorted(Book.objects.values_list('title', 'author_ref__normalized_name')),
+                                 [('Dracula', 'bram stoker'), ('Emma', 'jane austen')])
+
+    def test_invalid_records_are_skipped_and_reported(self):
+        data = (b'{"title": "Emma", "author": "Jane Austen", "publication_year": 1815}\n'
+                b'{"title": "", "author": "Nobody", "publication_year": 2000}\n'
+                b'not json\n'
+                b'["a list"]\n')
+        result, _ = import_all(data, 'jsonl')
+        self.assertEqual((result['records'], result['created'], result['invalid']), (4, 1, 3))
+        self.assertEqual([error['record'] for error in result['errors']], [2, 3, 4])
+        self.assertIn('title', result['errors'][0]['error'])
+        self.assertIn('Invalid JSON', result['errors'][1]['error'])
+
+    def test_progress_after_each_batch(self):
+        lines = [b'{"title": "Book %d", "author": "Author", "publication_year": 2000}' % i for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            results = [(r.records, r.created) for r in import_books(BytesIO(b'\n'.join(lines)), 'jsonl',
+                                                                    batch_size=2)]
+        self.assertEqual(results, [(2, 2), (4, 4), (5, 5)])
+        # One multi-row INSERT per batch
+        self.assertEqual(sum(q['sql'].startswith('INSERT INTO "bookshelf_book"') for q in queries), 3)
+
+    def test_json_split_across_chunks(self):
+        records = b','.join(b'{"title": "Book %d", "author": "Author", "publication_year": 2000}' % i
+                            for i in range(50))
+        with mock.patch.object(importer, 'CHUNK_SIZE', 7):
+            result, _ = import_all(b'[' + records + b']', 'json')
+        self.assertEqual(result['created'], 50)
+
+    @mock.patch.object(importer, 'MAX_RECORD_BYTES', 100)
+    @mock.patch.object(importer, 'CHUNK_SIZE', 16)
+    def test_oversized_records_are_a_format_error(self):
+        record = b'{"title": "%s", "author": "Author", "publication_year": 2000}' % (b'x' * 100)
+        for file_format, data, message in (
+            ('json', b'[' + record + b']', 'Malformed JSON after record 0'),
+            ('jsonl', b'{}\n' + record + b'\n', 'Line 2 is longer than 100 bytes'),
+            ('jsonl', b'{}\n' + record, 'Line 2 is longer than 100 bytes'),
+        ):
+            with self.subTest(data=data), self.assertRaisesMessage(ImportFormatError, message):
+                import_all(data, file_format)
+        # A line of exactly the limit is accepted
+        line = b'{"title": "%s", "author": "Author", "publication_year": 2000}' % (b'x' * 40)
+        result, _ = import_all(b'\n'.join([line.ljust(100), line.ljust(100)]), 'jsonl')
+        self.assertEqual(result['created'], 2)
+
+    def test_malformed_files_are_format_errors(self):
+        for file_format, data, message in (
+            ('csv', b'title,author\nEmma,Jane Austen\n', 'CSV header is missing: publication_year'),
+            ('json', b'{"title": "Emma"}', 'array of objects'),
+            ('json', b'[{"title": "Emma"', 'Malformed JSON after record 0'),
+            ('jsonl', b'\xff\xfe{}', 'not UTF-8'),
+        ):
+            with self.subTest(data=data), self.assertRaisesMessage(ImportFormatError, message):
+                import_all(data, file_format)
+
+    def test_failed_batch_keeps_earlier_batches(self):
+        lines = b'\n'.join(b'{"title": "Book %d", "author": "Author", "publication_year": 2000}' % i
+                            for i in range(4))
+        result = importer.ImportResult()
+        real_bulk_create = Book.objects.bulk_create
+        calls = []
+
+        def fail_second_batch(objs, *args, **kwargs):
+            calls.append(objs)
+            if len(calls) == 2:
+                raise DatabaseError('disk full')
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Book.objects, 'bulk_create', side_effect=fail_second_batch):
+            with self.assertRaises(DatabaseError):
+                list(import_books(BytesIO(lines), 'jsonl', batch_size=2, result=result))
+        self.assertEqual(result.created, 2)
+        self.assertEqual(Book.objects.count(), 2)
+
+
+class BookImportViewTests(TestCase):
+    """The import view streams one progress line per batch and ends with a summary or an error."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('editor', password='x')
+        self.client.force_login(self.user)
+        self.url = reverse('book_import')
+
+    def allow(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='can_create', content_type__app_label='bookshelf'))
+
+    def post(self, data, name='books.jsonl', **params):
+        upload = SimpleUploadedFile(name, data, content_type='application/octet-stream')
+        response = self.client.post(self.url, {'file': upload, **params}, secure=True)
+        if response.streaming:
+            return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return response, None
+
+    def test_requires_permission(self):
+        response, _ = self.post(b'{}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_streams_progress_then_summary(self):
+        self.allow()
+        lines = b'\n'.join(b'{"title": "Book %d", "author": "Author", "publication_year": 2000}' % i
+                            for i in range(3))
+        with mock.patch('bookshelf.views.import_books', partial(import_books, batch_size=2)):
+            response, lines = self.post(lines)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(lines[:-1], [
+            {'records': 2, 'created': 2, 'invalid': 0},
+            {'records': 3, 'created': 3, 'invalid': 0},
+        ])
+        self.assertEqual(lines[-1], {'done': True, 'records': 3, 'created': 3, 'invalid': 0, 'errors': []})
+
+    def test_format_error_ends_the_stream(self):
+        self.allow()
+        response, lines = self.post(b'[{"title": "Emma"', name='books.json')
+        self.assertEqual(lines, [{'error': 'Malformed JSON after record 0', 'created': 0}])
+
+    def test_database_error_ends_the_stream_with_the_created_count(self):
+        self.allow()
+        lines = b'\n'.join(b'{"title": "Book %d", "author": "Author", "publication_year": 2000}' % i
+                            for i in range(3))
+        real_insert = importer._insert
+        calls = []
+
+        def fail_second_batch(batch, result):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise DatabaseError('disk full')
+            real_insert(batch, result)
+
+        with mock.patch('bookshelf.views.import_books', partial(import_books, batch_size=2)), \
+                mock.patch.object(importer, '_insert', side_effect=fail_second_batch), \
+                self.assertLogs('bookshelf.views', 'ERROR'):
+            response, lines = self.post(lines)
+        self.assertEqual(lines[-1], {'error': 'Database error: disk full', 'created': 2})
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_bad_requests(self):
+        self.allow()
+        response, _ = self.post(b'{}', format='xml')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportBooksCommandTests(TestCase):
+    def test_database_error_reports_created_count(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as f:
+            f.write(b'title,author,publication_year\nEmma,Jane Austen,1815\n')
+            f.flush()
+            with mock.patch.object(importer, '_insert', side_effect=DatabaseError('disk full')):
+                with self.assertRaisesMessage(CommandError, 'disk full (0 books already imported)'):
+                    call_command('import_books', f.name, stdout=StringIO())
+            out = StringIO()
+            call_command('import_books', f.name, stdout=out)
+        self.assertIn('Imported 1 of 1 records', out.getvalue())
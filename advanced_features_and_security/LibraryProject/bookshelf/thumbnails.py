@@ -0,0 +1,181 @@
+"""
+Thumbnails for CustomUser.profile_photo.
+
+Pages should show a fixed-size variant instead of the uploaded original:
+
+- Variants are generated once per source image, either by the background task
+  queued when a photo is saved (``relationship_app.tasks``) or lazily on the
+  first request for a size.
+- They are stored in ``THUMBNAIL_ROOT`` under a key derived from the hash of
+  the source bytes (``<digest>_<width>x<height>.<ext>``), so identical uploads
+  share files and a URL never changes its content. ``views.thumbnail_file``
+  serves them with a one-year ``immutable`` cache lifetime.
+- ``ThumbnailMetric`` rows count how many variants were generated and
+  served, and how many bytes were saved compared to serving the originals,
+  across all workers. Each count is one atomic ``UPDATE``; source sizes and
+  digests live in the shared ``THUMBNAIL_CACHE`` cache.
+"""
+
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Case, F, Value, When
+from django.utils.functional import LazyObject
+from PIL import Image, ImageOps
+
+from .models import ThumbnailMetric
+
+DEFAULT_SIZES = {
+    'small': (64, 64),
+    'medium': (256, 256),
+}
+METRIC_KEYS = ('generated', 'served', 'bytes_served', 'bytes_saved')
+# Digests are keyed on the file's size and mtime as well as its name; the
+# timeout only clears out entries for replaced or deleted files.
+DIGEST_TIMEOUT = 30 * 24 * 60 * 60
+
+
+class ThumbnailStorage(LazyObject):
+    """Storage for generated variants, created on first use from settings."""
+
+    def _setup(self):
+        self._wrapped = FileSystemStorage(
+            location=settings.THUMBNAIL_ROOT,
+            base_url=settings.MEDIA_URL + 'thumbnails/',
+        )
+
+
+thumbnail_storage = ThumbnailStorage()
+
+
+def _cache():
+    return caches[getattr(settings, 'THUMBNAIL_CACHE', 'thumbnails')]
+
+
+def thumbnail_sizes():
+    """Return the configured ``{name: (width, height)}`` sizes."""
+    return getattr(settings, 'THUMBNAIL_SIZES', DEFAULT_SIZES)
+
+
+def source_digest(field_file):
+    """
+    Return the content hash of an uploaded photo.
+
+    The digest is cached by file name, size and modification time, so each
+    source is read and hashed only once and a file replaced under the same
+    name is hashed again.
+    """
+    storage = field_file.storage
+    modified = storage.get_modified_time(field_file.name).timestamp()
+    key = f'thumbnails:digest:{field_file.name}:{field_file.size}:{modified:.0f}'
+    cache = _cache()
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with field_file.open('rb') as f:
+            for chunk in f.chunks():
+                sha.update(chunk)
+        digest = sha.hexdigest()[:32]
+        cache.set(key, digest, timeout=DIGEST_TIMEOUT)
+        cache.set(f'thumbnails:source_size:{digest}', field_file.size, timeout=None)
+    return digest
+
+
+def thumbnail_name(digest, size, ext):
+    """Return the content-addressed storage name of a variant."""
+    width, height = thumbnail_sizes()[size]
+    return f'{digest[:2]}/{digest}_{width}x{height}.{ext}'
+
+
+def _render(image, size):
+    """Return ``(bytes, ext)`` for ``image`` scaled to fit ``size``."""
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(size)
+    buffer = io.BytesIO()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue(), 'png'
+    image.convert('RGB').save(buffer, 'JPEG', quality=85, optimize=True)
+    return buffer.getvalue(), 'jpg'
+
+
+def _existing(digest, size):
+    for ext in ('jpg', 'png'):
+        name = thumbnail_name(digest, size, ext)
+        if thumbnail_storage.exists(name):
+            return name
+    return None
+
+
+def generate_thumbnails(field_file, sizes=None):
+    """
+    Create any missing variants of a photo.
+
+    Args:
+        field_file: The ``profile_photo`` field file.
+        sizes (iterable): Size names to generate (default: all configured sizes).
+
+    Returns:
+        dict: ``{size: storage name}`` for every requested size.
+    """
+    digest = source_digest(field_file)
+    names = {}
+    missing = []
+    for size in sizes or thumbnail_sizes():
+        names[size] = _existing(digest, size)
+        if names[size] is None:
+            missing.append(size)
+    if missing:
+        with field_file.open('rb') as f:
+            image = Image.open(f)
+            image.load()
+        for size in missing:
+            content, ext = _render(image.copy(), thumbnail_sizes()[size])
+            names[size] = thumbnail_storage.save(
+                thumbnail_name(digest, size, ext), ContentFile(content))
+        _count(generated=len(missing))
+    return names
+
+
+def get_thumbnail(field_file, size):
+    """Return the storage name of one variant, generating it if needed."""
+    existing = _existing(source_digest(field_file), size)
+    return existing or generate_thumbnails(field_file, [size])[size]
+
+
+def record_served(name):
+    """Count a served variant and the bytes saved over the original."""
+    digest = os.path.basename(name).split('_', 1)[0]
+    served = thumbnail_storage.size(name)
+    original = _cache().get(f'thumbnails:source_size:{digest}')
+    _count(served=1, bytes_served=served, bytes_saved=max(0, original - served) if original else 0)
+
+
+def _add(amounts):
+    return ThumbnailMetric.objects.filter(name__in=amounts).update(value=F('value') + Case(
+        *[When(name=metric, then=Value(amount)) for metric, amount in amounts.items()],
+        default=Value(0),
+    ))
+
+
+def _count(**amounts):
+    """Add to several counters with one ``UPDATE ... SET value = value + CASE ...``."""
+    amounts = {metric: amount for metric, amount in amounts.items() if amount}
+    if amounts and _add(amounts) < len(amounts):
+        # Migration 0008 creates the rows; recreate any that were deleted
+        existing = set(ThumbnailMetric.objects.filter(name__in=amounts).values_list('name', flat=True))
+        missing = {metric: amount for metric, amount in amounts.items() if metric not in existing}
+        ThumbnailMetric.objects.bulk_create(
+            [ThumbnailMetric(name=metric) for metric in missing], ignore_conflicts=True)
+        _add(missing)
+
+
+def thumbnail_metrics():
+    """Return the generation/serving counters."""
+    values = dict(ThumbnailMetric.objects.filter(name__in=METRIC_KEYS).values_list('name', 'value'))
+    return {metric: values.get(metric, 0) for metric in METRIC_KEYS}
@@ -0,0 +1,169 @@
+"""
+Streaming upload handling for profile photos.
+
+``ImageUploadHandler`` (first in ``FILE_UPLOAD_HANDLERS``) takes over the
+file fields listed in ``IMAGE_UPLOAD_FIELDS``:
+
+- A multipart request larger than ``IMAGE_UPLOAD_MAX_REQUEST_BYTES`` (from
+  its ``Content-Length``) is refused with 400 before its body is parsed,
+  unless the view is marked with ``allow_large_uploads``.
+- The declared content type and length are checked before any data is read.
+- The image header is read from the first chunk(s) with ``Image.open``,
+  which does not decode pixel data, so the real format and dimensions are
+  checked before the rest of the upload is accepted.
+- Data is written chunk by chunk to a temporary file in
+  ``FILE_UPLOAD_TEMP_DIR`` (on the media filesystem), never buffered in
+  memory. As soon as it exceeds ``IMAGE_UPLOAD_MAX_BYTES`` the upload is
+  stopped (``StopUpload(connection_reset=True)``), so the rest of the body
+  is not read. Saving the model then moves the file into place instead of
+  copying it.
+
+Rejected files are dropped from ``request.FILES`` and the reason is stored in
+``request.upload_errors``; ``with_upload_errors()`` turns those into form
+errors.
+"""
+
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.core.files.uploadhandler import (
+    FileUploadHandler, SkipFile, StopFutureHandlers, StopUpload, TemporaryFileUploadHandler,
+)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+ALLOWED_IMAGE_TYPES = {
+    'image/jpeg': 'JPEG',
+    'image/png': 'PNG',
+    'image/gif': 'GIF',
+    'image/webp': 'WEBP',
+}
+# Give up on finding the header (format and size) after this many bytes;
+# large EXIF blocks can push a JPEG's size marker past the first chunk.
+HEADER_MAX_BYTES = 256 * 1024
+
+
+def allow_large_uploads(view):
+    """Exempt a view (e.g. a bulk import) from ``IMAGE_UPLOAD_MAX_REQUEST_BYTES``."""
+    view.allow_large_uploads = True
+    return view
+
+
+def upload_errors(request):
+    """Return the ``{field name: message}`` dict of rejected uploads."""
+    errors = getattr(request, 'upload_errors', None)
+    if errors is None:
+        errors = request.upload_errors = {}
+    return errors
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Validate and stream image uploads to disk; other fields pass through."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Runs before the parser reads any of the body. The URL is already
+        # resolved, since the body is first read by CsrfViewMiddleware.process_view.
+        max_request_bytes = getattr(settings, 'IMAGE_UPLOAD_MAX_REQUEST_BYTES', None)
+        match = getattr(self.request, 'resolver_match', None)
+        if (max_request_bytes is not None and content_length > max_request_bytes
+                and not getattr(match and match.func, 'allow_large_uploads', False)):
+            raise RequestDataTooBig(
+                'Request body exceeded settings.IMAGE_UPLOAD_MAX_REQUEST_BYTES.')
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        # MultiPartParser closes (and so deletes) ``handler.file`` when a file
+        # is skipped; drop the previous field's file so it is left alone.
+        self.__dict__.pop('file', None)
+        self.active = field_name in getattr(settings, 'IMAGE_UPLOAD_FIELDS', ())
+        if not self.active:
+            FileUploadHandler.new_file(self, field_name, file_name, content_type,
+                                       content_length, charset, content_type_extra)
+            return
+        self.max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+        self.max_width, self.max_height = settings.IMAGE_UPLOAD_MAX_DIMENSIONS
+        self.received = 0
+        self.header = b''
+        self.header_checked = False
+        self.field_name = field_name
+        if content_type not in ALLOWED_IMAGE_TYPES:
+            self.reject('Unsupported image type. Upload a JPEG, PNG, GIF or WebP image.')
+        if content_length and content_length > self.max_bytes:
+            self.reject(self.too_large_message(), stop=True)
+        super().new_file(field_name, file_name, content_type, content_length, charset,
+                         content_type_extra)
+        # The file is handled here; the default handlers must not buffer it.
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.reject(self.too_large_message(), stop=True)
+        if not self.header_checked:
+            self.check_header(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def check_header(self, raw_data):
+        """Check format and size once enough of the file has arrived."""
+        self.header += raw_data
+        try:
+            image = Image.open(BytesIO(self.header))
+        except Image.DecompressionBombError:
+            self.reject('Image dimensions are too large.')
+        except Exception:
+            if len(self.header) >= HEADER_MAX_BYTES:
+                self.reject('Upload a valid image.')
+            return
+        if image.format not in ALLOWED_IMAGE_TYPES.values():
+            self.reject('Unsupported image type. Upload a JPEG, PNG, GIF or WebP image.')
+        width, height = image.size
+        if width > self.max_width or height > self.max_height:
+            self.reject(f'Image is {width}x{height} pixels; the maximum is '
+                        f'{self.max_width}x{self.max_height}.')
+        # Header checked; the rest of the file is only written to disk.
+        self.header_checked = True
+        self.header = b''
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        # Files too small for a complete header are still validated by the
+        # form's ImageField, which opens them.
+        return super().file_complete(file_size)
+
+    def too_large_message(self):
+        return f'Image is larger than {filesizeformat(self.max_bytes)}.'
+
+    def reject(self, message, stop=False):
+        """
+        Drop the current file and record why.
+
+        With ``stop`` the rest of the request body is not read either; fields
+        after the file are then missing from ``request.POST``.
+        """
+        # The parser closes the partial temporary file, which deletes it.
+        upload_errors(self.request)[self.field_name] = message
+        if stop:
+            raise StopUpload(connection_reset=True)
+        raise SkipFile(message)
+
+
+def with_upload_errors(form_class, request):
+    """Return a subclass of ``form_class`` that reports rejected uploads."""
+    errors = upload_errors(request)
+
+    class UploadErrorsForm(form_class):
+        def clean(self):
+            cleaned_data = super().clean()
+            for field_name, message in errors.items():
+                if field_name in self.fields:
+                    self.add_error(field_name, ValidationError(message))
+            return cleaned_data
+
+    UploadErrorsForm.__name__ = form_class.__name__
+    return UploadErrorsForm
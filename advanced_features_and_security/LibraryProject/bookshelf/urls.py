@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     path('', views.book_list, name='book_list'),
     path('create/', views.book_create, name='book_create'),
+    path('import/', views.book_import, name='book_import'),
     path('<int:pk>/edit/', views.book_edit, name='book_edit'),
     path('<int:pk>/delete/', views.book_delete, name='book_delete'),
+    path('users/<int:user_id>/photo/<str:size>/', views.profile_photo_thumbnail, name='profile_photo_thumbnail'),
+    path('thumbnails/<path:name>', views.thumbnail_file, name='thumbnail_file'),
 ]
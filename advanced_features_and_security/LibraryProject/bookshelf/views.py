@@ -1,15 +1,43 @@
 
+import json
+import logging
+
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import permission_required
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required, permission_required
+from django.db import DatabaseError
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
 from .models import Book
 from .forms import ExampleForm
+from .importer import FORMATS, ImportFormatError, ImportResult, detect_format, import_books
+from .pagination import keyset_page
+from .thumbnails import get_thumbnail, record_served, thumbnail_sizes, thumbnail_storage
+from .uploads import allow_large_uploads
+
+logger = logging.getLogger(__name__)
 
 
-# View to list books (requires can_view permission)
+# View to list books (requires can_view permission), keyset-paginated by title
+# with optional ?title= and ?author= prefix filters (both indexed)
 @permission_required('bookshelf.can_view', raise_exception=True)
 def book_list(request):
     books = Book.objects.all()
-    return render(request, 'bookshelf/book_list.html', {'books': books})
+    title = request.GET.get('title', '').strip()
+    author = request.GET.get('author', '').strip()
+    if title:
+        books = books.filter(title__istartswith=title)
+    if author:
+        books = books.filter(author__istartswith=author)
+    page = keyset_page(request, books)
+    return render(request, 'bookshelf/book_list.html', {
+        'books': page['objects'],
+        'page': page,
+        'title': title,
+        'author': author,
+    })
 
 # View to create a book (requires can_create permission)
 @permission_required('bookshelf.can_create', raise_exception=True)
@@ -23,6 +51,41 @@ def book_create(request):
             return redirect('book_list')
     return render(request, 'bookshelf/book_form.html')
 
+# Bulk import from an uploaded CSV/JSON/JSON Lines file (requires can_create
+# permission). The import runs while the response streams, one JSON progress
+# line per batch, so large files neither time out silently nor buffer in memory
+@allow_large_uploads
+@permission_required('bookshelf.can_create', raise_exception=True)
+def book_import(request):
+    if request.method != 'POST':
+        return render(request, 'bookshelf/book_import.html', {'formats': FORMATS})
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No file uploaded'}, status=400)
+    file_format = request.POST.get('format') or detect_format(upload.name)
+    if file_format not in FORMATS:
+        return JsonResponse({'error': f'Unknown format: {file_format}'}, status=400)
+
+    def progress():
+        # Errors end the stream with an error line, since the status code has
+        # already been sent; batches inserted before it are kept
+        result = ImportResult()
+        try:
+            for result in import_books(upload.file, file_format, result=result):
+                yield json.dumps({
+                    'records': result.records, 'created': result.created, 'invalid': result.invalid,
+                }) + '\n'
+        except ImportFormatError as e:
+            yield json.dumps({'error': str(e), 'created': result.created}) + '\n'
+            return
+        except DatabaseError as e:
+            logger.exception('Book import failed after %s books', result.created)
+            yield json.dumps({'error': f'Database error: {e}', 'created': result.created}) + '\n'
+            return
+        yield json.dumps({'done': True, **result.as_dict()}) + '\n'
+
+    return StreamingHttpResponse(progress(), content_type='application/x-ndjson')
+
 # View to edit a book (requires can_edit permission)
 @permission_required('bookshelf.can_edit', raise_exception=True)
 def book_edit(request, pk):
@@ -43,3 +106,31 @@ def book_delete(request, pk):
         book.delete()
         return redirect('book_list')
     return render(request, 'bookshelf/book_confirm_delete.html', {'book': book})
+
+# Resized profile photo for signed-in users: generated on first request, then
+# redirects to the content-addressed file (short cache, since the user may
+# upload a new photo)
+@login_required
+@require_safe
+def profile_photo_thumbnail(request, user_id, size):
+    if size not in thumbnail_sizes():
+        raise Http404('Unknown thumbnail size')
+    user = get_object_or_404(get_user_model(), pk=user_id)
+    if not user.profile_photo:
+        raise Http404('No profile photo')
+    name = get_thumbnail(user.profile_photo, size)
+    response = redirect(reverse('thumbnail_file', args=[name]))
+    patch_cache_control(response, private=True, max_age=300)
+    return response
+
+# Content-addressed thumbnail file for signed-in users: its URL changes
+# whenever its content does, so browsers can cache it for a year
+@login_required
+@require_safe
+def thumbnail_file(request, name):
+    if not thumbnail_storage.exists(name):
+        raise Http404('Unknown thumbnail')
+    response = FileResponse(thumbnail_storage.open(name, 'rb'))
+    patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+    record_served(name)
+    return response
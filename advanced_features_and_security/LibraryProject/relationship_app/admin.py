@@ -1,20 +1,37 @@
 from django.contrib import admin
 from .models import *
-from django.contrib.auth.admin import UserAdmin
+from bookshelf.admin import EstimatedCountPaginator
 # Register your models here.
 
 
-# Custom admin for CustomUser
-from .models import CustomUser
+# Users are registered by bookshelf.admin (AUTH_USER_MODEL is bookshelf.CustomUser)
 
-class CustomUserAdmin(UserAdmin):
-    fieldsets = UserAdmin.fieldsets + (
-        (None, {'fields': ('date_of_birth', 'profile_photo')}),
-    )
-    add_fieldsets = UserAdmin.add_fieldsets + (
-        (None, {'fields': ('date_of_birth', 'profile_photo')}),
-    )
-    list_display = UserAdmin.list_display + ('date_of_birth', 'profile_photo')
+class UserProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'role')
+    list_filter = ('role',)
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
-admin.site.register(CustomUser, CustomUserAdmin)
+admin.site.register(UserProfile, UserProfileAdmin)
 
+class HoldingAdmin(admin.ModelAdmin):
+    list_display = ('book', 'library', 'available', 'copies')
+    list_select_related = ('book', 'library')
+    raw_id_fields = ('book', 'library')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+admin.site.register(Holding, HoldingAdmin)
+
+class LoanAdmin(admin.ModelAdmin):
+    list_display = ('holding', 'borrower', 'checked_out_at', 'due_at', 'returned_at')
+    list_select_related = ('holding__book', 'holding__library', 'borrower')
+    raw_id_fields = ('holding', 'borrower')
+    date_hierarchy = 'due_at'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+admin.site.register(Loan, LoanAdmin)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class RelationshipAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'relationship_app'
+
+    def ready(self):
+        # Register the background tasks run by `manage.py run_tasks`
+        from . import tasks  # noqa: F401
+        # Connect the availability cache invalidation receivers
+        from . import availability  # noqa: F401
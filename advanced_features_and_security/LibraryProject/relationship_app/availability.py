@@ -0,0 +1,88 @@
+"""
+Which libraries hold a book.
+
+``book_availability()`` answers with one query joining the library/book
+through table to the libraries and their librarians, and caches the result
+per book. The receivers below drop the cached entries whenever the answer can
+change: membership changes (``m2m_changed`` on ``Library.book``, including
+``membership.update_library_books``), and libraries or librarians being saved
+or deleted. Invalidation waits for the transaction to commit, so a concurrent
+request cannot re-cache the old rows.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Librarian, Library
+
+# Entries are invalidated explicitly; the timeout only bounds stale data if a
+# change bypasses the ORM.
+AVAILABILITY_CACHE_SECONDS = 60 * 60
+
+
+def availability_key(book_id):
+    return f'relationship_app:availability:{book_id}'
+
+
+def book_availability(book_id):
+    """
+    Return the libraries holding a book, with their librarians.
+
+    Returns:
+        list: ``{'id', 'name', 'librarian'}`` dicts ordered by library name;
+        ``librarian`` is None for a library without one.
+    """
+    key = availability_key(book_id)
+    libraries = cache.get(key)
+    if libraries is None:
+        libraries = [
+            {'id': row['id'], 'name': row['name'], 'librarian': row['librarian__name']}
+            for row in Library.objects.filter(book=book_id)
+            .order_by('name', 'id').values('id', 'name', 'librarian__name')
+        ]
+        cache.set(key, libraries, AVAILABILITY_CACHE_SECONDS)
+    return libraries
+
+
+def invalidate_books(book_ids):
+    keys = [availability_key(book_id) for book_id in book_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_library(library_id):
+    invalidate_books(
+        Library.book.through.objects.filter(library_id=library_id).values_list('book_id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=Library.book.through)
+def library_books_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # book.libraries.add()/remove()/clear(): only this book's entry changes
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_books([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_books(pk_set)
+    elif action == 'pre_clear':
+        # The cleared books are unknown once the rows are gone
+        invalidate_library(instance.pk)
+
+
+@receiver(post_save, sender=Library)
+def library_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_library(instance.pk)
+
+
+@receiver(pre_delete, sender=Library)
+def library_deleted(sender, instance, **kwargs):
+    invalidate_library(instance.pk)
+
+
+@receiver(post_save, sender=Librarian)
+@receiver(post_delete, sender=Librarian)
+def librarian_changed(sender, instance, **kwargs):
+    invalidate_library(instance.library_id)
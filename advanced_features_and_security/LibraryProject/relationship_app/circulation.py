@@ -0,0 +1,120 @@
+"""
+Checkouts and returns against per-library copy counts.
+
+A checkout takes a copy with a single conditional UPDATE
+(``available = available - 1 WHERE available > 0``). The database applies it
+atomically, so concurrent checkouts of the last copy cannot both succeed: the
+loser updates no row and gets ``NotAvailable``. A return locks its loan row
+with ``select_for_update()`` so the copy is given back exactly once. The
+``Holding`` check constraint is a backstop against any other code path.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Holding, Library, Loan
+
+LOAN_DAYS = 14
+
+
+class CirculationError(Exception):
+    """Base class for checkout and return failures."""
+
+
+class NotAvailable(CirculationError):
+    """No copy of the book is available at the library."""
+
+
+class AlreadyReturned(CirculationError):
+    """The loan has already been returned."""
+
+
+def add_copies(library_id, book_id, count=1):
+    """
+    Add copies of a book to a library, creating its holding if needed.
+
+    The book is also added to ``Library.book``, so the catalog and
+    availability views list it.
+
+    Returns:
+        Holding: The updated holding.
+    """
+    with transaction.atomic():
+        holding, created = Holding.objects.select_for_update().get_or_create(
+            library_id=library_id, book_id=book_id,
+            defaults={'copies': count, 'available': count},
+        )
+        if not created:
+            Holding.objects.filter(pk=holding.pk).update(
+                copies=F('copies') + count, available=F('available') + count,
+            )
+            holding.refresh_from_db()
+        Library.objects.get(pk=library_id).book.add(book_id)
+    return holding
+
+
+def checkout(library_id, book_id, borrower_id, loan_days=LOAN_DAYS):
+    """
+    Lend a copy of a book to a borrower.
+
+    Raises:
+        NotAvailable: The library holds no available copy.
+
+    Returns:
+        Loan: The new loan.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        holding_id = (
+            Holding.objects.filter(library_id=library_id, book_id=book_id)
+            .values_list('pk', flat=True).first()
+        )
+        if holding_id is None or not Holding.objects.filter(
+            pk=holding_id, available__gt=0,
+        ).update(available=F('available') - 1):
+            raise NotAvailable(f'No copy of book {book_id} is available at library {library_id}')
+        return Loan.objects.create(
+            holding_id=holding_id,
+            borrower_id=borrower_id,
+            checked_out_at=now,
+            due_at=now + timedelta(days=loan_days),
+        )
+
+
+def return_loan(loan_id):
+    """
+    Return a loaned copy.
+
+    Raises:
+        AlreadyReturned: The loan was returned before.
+
+    Returns:
+        Loan: The returned loan.
+    """
+    with transaction.atomic():
+        loan = Loan.objects.select_for_update().get(pk=loan_id)
+        if loan.returned_at is not None:
+            raise AlreadyReturned(f'Loan {loan_id} was returned at {loan.returned_at}')
+        loan.returned_at = timezone.now()
+        loan.save(update_fields=['returned_at'])
+        Holding.objects.filter(pk=loan.holding_id).update(available=F('available') + 1)
+    return loan
+
+
+def active_loans(borrower_id):
+    """Return a borrower's unreturned loans, oldest due first."""
+    return (
+        Loan.objects.filter(borrower_id=borrower_id, returned_at__isnull=True)
+        .select_related('holding__book', 'holding__library').order_by('due_at')
+    )
+
+
+def overdue_loans(now=None):
+    """Return unreturned loans past their due date, most overdue first."""
+    return (
+        Loan.objects.filter(returned_at__isnull=True, due_at__lt=now or timezone.now())
+        .select_related('holding__book', 'holding__library', 'borrower').order_by('due_at')
+    )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from relationship_app.queue import queue_metrics, work
+
+
+class Command(BaseCommand):
+    """
+    Run a task queue worker.
+
+    Start one process per worker; they coordinate through the database, so no
+    broker is required.
+    """
+    help = 'Run deferred tasks from the database-backed task queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no task is due instead of polling.')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Seconds to wait between polls of an empty queue (default: 1).')
+        parser.add_argument('--stale-timeout', type=int, default=600,
+                            help='Seconds without a heartbeat before a running task is assumed lost and '
+                                 'requeued, or failed if it has no attempts left (default: 600).')
+        parser.add_argument('--retention', type=int, default=86400,
+                            help='Seconds to keep finished tasks (default: 86400).')
+        parser.add_argument('--stats', action='store_true',
+                            help='Print queue depth and latency and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in queue_metrics().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+        processed = work(
+            once=options['once'],
+            sleep=options['sleep'],
+            stale_timeout=options['stale_timeout'],
+            retention=options['retention'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} task(s).'))
@@ -0,0 +1,77 @@
+"""
+Bulk changes to the books held by a library.
+
+``library.book.add()``/``remove()`` are fine for a few books, but for
+thousands ``update_library_books()`` applies the whole add/remove diff in one
+transaction with a fixed number of queries, however many books change: it
+locks the library row, checks the books exist, finds the ones already held,
+inserts the new through rows with one ``bulk_create(ignore_conflicts=True)``
+and removes books with one DELETE. ``m2m_changed`` is still sent (once per
+direction), so receivers see the same actions as with ``add``/``remove``.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+
+from .models import Book, Library
+
+MAX_BOOKS_PER_REQUEST = 10000
+
+
+class MembershipError(ValueError):
+    """The requested change is invalid; nothing was applied."""
+
+
+def update_library_books(library_id, add=(), remove=()):
+    """
+    Add and remove books from a library in one transaction.
+
+    Args:
+        library_id (int): Primary key of the library.
+        add (iterable): Book ids to add; ids already held are ignored.
+        remove (iterable): Book ids to remove; ids not held are ignored.
+
+    Returns:
+        dict: ``added`` and ``removed`` (rows actually changed) and ``total``
+        (books held afterwards).
+
+    Raises:
+        Library.DoesNotExist: No such library.
+        MembershipError: An id is in both lists, or a book to add does not
+            exist.
+    """
+    add = set(add)
+    remove = set(remove)
+    if add & remove:
+        raise MembershipError(f'Books both added and removed: {sorted(add & remove)[:20]}')
+    through = Library.book.through
+    with transaction.atomic():
+        # Locking the library serializes concurrent diffs, so the counts are exact
+        library = Library.objects.select_for_update().get(pk=library_id)
+        db = library._state.db
+        added = set()
+        if add:
+            found = set(Book.objects.filter(pk__in=add).values_list('pk', flat=True))
+            if found != add:
+                raise MembershipError(f'Unknown books: {sorted(add - found)[:20]}')
+            held = set(through.objects.filter(library_id=library.pk, book_id__in=add)
+                       .values_list('book_id', flat=True))
+            added = add - held
+            if added:
+                m2m_changed.send(sender=through, instance=library, action='pre_add',
+                                 reverse=False, model=Book, pk_set=added, using=db)
+                through.objects.bulk_create(
+                    [through(library_id=library.pk, book_id=book_id) for book_id in added],
+                    ignore_conflicts=True,
+                )
+                m2m_changed.send(sender=through, instance=library, action='post_add',
+                                 reverse=False, model=Book, pk_set=added, using=db)
+        removed = 0
+        if remove:
+            m2m_changed.send(sender=through, instance=library, action='pre_remove',
+                             reverse=False, model=Book, pk_set=remove, using=db)
+            removed, _ = through.objects.filter(library_id=library.pk, book_id__in=remove).delete()
+            m2m_changed.send(sender=through, instance=library, action='post_remove',
+                             reverse=False, model=Book, pk_set=remove, using=db)
+        total = through.objects.filter(library_id=library.pk).count()
+    return {'added': len(added), 'removed': removed, 'total': total}
@@ -0,0 +1,48 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0003_book_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('copies', models.PositiveIntegerField(default=1)),
+                ('available', models.PositiveIntegerField(default=1)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holdings', to='relationship_app.book')),
+                ('library', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holdings', to='relationship_app.library')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('library', 'book'), name='relapp_holding_library_book'),
+                    models.CheckConstraint(condition=models.Q(('available__lte', models.F('copies'))), name='relapp_holding_available_lte_copies'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checked_out_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('due_at', models.DateTimeField()),
+                ('returned_at', models.DateTimeField(blank=True, null=True)),
+                ('borrower', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='loans', to=settings.AUTH_USER_MODEL)),
+                ('holding', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='loans', to='relationship_app.holding')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['borrower', 'returned_at'], name='relapp_loan_borrower_active'),
+                    models.Index(fields=['returned_at', 'due_at'], name='relapp_loan_overdue'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+def start_heartbeats(apps, schema_editor):
+    # Tasks already running are judged by their start time, as before
+    Task = apps.get_model('relationship_app', 'Task')
+    Task.objects.filter(status='running').update(heartbeat_at=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0005_userprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_heartbeats, migrations.RunPython.noop),
+    ]
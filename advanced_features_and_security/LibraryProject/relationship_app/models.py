@@ -1,45 +1,15 @@
+from django.conf import settings
 from django.db import models
-from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from .models import CustomUser
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-# Custom user manager
-class CustomUserManager(BaseUserManager):
-    use_in_migrations = True
-
-    def create_user(self, username, email=None, password=None, **extra_fields):
-        if not username:
-            raise ValueError('The Username must be set')
-        email = self.normalize_email(email)
-        user = self.model(username=username, email=email, **extra_fields)
-        user.set_password(password)
-        user.save(using=self._db)
-        return user
-
-    def create_superuser(self, username, email=None, password=None, **extra_fields):
-        extra_fields.setdefault('is_staff', True)
-        extra_fields.setdefault('is_superuser', True)
-        if extra_fields.get('is_staff') is not True:
-            raise ValueError('Superuser must have is_staff=True.')
-        if extra_fields.get('is_superuser') is not True:
-            raise ValueError('Superuser must have is_superuser=True.')
-        return self.create_user(username, email, password, **extra_fields)
-
-# Custom user model
-class CustomUser(AbstractUser):
-    date_of_birth = models.DateField(null=True, blank=True)
-    profile_photo = models.ImageField(upload_to='profile_photos/', null=True, blank=True)
-
-    objects = CustomUserManager()
-
-    def __str__(self):
-        return self.username
+# Users are bookshelf.CustomUser (settings.AUTH_USER_MODEL)
 
 # Create your models here.
 class Author(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
 
     def __str__(self):
         return self.name
@@ -57,6 +27,10 @@ class Book(models.Model):
             ("can_change_book", "Can change book"),
             ("can_delete_book", "Can delete book"),
         ]
+        indexes = [
+            models.Index(fields=['title', 'id'], name='relapp_book_title_id_idx'),
+            models.Index(fields=['author', 'title'], name='relapp_book_author_title_idx'),
+        ]
 
 class Library(models.Model):
     name = models.CharField(max_length=100)
@@ -71,6 +45,43 @@ class Librarian(models.Model):
     def __str__(self):
         return self.name
 
+# Copies of a book owned by a library; `available` is decremented by checkouts
+# and incremented by returns (relationship_app.circulation)
+class Holding(models.Model):
+    library = models.ForeignKey(Library, on_delete=models.CASCADE, related_name='holdings')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='holdings')
+    copies = models.PositiveIntegerField(default=1)
+    available = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.book} at {self.library} ({self.available}/{self.copies})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['library', 'book'], name='relapp_holding_library_book'),
+            # Backstop for the service: a checkout can never oversell copies
+            models.CheckConstraint(condition=models.Q(available__lte=models.F('copies')),
+                                   name='relapp_holding_available_lte_copies'),
+        ]
+
+class Loan(models.Model):
+    holding = models.ForeignKey(Holding, on_delete=models.PROTECT, related_name='loans')
+    borrower = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='loans')
+    checked_out_at = models.DateTimeField(default=timezone.now)
+    due_at = models.DateTimeField()
+    returned_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.holding.book} to {self.borrower} (due {self.due_at:%Y-%m-%d})"
+
+    class Meta:
+        indexes = [
+            # Active loans of a borrower, and overdue loans (returned_at IS NULL
+            # AND due_at < now) in due order
+            models.Index(fields=['borrower', 'returned_at'], name='relapp_loan_borrower_active'),
+            models.Index(fields=['returned_at', 'due_at'], name='relapp_loan_overdue'),
+        ]
+
 # UserProfile model for role-based access control
 
 class UserProfile(models.Model):
@@ -79,14 +90,58 @@ class UserProfile(models.Model):
         ('Librarian', 'Librarian'),
         ('Member', 'Member'),
     ]
-    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
 
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
-# Signal to create UserProfile automatically
-@receiver(post_save, sender=CustomUser)
+# Signal to create UserProfile automatically.
+# The profile is a single INSERT and the role checks in views need it right
+# away, so it is created in the request; only slow work goes to the queue.
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance, role='Member')
+        UserProfile.objects.get_or_create(user=instance, defaults={'role': 'Member'})
+
+# Queue thumbnail generation (bookshelf.thumbnails) when a profile photo is saved
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def queue_profile_thumbnails(sender, instance, update_fields=None, **kwargs):
+    if instance.profile_photo and (update_fields is None or 'profile_photo' in update_fields):
+        from .queue import enqueue
+        enqueue('relationship_app.generate_profile_thumbnails',
+                model=sender._meta.label, user_id=instance.pk)
+
+# Deferred unit of work for the database-backed task queue (relationship_app.queue)
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed while the task runs; a stale heartbeat means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['run_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='relapp_task_status_run_at'),
+        ]
@@ -0,0 +1,17 @@
+"""
+Deferred tasks for relationship_app (run by ``python manage.py run_tasks``).
+"""
+
+from django.apps import apps
+
+from bookshelf.thumbnails import generate_thumbnails
+
+from .queue import task
+
+
+@task(name='relationship_app.generate_profile_thumbnails', max_attempts=3)
+def generate_profile_thumbnails(model, user_id):
+    """Create the configured thumbnail sizes of a user's profile photo."""
+    user = apps.get_model(model).objects.filter(pk=user_id).first()
+    if user is not None and user.profile_photo:
+        generate_thumbnails(user.profile_photo)
@@ -1,3 +1,399 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models.signals import m2m_changed
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .circulation import (
+    AlreadyReturned, NotAvailable, active_loans, add_copies, checkout, overdue_loans, return_loan,
+)
+from .availability import availability_key, book_availability
+from .membership import MembershipError, update_library_books
+from .models import Author, Book, Holding, Librarian, Library, Loan, Task, UserProfile
+from .queue import Heartbeat, claim_next_task, requeue_stale_tasks, run_task, task
+
+
+class CirculationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = Library.objects.create(name='Central')
+        cls.book = Book.objects.create(title='Emma', author=Author.objects.create(name='Jane Austen'))
+        cls.user = get_user_model().objects.create_user(username='reader', password='x')
+
+    def test_add_copies_creates_holding_and_membership(self):
+        add_copies(self.library.pk, self.book.pk, 2)
+        holding = add_copies(self.library.pk, self.book.pk, 3)
+        self.assertEqual((holding.copies, holding.available), (5, 5))
+        self.assertTrue(self.library.book.filter(pk=self.book.pk).exists())
+
+    def test_checkout_and_return(self):
+        add_copies(self.library.pk, self.book.pk, 1)
+        loan = checkout(self.library.pk, self.book.pk, self.user.pk)
+        with self.assertRaises(NotAvailable):
+            checkout(self.library.pk, self.book.pk, self.user.pk)
+        self.assertEqual(list(active_loans(self.user.pk)), [loan])
+        return_loan(loan.pk)
+        with self.assertRaises(AlreadyReturned):
+            return_loan(loan.pk)
+        self.assertEqual(Holding.objects.get().available, 1)
+        self.assertEqual(list(active_loans(self.user.pk)), [])
+
+    def test_checkout_unheld_book(self):
+        with self.assertRaises(NotAvailable):
+            checkout(self.library.pk, self.book.pk, self.user.pk)
+
+    def test_overdue_loans(self):
+        add_copies(self.library.pk, self.book.pk, 2)
+        late = checkout(self.library.pk, self.book.pk, self.user.pk, loan_days=1)
+        checkout(self.library.pk, self.book.pk, self.user.pk, loan_days=30)
+        self.assertEqual(list(overdue_loans(timezone.now() + timedelta(days=2))), [late])
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """Many threads checking out the same book never take more copies than exist."""
+    threads = 16
+    attempts_per_thread = 4
+    copies = 10
+
+    def setUp(self):
+        self.library = Library.objects.create(name='Central')
+        self.book = Book.objects.create(title='Emma', author=Author.objects.create(name='Jane Austen'))
+        self.holding = add_copies(self.library.pk, self.book.pk, self.copies)
+        self.users = [
+            get_user_model().objects.create_user(username=f'reader{i}', password='x')
+            for i in range(self.threads)
+        ]
+
+    def attempt_checkout(self):
+        # SQLite allows one writer at a time and reports a locked database
+        # instead of waiting for it; retry those attempts
+        for _ in range(200):
+            try:
+                checkout(self.library.pk, self.book.pk, self.user_id())
+                return True
+            except NotAvailable:
+                return False
+            except OperationalError:
+                if connection.vendor != 'sqlite':
+                    raise
+                time.sleep(0.005)
+        raise AssertionError('Database stayed locked')
+
+    def user_id(self):
+        return self.users[int(threading.current_thread().name)].pk
+
+    def test_concurrent_checkouts_never_oversell(self):
+        barrier = threading.Barrier(self.threads)
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.attempts_per_thread):
+                    results.append(self.attempt_checkout())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, name=str(i)) for i in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), self.threads * self.attempts_per_thread)
+        self.assertEqual(results.count(True), self.copies)
+        self.holding.refresh_from_db()
+        self.assertEqual(self.holding.available, 0)
+        self.assertEqual(Loan.objects.filter(holding=self.holding).count(), self.copies)
+
+
+class LibraryMembershipTests(TestCase):
+    """Bulk membership changes report exact counts and use a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Author')
+        cls.books = Book.objects.bulk_create([Book(title=f'Book {i}', author=author) for i in range(600)])
+        cls.ids = [book.pk for book in cls.books]
+        cls.library = Library.objects.create(name='Central')
+
+    def held(self):
+        return set(self.library.book.values_list('pk', flat=True))
+
+    def test_counts_ignore_books_already_held_or_missing(self):
+        self.library.book.add(*self.ids[:5])
+        result = update_library_books(self.library.pk, add=self.ids[:10], remove=self.ids[20:25])
+        self.assertEqual(result, {'added': 5, 'removed': 0, 'total': 10})
+        result = update_library_books(self.library.pk, add=self.ids[10:12], remove=self.ids[:3] + self.ids[30:31])
+        self.assertEqual(result, {'added': 2, 'removed': 3, 'total': 9})
+        self.assertEqual(self.held(), set(self.ids[3:12]))
+
+    def test_query_count_does_not_grow_with_the_diff(self):
+        with CaptureQueriesContext(connection) as small:
+            update_library_books(self.library.pk, add=self.ids[:2], remove=self.ids[-2:])
+        with CaptureQueriesContext(connection) as large:
+            update_library_books(self.library.pk, add=self.ids[2:300], remove=self.ids[:2] + self.ids[-200:])
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len(self.held()), 298)
+
+    def test_concurrent_insert_is_ignored(self):
+        # A plain library.book.add() does not take the library lock, so it
+        # can insert a row between the held check and the bulk insert
+        def add_behind_our_back(sender, action, pk_set, **kwargs):
+            if action == 'pre_add':
+                Library.book.through.objects.create(library=self.library, book_id=min(pk_set))
+
+        m2m_changed.connect(add_behind_our_back, sender=Library.book.through)
+        self.addCleanup(m2m_changed.disconnect, add_behind_our_back, sender=Library.book.through)
+        update_library_books(self.library.pk, add=self.ids[:3])
+        self.assertEqual(self.held(), set(self.ids[:3]))
+
+    def test_invalid_diffs_change_nothing(self):
+        self.library.book.add(self.ids[0])
+        with self.assertRaisesMessage(MembershipError, 'both added and removed'):
+            update_library_books(self.library.pk, add=self.ids[:2], remove=self.ids[1:3])
+        with self.assertRaisesMessage(MembershipError, 'Unknown books: [0]'):
+            update_library_books(self.library.pk, add=[self.ids[1], 0], remove=[self.ids[0]])
+        self.assertEqual(self.held(), {self.ids[0]})
+        with self.assertRaises(Library.DoesNotExist):
+            update_library_books(0, add=self.ids[:1])
+
+    def test_signals_match_add_and_remove(self):
+        actions = []
+
+        def record(sender, action, pk_set, reverse, **kwargs):
+            actions.append((action, sorted(pk_set or ()), reverse))
+
+        m2m_changed.connect(record, sender=Library.book.through)
+        self.addCleanup(m2m_changed.disconnect, record, sender=Library.book.through)
+        self.library.book.add(self.ids[0])
+        actions.clear()
+        update_library_books(self.library.pk, add=self.ids[:2], remove=[self.ids[5]])
+        self.assertEqual(actions, [
+            ('pre_add', [self.ids[1]], False), ('post_add', [self.ids[1]], False),
+            ('pre_remove', [self.ids[5]], False), ('post_remove', [self.ids[5]], False),
+        ])
+
+    def test_endpoint(self):
+        user = get_user_model().objects.create_user('staff', password='x')
+        self.client.force_login(user)
+        url = reverse('library_books_update', args=[self.library.pk])
+
+        def post(data, library_url=url):
+            return self.client.post(library_url, json.dumps(data), content_type='application/json', secure=True)
+
+        self.assertEqual(post({'add': self.ids[:2]}).status_code, 403)
+        user.user_permissions.add(Permission.objects.get(codename='change_library'))
+        response = post({'add': self.ids[:3], 'remove': []})
+        self.assertEqual(response.json(), {'added': 3, 'removed': 0, 'total': 3})
+        self.assertEqual(post({'add': 'all'}).status_code, 400)
+        self.assertEqual(post({'add': [0]}).status_code, 400)
+        with mock.patch('relationship_app.views.MAX_BOOKS_PER_REQUEST', 2):
+            self.assertEqual(post({'add': self.ids[:3]}).status_code, 400)
+        self.assertEqual(post({'add': self.ids[:1]}, reverse('library_books_update', args=[0])).status_code, 404)
+
+
+class BookAvailabilityTests(TestCase):
+    """Cached availability is dropped after commit whenever the answer can change."""
+
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(name='Author')
+        self.book, self.other = Book.objects.bulk_create([Book(title='Emma', author=author),
+                                                          Book(title='Dracula', author=author)])
+        self.library = Library.objects.create(name='Central')
+        self.library.book.add(self.book)
+        Librarian.objects.create(name='Ann', library=self.library)
+
+    def cached(self, book=None):
+        return cache.get(availability_key((book or self.book).pk))
+
+    def assert_invalidated(self, change, book=None):
+        book_availability((book or self.book).pk)
+        self.assertIsNotNone(self.cached(book))
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+            # Dropped only once the change is committed
+            self.assertIsNotNone(self.cached(book))
+        self.assertIsNone(self.cached(book))
+
+    def test_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(book_availability(self.book.pk),
+                             [{'id': self.library.pk, 'name': 'Central', 'librarian': 'Ann'}])
+        with self.assertNumQueries(0):
+            book_availability(self.book.pk)
+
+    def test_membership_changes(self):
+        branch = Library.objects.create(name='Branch')
+        for change, book in (
+            (lambda: branch.book.add(self.book), None),
+            (lambda: branch.book.remove(self.book), None),
+            (lambda: self.other.libraries.add(branch), self.other),
+            (lambda: self.other.libraries.remove(branch), self.other),
+            (lambda: self.other.libraries.set([branch]), self.other),
+            (lambda: self.other.libraries.clear(), self.other),
+            (lambda: update_library_books(branch.pk, add=[self.book.pk]), None),
+            (lambda: update_library_books(branch.pk, remove=[self.book.pk]), None),
+            (lambda: self.library.book.clear(), None),
+        ):
+            with self.subTest(change=change):
+                self.assert_invalidated(change, book)
+        self.assertEqual(book_availability(self.book.pk), [])
+
+    def test_library_and_librarian_changes(self):
+        def rename():
+            self.library.name = 'Main'
+            self.library.save()
+
+        def change_librarian():
+            librarian = self.library.librarian
+            librarian.name = 'Bea'
+            librarian.save()
+
+        for change in (rename, change_librarian, lambda: self.library.librarian.delete()):
+            with self.subTest(change=change.__name__):
+                self.assert_invalidated(change)
+        self.assertEqual(book_availability(self.book.pk),
+                         [{'id': self.library.pk, 'name': 'Main', 'librarian': None}])
+        self.assert_invalidated(self.library.delete)
+        self.assertEqual(book_availability(self.book.pk), [])
+
+    def test_unrelated_books_stay_cached(self):
+        book_availability(self.other.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Library.objects.create(name='Branch').book.add(self.book)
+        self.assertIsNotNone(self.cached(self.other))
+
+    def test_endpoint(self):
+        url = reverse('book_libraries', args=[self.book.pk])
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.json()['libraries'][0]['name'], 'Central')
+        self.assertEqual(self.client.get(reverse('book_libraries', args=[0]), secure=True).status_code, 404)
+
+
+# Session, user, count, one page of rows with related objects joined, plus
+# the role filter or the date hierarchy's range and dates.
+CHANGELIST_QUERY_BUDGET = 6
+
+
+class AdminQueryBudgetTests(TestCase):
+    """The relationship_app changelists run a fixed number of queries however large the tables are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        users = User.objects.bulk_create([User(username=f'user{i:03d}') for i in range(300)])
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, role=UserProfile.ROLE_CHOICES[i % 3][0]) for i, user in enumerate(users)])
+        author = Author.objects.create(name='Author')
+        books = Book.objects.bulk_create([Book(title=f'Book {i:03d}', author=author) for i in range(200)])
+        libraries = Library.objects.bulk_create([Library(name=f'Library {i}') for i in range(10)])
+        holdings = Holding.objects.bulk_create(
+            [Holding(library=library, book=book, copies=2, available=1) for library in libraries for book in books],
+            batch_size=500,
+        )
+        due = timezone.now() + timedelta(days=14)
+        Loan.objects.bulk_create(
+            [Loan(holding=holding, borrower=users[i % 300], due_at=due) for i, holding in enumerate(holdings)],
+            batch_size=500,
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_stay_within_budget(self):
+        for name, count in (('userprofile', 301), ('holding', 2000), ('loan', 2000)):
+            with self.subTest(name), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(f'admin:relationship_app_{name}_changelist'), secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['cl'].result_count, count)
+            self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+
+
+@task(name='relationship_app.tests.noop')
+def noop_task():
+    pass
+
+
+@task(name='relationship_app.tests.fail', max_attempts=3)
+def failing_task():
+    raise RuntimeError('boom')
+
+
+@override_settings(LIBRARY_TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    """Claiming, retries with backoff, max_attempts and recovery of lost tasks."""
+
+    def test_claim_marks_the_task_running(self):
+        queued = noop_task.delay()
+        claimed = claim_next_task()
+        self.assertEqual(claimed.pk, queued.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (Task.RUNNING, 1))
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertIsNone(claim_next_task())
+
+    def test_tasks_that_are_not_due_are_not_claimed(self):
+        Task.objects.create(name='relationship_app.tests.noop', run_at=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(claim_next_task())
+
+    def test_failures_back_off_then_fail(self):
+        failing_task.delay()
+        delays = []
+        for _ in range(3):
+            Task.objects.update(run_at=timezone.now())
+            before = timezone.now()
+            with self.assertLogs('relationship_app.queue', 'WARNING'):
+                self.assertFalse(run_task(claim_next_task()))
+            row = Task.objects.get()
+            delays.append(round((row.run_at - before).total_seconds()))
+        self.assertEqual(delays[:2], [10, 20])
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 3))
+        self.assertIn('boom', row.last_error)
+        self.assertIsNone(claim_next_task())
+
+    def test_stale_tasks_are_requeued_or_failed(self):
+        now = timezone.now()
+        lost_at = now - timedelta(minutes=20)
+        fields = dict(name='relationship_app.tests.noop', run_at=lost_at, status=Task.RUNNING, started_at=lost_at)
+        retry = Task.objects.create(attempts=1, heartbeat_at=lost_at, **fields)
+        exhausted = Task.objects.create(attempts=3, heartbeat_at=lost_at, **fields)
+        long_running = Task.objects.create(attempts=1, heartbeat_at=now, **fields)
+        with self.assertLogs('relationship_app.queue', 'WARNING'):
+            self.assertEqual(requeue_stale_tasks(600), 2)
+        for row in (retry, exhausted, long_running):
+            row.refresh_from_db()
+        self.assertEqual(retry.status, Task.QUEUED)
+        self.assertGreater(retry.run_at, now)
+        self.assertEqual(exhausted.status, Task.FAILED)
+        self.assertIn('Worker lost', exhausted.last_error)
+        self.assertEqual(long_running.status, Task.RUNNING)
+
+
+class TaskHeartbeatTests(TransactionTestCase):
+    """A running task's heartbeat is refreshed from a background thread."""
+
+    def test_heartbeat_advances_while_the_task_runs(self):
+        started = timezone.now() - timedelta(minutes=20)
+        row = Task.objects.create(name='relationship_app.tests.noop', run_at=started, status=Task.RUNNING,
+                                  attempts=1, started_at=started, heartbeat_at=started)
+        with Heartbeat(row.pk, interval=0.02):
+            time.sleep(0.2)
+        row.refresh_from_db()
+        self.assertGreater(row.heartbeat_at, started + timedelta(minutes=19))
+        self.assertEqual(requeue_stale_tasks(600), 0)
@@ -8,6 +8,9 @@ from django.contrib.auth.views import LoginView, LogoutView
 urlpatterns = [
     path('books/', list_books, name='list_books'),
     path('library/<int:pk>/', LibraryDetailView.as_view(), name='library_detail'),
+    path('library/<int:pk>/books/', views.library_books_update, name='library_books_update'),
+    path('library/<int:pk>/books/<int:book_id>/checkout/', views.checkout_book, name='checkout_book'),
+    path('loans/<int:loan_id>/return/', views.return_book, name='return_book'),
     path('register/', views.register_view, name='register'),
     path('login/', LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', LogoutView.as_view(template_name='logout.html'), name='logout'),
@@ -17,6 +20,7 @@ urlpatterns = [
     path('books/add/', add_book, name='add_book'),
     path('books/<int:book_id>/edit/', edit_book, name='edit_book'),
     path('books/<int:book_id>/delete/', delete_book, name='delete_book'),
+    path('books/<int:book_id>/libraries/', views.book_libraries, name='book_libraries'),
     # Explicit paths for auto-check compliance
     path('add_book/', add_book, name='add_book_explicit'),
     path('edit_book/', edit_book, {'book_id': 1}, name='edit_book_explicit'),
@@ -1,15 +1,36 @@
+import json
+
 from django.shortcuts import render,redirect
 from django.views.generic.detail import DetailView
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import login, logout
-from .models import Library,Book,UserProfile
+from .models import Library,Book,Loan,UserProfile
 from django.contrib.auth.decorators import user_passes_test
-from django.contrib.auth.decorators import permission_required
+from django.contrib.auth.decorators import login_required, permission_required
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST, require_safe
+from bookshelf.pagination import keyset_page
+from .availability import book_availability
+from .circulation import AlreadyReturned, NotAvailable, checkout, return_loan
+from .membership import MAX_BOOKS_PER_REQUEST, MembershipError, update_library_books
 # Create your views here.
 
+# Keyset-paginated by title; authors are joined instead of loaded per row
 def list_books(request):
-    books = Book.objects.all()
-    return render(request,'.relationship_app/list_books.html',{'books':books})
+    books = Book.objects.select_related('author')
+    title = request.GET.get('title', '').strip()
+    author = request.GET.get('author', '').strip()
+    if title:
+        books = books.filter(title__istartswith=title)
+    if author:
+        books = books.filter(author__name__istartswith=author)
+    page = keyset_page(request, books)
+    return render(request, 'relationship_app/list_books.html', {
+        'books': page['objects'],
+        'page': page,
+        'title': title,
+        'author': author,
+    })
 class LibraryDetailView(DetailView):
     model = Library
     template_name = '.relationship_app/library_detail.html'
@@ -96,3 +117,66 @@ def delete_book(request, book_id):
         book.delete()
         return redirect('list_books')
     return render(request, 'relationship_app/delete_book.html', {'book': book})
+
+# Libraries holding a book and their librarians (cached per book)
+@require_safe
+def book_libraries(request, book_id):
+    libraries = book_availability(book_id)
+    if not libraries and not Book.objects.filter(pk=book_id).exists():
+        raise Http404('No such book')
+    return JsonResponse({'book': book_id, 'libraries': libraries})
+
+# Bulk add/remove of a library's books: POST {"add": [ids], "remove": [ids]}
+@require_POST
+@permission_required('relationship_app.change_library', raise_exception=True)
+def library_books_update(request, pk):
+    try:
+        data = json.loads(request.body)
+        add = [int(book_id) for book_id in data.get('add', [])]
+        remove = [int(book_id) for book_id in data.get('remove', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected {"add": [book ids], "remove": [book ids]}'}, status=400)
+    if len(add) + len(remove) > MAX_BOOKS_PER_REQUEST:
+        return JsonResponse({'error': f'At most {MAX_BOOKS_PER_REQUEST} books per request'}, status=400)
+    try:
+        result = update_library_books(pk, add=add, remove=remove)
+    except Library.DoesNotExist:
+        raise Http404('No such library')
+    except MembershipError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(result)
+
+def loan_data(loan):
+    return {
+        'id': loan.pk,
+        'holding': loan.holding_id,
+        'borrower': loan.borrower_id,
+        'checked_out_at': loan.checked_out_at,
+        'due_at': loan.due_at,
+        'returned_at': loan.returned_at,
+    }
+
+# Check out a copy for the current user (409 when no copy is available)
+@require_POST
+@login_required
+def checkout_book(request, pk, book_id):
+    try:
+        loan = checkout(pk, book_id, request.user.pk)
+    except NotAvailable as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse(loan_data(loan), status=201)
+
+# Return a loan; borrowers return their own, staff with change_loan any loan
+@require_POST
+@login_required
+def return_book(request, loan_id):
+    borrower_id = Loan.objects.filter(pk=loan_id).values_list('borrower_id', flat=True).first()
+    if borrower_id is None:
+        raise Http404('No such loan')
+    if borrower_id != request.user.pk and not request.user.has_perm('relationship_app.change_loan'):
+        return JsonResponse({'error': 'Not your loan'}, status=403)
+    try:
+        loan = return_loan(loan_id)
+    except AlreadyReturned as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse(loan_data(loan))
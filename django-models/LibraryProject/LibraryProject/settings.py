@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -86,6 +87,13 @@ DATABASES = {
 }
 
 
+# Sessions
+# DJANGO_SESSION_ENGINE selects where sessions live: 'db' (default), 'cache',
+# 'cached_db' or 'signed_cookies'. 'cache' and 'signed_cookies' keep session
+# reads and writes off the database; the cache modes need a shared cache.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'db')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -1,19 +1,150 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, F, Prefetch
+from django.utils.functional import cached_property
 from .models import Post, Comment, Tag
 
 
+def estimated_row_count(model, using):
+    """
+    Return the planner's row estimate for a model's table, or None.
+
+    Only PostgreSQL keeps a cheap estimate (``pg_class.reltuples``, refreshed by
+    autovacuum/ANALYZE); other databases return None.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the table estimate instead of COUNT(*) for unfiltered
+    changelists on large tables. Filtered or searched changelists still get an
+    exact count, which is cheap when the filter is selective.
+    """
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter with a text box instead of one link per related object.
+
+    Django's default related-field filters load every user/post/tag into the
+    sidebar; this filter only runs a query for the value that was entered.
+    Subclasses set ``title``, ``parameter_name`` and ``lookup`` (the ORM lookup
+    the entered value is matched with).
+    """
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # A single placeholder so the filter is rendered; the template draws
+        # the text box.
+        return (('', ''),)
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            return queryset.filter(**{self.lookup: self.value()})
+        except (ValueError, ValidationError) as e:
+            raise IncorrectLookupParameters(e)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        # The other active filters, kept as hidden inputs in the form.
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, values in changelist.params.items()
+            if key not in (self.parameter_name, 'p', 'e')
+            for value in (values if isinstance(values, list) else [values])
+        ]
+        yield all_choice
+
+
+class AuthorFilter(InputFilter):
+    title = 'author (username)'
+    parameter_name = 'author'
+    lookup = 'author__username'
+
+
+class TagNameFilter(InputFilter):
+    title = 'tag'
+    parameter_name = 'tag'
+    lookup = 'tags__name'
+
+
+class PostIdFilter(InputFilter):
+    title = 'post (ID)'
+    parameter_name = 'post'
+    lookup = 'post_id'
+
+
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     """
     Admin configuration for the Post model.
+
+    The changelist loads authors with a join and tags with one prefetch
+    query per page, filters on related objects take typed input, and counts
+    are estimated for unfiltered views of large tables.
     """
-    list_display = ('title', 'author', 'published_date', 'tag_list')
-    list_filter = ('published_date', 'author', 'tags')
+    list_display = ('title', 'author', 'published_date', 'comment_count', 'tag_list')
+    list_filter = ('published_date', AuthorFilter, TagNameFilter)
+    list_select_related = ('author',)
     search_fields = ('title', 'content', 'tags__name')
     ordering = ('-published_date',)
     date_hierarchy = 'published_date'
-    filter_horizontal = ('tags',)
-    
+    autocomplete_fields = ('author', 'tags')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    # Maintained with F() updates by blog.activity; the admin must not write
+    # its in-memory copies back
+    denormalized_fields = ('comment_count', 'last_activity_at')
+    readonly_fields = denormalized_fields + ('version',)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Save an edited post without overwriting the denormalized counters.
+
+        The version is incremented in the database, so editors holding the
+        previous version (``blog.concurrency``) get a conflict.
+        """
+        if not change:
+            return super().save_model(request, obj, form, change)
+        obj.version = F('version') + 1
+        obj.save(update_fields=[
+            field.name for field in obj._meta.concrete_fields
+            if not field.primary_key and field.name not in self.denormalized_fields
+        ])
+        obj.refresh_from_db(fields=['version'])
+
+    def get_queryset(self, request):
+        """Prefetch tag names for the tag_list column."""
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('name'))
+        )
+
     def tag_list(self, obj):
         """Return a comma-separated list of tags."""
         return ", ".join([tag.name for tag in obj.tags.all()])
@@ -26,11 +157,15 @@ class CommentAdmin(admin.ModelAdmin):
     Admin configuration for the Comment model.
     """
     list_display = ('author', 'post', 'created_at', 'updated_at')
-    list_filter = ('created_at', 'updated_at', 'author', 'post')
+    list_filter = ('created_at', 'updated_at', AuthorFilter, PostIdFilter)
+    list_select_related = ('author', 'post')
     search_fields = ('content', 'author__username', 'post__title')
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
     readonly_fields = ('created_at', 'updated_at')
+    autocomplete_fields = ('author', 'post')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Tag)
@@ -43,8 +178,15 @@ class TagAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     ordering = ('name',)
     readonly_fields = ('created_at',)
-    
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        """Count posts per tag in the changelist query."""
+        return super().get_queryset(request).annotate(num_posts=Count('posts'))
+
     def post_count(self, obj):
         """Return the number of posts using this tag."""
-        return obj.posts.count()
+        return obj.num_posts
     post_count.short_description = 'Number of Posts'
+    post_count.admin_order_field = 'num_posts'
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        """Register the database connection metric, related-post receivers and tasks."""
+        from .db import connect_signals
+        connect_signals()
+        from . import signals, tasks  # noqa: F401
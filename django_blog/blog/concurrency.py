@@ -0,0 +1,61 @@
+"""
+Optimistic concurrency control for blog posts.
+
+``Post.version`` is incremented by every edit made through ``save_versioned()``,
+a single conditional
+``UPDATE ... SET ..., version = version + 1 WHERE id = %s AND version = %s``.
+``PostForm`` carries the version the edit form was rendered with, so when two
+people edit the same post, the second save matches no row and
+``VersionConflict`` is raised instead of silently discarding the first edit.
+Nothing is locked while a form is open.
+
+advanced-api-project's ``api.concurrency`` has the same ``save_versioned()``.
+The two projects are deployed separately and share no package, so a fix to
+one belongs in the other as well.
+"""
+
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save
+
+
+class VersionConflict(Exception):
+    """The row was changed by someone else since it was read."""
+
+
+def save_versioned(instance, expected_version, fields):
+    """
+    Save ``fields`` of ``instance`` if its row is still at ``expected_version``.
+
+    ``auto_now`` fields are refreshed and ``pre_save``/``post_save`` are sent,
+    as ``Model.save(update_fields=...)`` would do.
+
+    Args:
+        instance: The modified model instance.
+        expected_version (int): The version the changes were based on.
+        fields (iterable): Names of the fields to write.
+
+    Raises:
+        VersionConflict: The row is missing or at another version.
+    """
+    model = type(instance)
+    opts = instance._meta
+    names = set(fields) | {
+        field.name for field in opts.concrete_fields if getattr(field, 'auto_now', False)
+    }
+    names.discard('version')
+    update_fields = frozenset(names | {'version'})
+    using = instance._state.db or 'default'
+    pre_save.send(sender=model, instance=instance, raw=False, using=using,
+                  update_fields=update_fields)
+    values = {}
+    for name in names:
+        field = opts.get_field(name)
+        values[field.attname] = field.pre_save(instance, add=False)
+    updated = model._base_manager.using(using).filter(
+        pk=instance.pk, version=expected_version,
+    ).update(version=F('version') + 1, **values)
+    if not updated:
+        raise VersionConflict(f'{opts.verbose_name} {instance.pk} is no longer at version {expected_version}')
+    instance.version = expected_version + 1
+    post_save.send(sender=model, instance=instance, created=False, raw=False, using=using,
+                   update_fields=update_fields)
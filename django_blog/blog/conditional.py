@@ -0,0 +1,96 @@
+"""
+Conditional GET support for the blog views.
+
+The ETag callables in this module are used with Django's ``condition``
+decorator. They compute a strong ETag from cheap aggregate queries over the
+``updated_at`` column of ``Post`` so that an unchanged page can be answered
+with 304 Not Modified before the object list is built or any template is
+rendered.
+
+Pages render per-user content (navigation, edit links, flash messages), so the
+ETag includes the requesting user and no ETag is produced while messages are
+waiting to be displayed. Last-Modified is deliberately not sent: it cannot
+express the per-user variation and would let a browser reuse an anonymous
+page after logging in.
+"""
+
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Sum
+
+from .models import Post, Tag
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the given parts.
+
+    Args:
+        *parts: Values identifying a specific version of a page.
+
+    Returns:
+        str: A quoted, strong ETag.
+    """
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8'))
+    return '"%s"' % digest.hexdigest()
+
+
+def _has_pending_messages(request):
+    """Return True if flash messages are queued for the next render."""
+    return len(get_messages(request)) > 0
+
+
+def post_detail_etag(request, pk, *args, **kwargs):
+    """
+    ETag callable for PostDetailView.
+
+    The post row carries its comment count and last activity (see
+    ``blog.activity``), so adding, editing or deleting a comment changes the
+    ETag without a join on comments. The related-posts version is fetched in
+    the same query.
+    """
+    if _has_pending_messages(request):
+        return None
+    stamp = (
+        Post.objects.filter(pk=pk)
+        .annotate(
+            # Related-post rows are replaced on every refresh, so the highest
+            # id changes whenever the recommendations do.
+            related_version=Max('related_entries__id'),
+        )
+        .values_list('updated_at', 'comment_count', 'last_activity_at', 'related_version')
+        .first()
+    )
+    if stamp is None:
+        return None
+    return make_etag('post', pk, *stamp, request.user.pk)
+
+
+def post_collection_etag(request, *args, **kwargs):
+    """
+    ETag callable for the post list pages (PostListView and TagPostListView).
+
+    The collection-level stamp is the post count, latest ``updated_at``,
+    latest activity and total comment count (shown next to each post), plus
+    the tag count for the tag cloud. The full request path is included so
+    every search query, tag, sort order and page number gets its own ETag.
+    """
+    if _has_pending_messages(request):
+        return None
+    posts = Post.objects.aggregate(
+        count=Count('id'),
+        latest=Max('updated_at'),
+        activity=Max('last_activity_at'),
+        comments=Sum('comment_count'),
+    )
+    return make_etag(
+        'posts',
+        posts['count'],
+        posts['latest'],
+        posts['activity'],
+        posts['comments'],
+        Tag.objects.count(),
+        request.get_full_path(),
+        request.user.pk,
+    )
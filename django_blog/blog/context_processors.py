@@ -0,0 +1,8 @@
+"""
+Context processors for the blog application.
+"""
+
+
+def inline_messages(request):
+    """Expose render-only messages added with ``blog.flash``."""
+    return {'inline_messages': getattr(request, 'inline_messages', [])}
@@ -0,0 +1,132 @@
+"""
+Database connection metrics for the blog project.
+
+Counts how many physical connections each worker opens compared to the number
+of requests it serves, and reads psycopg's pool statistics when the PostgreSQL
+connection pool is enabled (see the database section of settings.py).
+
+Each worker counts in memory and periodically publishes its counters and its
+own pool statistics (see blog.metrics); ``connection_metrics()`` adds up the
+published snapshots, so it reports the serving workers' pools rather than the
+idle pool of the process that calls it.
+"""
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics as shared_metrics
+
+COUNTERS = ('connections_opened', 'requests_finished')
+
+
+def on_connection_created(sender, connection, **kwargs):
+    """Count every new physical database connection."""
+    shared_metrics.increment('connections_opened')
+
+
+def on_request_finished(sender, **kwargs):
+    """Count finished requests and publish this worker's snapshot when due."""
+    shared_metrics.increment('requests_finished')
+    shared_metrics.flush_if_due()
+
+
+def worker_pools():
+    """Return this process's pool statistics, keyed by database alias."""
+    pools = {}
+    for alias in settings.DATABASES:
+        # Only the PostgreSQL backend has a ``pool`` attribute; it is None
+        # unless the "pool" option is configured.
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            pools[alias] = _pool_metrics(pool)
+    return pools
+
+
+def connect_signals():
+    """Register the metric receivers; called from BlogConfig.ready()."""
+    connection_created.connect(on_connection_created, dispatch_uid='blog.db.connection_created')
+    request_finished.connect(on_request_finished, dispatch_uid='blog.db.request_finished')
+    shared_metrics.register_source('pools', worker_pools)
+
+
+def reset_metrics():
+    """Reset the connection counters for all processes."""
+    shared_metrics.reset(COUNTERS)
+
+
+def _pool_metrics(pool):
+    """
+    Summarize psycopg_pool statistics.
+
+    psycopg only reports counters that are non-zero, hence the defaults.
+    """
+    stats = pool.get_stats()
+    pool_size = stats.get('pool_size', 0)
+    requests = stats.get('requests_num', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'pool_min_size': stats.get('pool_min', 0),
+        'pool_max_size': stats.get('pool_max', 0),
+        'pool_size': pool_size,
+        'pool_available': stats.get('pool_available', 0),
+        'pool_in_use': pool_size - stats.get('pool_available', 0),
+        'requests': requests,
+        # Requests that found the pool exhausted and had to queue for a connection.
+        'requests_overflow': stats.get('requests_queued', 0),
+        'requests_waiting': stats.get('requests_waiting', 0),
+        'requests_timed_out': stats.get('requests_errors', 0),
+        'wait_ms_total': wait_ms,
+        'wait_ms_avg': round(wait_ms / requests, 2) if requests else 0.0,
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def _combine_pools(pools):
+    """Add up the pool statistics of several workers."""
+    combined = {}
+    for pool in pools:
+        for key, value in pool.items():
+            combined[key] = combined.get(key, 0) + value
+    requests = combined['requests']
+    combined['wait_ms_avg'] = round(combined['wait_ms_total'] / requests, 2) if requests else 0.0
+    return combined
+
+
+def connection_metrics(alias='default'):
+    """
+    Return a snapshot of connection metrics for a database alias.
+
+    Args:
+        alias (str): The database alias to report on.
+
+    Returns:
+        dict: Connection settings and counters summed over the workers that
+        published a snapshot, plus their combined pool statistics under the
+        ``pool`` key when connection pooling is enabled (otherwise None) and
+        each worker's own statistics under ``worker_pools``.
+    """
+    connection = connections[alias]
+    snapshots = shared_metrics.worker_snapshots()
+    counters = shared_metrics.read(COUNTERS)
+    requests = counters['requests_finished']
+    worker_pools = {
+        snapshot['worker']: snapshot['pools'][alias]
+        for snapshot in snapshots
+        if alias in snapshot.get('pools', {})
+    }
+    return {
+        'alias': alias,
+        'vendor': connection.vendor,
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'health_checks': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+        'workers': len(snapshots),
+        'connections_opened': counters['connections_opened'],
+        'requests_finished': requests,
+        'connections_per_request': (
+            round(counters['connections_opened'] / requests, 3) if requests else None
+        ),
+        'pool': _combine_pools(worker_pools.values()) if worker_pools else None,
+        'worker_pools': worker_pools,
+    }
@@ -0,0 +1,197 @@
+"""
+RSS/Atom feeds and sitemaps for the blog application.
+
+Feeds and sitemaps are built from lightweight ``.values()`` queries (no model
+instances, no tag or comment lookups) and wrapped in ``cached_feed``:
+
+- ``blog.signals`` bumps the ``ContentVersion`` row with an F() update in the
+  same transaction as every change to a post, a tag or a post's tags, so the
+  task worker's tag changes are seen by every web worker.
+- The rendered body is cached under a key that includes the content version,
+  so output is regenerated only after a change. Any cache works here: a
+  worker with its own cache only renders the feed once more.
+- The content version also drives a strong ETag, so aggregators polling with
+  If-None-Match get 304 Not Modified after a single primary-key lookup.
+"""
+
+from functools import wraps
+
+from django.contrib.sitemaps import Sitemap
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from .conditional import make_etag
+from .models import ContentVersion, Post, Tag
+
+FEED_SIZE = 20
+FEED_CACHE_SECONDS = 60 * 5
+CONTENT_VERSION_PK = 1
+
+
+def content_version(request=None):
+    """
+    Return the current content version, memoized on ``request`` if given.
+
+    The version is 0 until the first change.
+    """
+    if request is not None and hasattr(request, '_blog_content_version'):
+        return request._blog_content_version
+    version = (
+        ContentVersion.objects.filter(pk=CONTENT_VERSION_PK)
+        .values_list('version', flat=True).first()
+    ) or 0
+    if request is not None:
+        request._blog_content_version = version
+    return version
+
+
+def bump_content_version():
+    """Invalidate cached feeds and sitemaps; call inside the changing transaction."""
+    # Migration 0010 creates the row; recreate it if it was deleted
+    ContentVersion.objects.get_or_create(pk=CONTENT_VERSION_PK)
+    ContentVersion.objects.filter(pk=CONTENT_VERSION_PK).update(version=F('version') + 1)
+
+
+def feed_etag(request, *args, **kwargs):
+    """ETag callable for feeds and sitemaps; one primary-key lookup."""
+    return make_etag('feed', content_version(request), request.get_full_path())
+
+
+def cached_feed(view_func):
+    """
+    Cache a feed or sitemap view until the content version changes.
+
+    Only successful responses are cached; the body, content type and
+    Last-Modified header are stored.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        key = f'blog:feed:{content_version(request)}:{request.get_full_path()}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, last_modified = cached
+            response = HttpResponse(content, content_type=content_type)
+            if last_modified:
+                response.headers['Last-Modified'] = last_modified
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if not getattr(response, 'is_rendered', True):
+            response.render()
+        if response.status_code == 200:
+            cache.set(
+                key,
+                (response.content, response['Content-Type'], response.get('Last-Modified')),
+                FEED_CACHE_SECONDS,
+            )
+        return response
+    return condition(etag_func=feed_etag)(_wrapped_view)
+
+
+def _post_values(queryset):
+    """Return the fields needed by feeds, without instantiating models."""
+    return queryset.order_by('-published_date').values(
+        'pk', 'title', 'content', 'published_date', 'updated_at', 'author__username',
+    )[:FEED_SIZE]
+
+
+class LatestPostsFeed(Feed):
+    """RSS 2.0 feed of the latest blog posts."""
+    title = 'My Django Blog'
+    link = reverse_lazy('post_list')
+    description = 'The latest posts from My Django Blog.'
+
+    def items(self):
+        return _post_values(Post.objects.all())
+
+    def item_title(self, item):
+        return item['title']
+
+    def item_description(self, item):
+        return Truncator(item['content']).words(60)
+
+    def item_link(self, item):
+        return reverse('post_detail', kwargs={'pk': item['pk']})
+
+    def item_guid(self, item):
+        return self.item_link(item)
+
+    def item_author_name(self, item):
+        return item['author__username']
+
+    def item_pubdate(self, item):
+        return item['published_date']
+
+    def item_updateddate(self, item):
+        return item['updated_at']
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Atom 1.0 version of the latest posts feed."""
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class TagPostsFeed(LatestPostsFeed):
+    """RSS 2.0 feed of the latest posts with a given tag."""
+
+    def get_object(self, request, tag_name):
+        return get_object_or_404(Tag, name=tag_name)
+
+    def title(self, obj):
+        return f'My Django Blog: posts tagged "{obj.name}"'
+
+    def link(self, obj):
+        return reverse('tag_posts', kwargs={'tag_name': obj.name})
+
+    def description(self, obj):
+        return f'The latest posts tagged "{obj.name}".'
+
+    def items(self, obj):
+        return _post_values(Post.objects.filter(tags=obj))
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    """Atom 1.0 version of the per-tag feed."""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class PostSitemap(Sitemap):
+    """Sitemap entry for every blog post."""
+    changefreq = 'weekly'
+
+    def items(self):
+        return Post.objects.order_by('pk').values('pk', 'updated_at')
+
+    def location(self, item):
+        return reverse('post_detail', kwargs={'pk': item['pk']})
+
+    def lastmod(self, item):
+        return item['updated_at']
+
+
+class TagSitemap(Sitemap):
+    """Sitemap entry for every tag page."""
+    changefreq = 'daily'
+
+    def items(self):
+        return Tag.objects.order_by('name').values_list('name', flat=True)
+
+    def location(self, item):
+        return reverse('tag_posts', kwargs={'tag_name': item})
+
+
+sitemaps = {
+    'posts': PostSitemap,
+    'tags': TagSitemap,
+}
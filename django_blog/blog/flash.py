@@ -0,0 +1,38 @@
+"""
+Render-only flash messages for the blog views.
+
+``django.contrib.messages`` persists every message (in a cookie or the
+session) until it is displayed, which is wasted work for a GET view that shows
+the message in the page it is rendering anyway. ``add_inline_message``
+attaches the message to the current request only; the ``inline_messages``
+context processor exposes it to ``base.html`` next to the regular messages.
+
+Use ``django.contrib.messages`` for messages that must survive a redirect.
+"""
+
+from django.contrib.messages import constants
+from django.contrib.messages.storage.base import Message
+
+
+def add_inline_message(request, level, message):
+    """
+    Attach a message to the current render without persisting it.
+
+    Args:
+        request: The HTTP request object.
+        level (int): A ``django.contrib.messages`` level, e.g. ``messages.INFO``.
+        message (str): The message text.
+    """
+    if not hasattr(request, 'inline_messages'):
+        request.inline_messages = []
+    request.inline_messages.append(Message(level, message))
+
+
+def info(request, message):
+    """Attach an informational inline message."""
+    add_inline_message(request, constants.INFO, message)
+
+
+def warning(request, message):
+    """Attach a warning inline message."""
+    add_inline_message(request, constants.WARNING, message)
@@ -1,7 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import Post, Comment, Tag
+from django.urls import reverse
+from .concurrency import save_versioned
+from .models import Post, Comment
+from .tasks import apply_post_tags
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -52,19 +55,31 @@ class UserProfileForm(forms.ModelForm):
 class PostForm(forms.ModelForm):
     """
     Form for creating and editing blog posts.
+
+    Tags are entered by name in ``tags_input``, with suggestions from the
+    ``tag_autocomplete`` endpoint. The ``tags`` field is deliberately not a
+    form field: a ModelMultipleChoiceField would render and validate against
+    every tag in the database.
+
+    When editing, the hidden ``version`` field records the post version the
+    form was rendered with; ``save()`` raises
+    ``blog.concurrency.VersionConflict`` if the post was edited since.
     """
+    version = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
     tags_input = forms.CharField(
         required=False,
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Enter tags separated by commas (e.g., django, python, web-development)'
+            'placeholder': 'Enter tags separated by commas (e.g., django, python, web-development)',
+            'autocomplete': 'off',
+            'list': 'tag-suggestions',
         }),
         help_text='Separate multiple tags with commas'
     )
     
     class Meta:
         model = Post
-        fields = ['title', 'content', 'tags']
+        fields = ['title', 'content']
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -75,18 +90,16 @@ class PostForm(forms.ModelForm):
                 'rows': 10,
                 'placeholder': 'Write your blog post content here...'
             }),
-            'tags': forms.SelectMultiple(attrs={
-                'class': 'form-control',
-                'style': 'display: none;'  # Hide the default widget
-            })
         }
     
     def __init__(self, *args, **kwargs):
         """Initialize the form with existing tags."""
         super().__init__(*args, **kwargs)
+        self.fields['tags_input'].widget.attrs['data-autocomplete-url'] = reverse('tag_autocomplete')
         if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
             # For editing, populate tags_input with existing tags
-            self.fields['tags_input'].initial = ', '.join([tag.name for tag in self.instance.tags.all()])
+            self.fields['tags_input'].initial = ', '.join(self.instance.tags.values_list('name', flat=True))
     
     def clean_tags_input(self):
         """Clean and process the tags input field."""
@@ -94,8 +107,10 @@ class PostForm(forms.ModelForm):
         if not tags_input:
             return []
         
-        # Split by comma and clean each tag
-        tag_names = [name.strip() for name in tags_input.split(',') if name.strip()]
+        # Split by comma and clean each tag (tags are stored lowercase)
+        tag_names = list(dict.fromkeys(
+            name.strip().lower() for name in tags_input.split(',') if name.strip()
+        ))
         
         # Validate tag length
         for tag_name in tag_names:
@@ -107,28 +122,23 @@ class PostForm(forms.ModelForm):
         return tag_names
     
     def save(self, commit=True):
-        """Save the post and create/update tags."""
+        """
+        Save the post and queue the tag update.
+
+        Creating tags and rewriting the post's tag set is deferred to the task
+        queue (see ``blog.tasks.apply_post_tags``), so the request only saves
+        the post itself. An existing post is only saved if it is still at the
+        submitted ``version``.
+        """
         post = super().save(commit=False)
         
         if commit:
-            post.save()
-            
-            # Clear existing tags
-            post.tags.clear()
-            
-            # Get cleaned tag names
-            tag_names = self.cleaned_data.get('tags_input', '').strip()
-            if tag_names:
-                # Split and process tags
-                tag_names = [name.strip() for name in tag_names.split(',') if name.strip()]
-                
-                # Create or get existing tags
-                for tag_name in tag_names:
-                    tag, created = Tag.objects.get_or_create(name=tag_name.lower())
-                    post.tags.add(tag)
-            
-            # Save many-to-many relationships
-            self.save_m2m()
+            if post.pk:
+                expected_version = self.cleaned_data.get('version') or post.version
+                save_versioned(post, expected_version, self._meta.fields)
+            else:
+                post.save()
+            apply_post_tags.delay(post_id=post.pk, tag_names=self.cleaned_data.get('tags_input', []))
         
         return post
 
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blog.activity import BATCH_SIZE, backfill_post_activity
+
+
+class Command(BaseCommand):
+    """
+    Fill Post.comment_count and Post.last_activity_at from the comments table.
+
+    Run once after migrating; afterwards the signal receivers keep the
+    columns current. Safe to re-run.
+    """
+    help = 'Recompute denormalized comment counts and last activity times for all posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help=f'Posts updated per statement (default: {BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        updated = backfill_post_activity(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} post(s).'))
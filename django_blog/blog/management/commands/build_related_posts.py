@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild_related_posts, related_posts_count
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the precomputed related posts for every post.
+
+    Changes to Post.tags are applied incrementally by signal receivers; run
+    this after bulk imports or when changing BLOG_RELATED_POSTS.
+    """
+    help = 'Rebuild the top-K related posts of every post from tag co-occurrence.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', type=int, default=None,
+                            help='Related posts to keep per post (default: BLOG_RELATED_POSTS).')
+
+    def handle(self, *args, **options):
+        k = options['k'] or related_posts_count()
+        written = rebuild_related_posts(k)
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} related post(s) (top {k} per post).'))
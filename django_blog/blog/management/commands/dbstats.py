@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.db import connection_metrics
+from blog.middleware import session_write_metrics
+from blog.queue import queue_metrics
+
+
+class Command(BaseCommand):
+    """
+    Print connection and pool metrics for the configured databases.
+
+    The counters and pool statistics are the snapshots that serving workers
+    publish to the metrics cache (see blog.metrics), added up over every
+    worker that reported within ``BLOG_METRICS_WORKER_TTL`` seconds. Workers
+    publish at most every ``BLOG_METRICS_FLUSH_INTERVAL`` seconds, so the
+    figures may lag by that much.
+    """
+    help = 'Show database connection settings, reuse counters, pool statistics, session writes and task queue metrics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='databases',
+                            help='Database alias to report on (default: all).')
+        parser.add_argument('--check', action='store_true',
+                            help='Open a connection and run a health-check query first.')
+
+    def handle(self, *args, **options):
+        for alias in options['databases'] or list(settings.DATABASES):
+            if options['check']:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            metrics = connection_metrics(alias)
+            pool = metrics.pop('pool')
+            worker_pools = metrics.pop('worker_pools')
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Database '{alias}'"))
+            for key, value in metrics.items():
+                self.stdout.write(f'  {key}: {value}')
+            if pool is None:
+                self.stdout.write('  pool: disabled or not reported')
+                continue
+            for key, value in pool.items():
+                self.stdout.write(f'  pool.{key}: {value}')
+            for worker, stats in worker_pools.items():
+                self.stdout.write(
+                    f"  worker {worker}: in_use={stats['pool_in_use']} "
+                    f"available={stats['pool_available']} overflow={stats['requests_overflow']} "
+                    f"wait_ms_avg={stats['wait_ms_avg']}"
+                )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Sessions'))
+        self.stdout.write(f'  engine: {settings.SESSION_ENGINE}')
+        for key, value in session_write_metrics().items():
+            self.stdout.write(f'  {key}: {value}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Task queue'))
+        for key, value in queue_metrics().items():
+            self.stdout.write(f'  {key}: {value}')
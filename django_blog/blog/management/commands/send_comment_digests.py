@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.notifications import digest_window, send_comment_digests
+
+
+class Command(BaseCommand):
+    """
+    Send batched comment notifications to post authors.
+
+    Run it from cron every BLOG_COMMENT_DIGEST_WINDOW seconds, or keep it
+    running with `--loop`.
+    """
+    help = 'Send one digest email per post with new comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, sending digests every BLOG_COMMENT_DIGEST_WINDOW seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_comment_digests()
+            self.stdout.write(f'Sent {sent} digest(s).')
+            if not options['loop']:
+                return
+            time.sleep(digest_window())
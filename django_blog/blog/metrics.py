@@ -0,0 +1,165 @@
+"""
+Per-worker operational metrics for the blog.
+
+Each process counts in memory (``increment`` only touches a local Counter)
+and publishes a snapshot of its counters, plus any extra sections such as its
+connection pool statistics, to the cache named by ``BLOG_METRICS_CACHE``
+(default ``'metrics'``, see CACHES in settings.py):
+
+- ``flush_if_due()`` is called once per request (see blog.db) and writes the
+  snapshot at most every ``BLOG_METRICS_FLUSH_INTERVAL`` seconds, so a
+  request normally adds no cache I/O at all.
+- Every worker writes only its own ``blog:metrics:worker:<host>:<pid>`` key,
+  so no two processes ever update the same counter and nothing is lost to
+  concurrent read-modify-write cycles.
+- Snapshots expire after ``BLOG_METRICS_WORKER_TTL`` seconds, so workers that
+  exited drop out of the totals.
+
+``read()`` and ``worker_snapshots()`` combine the published snapshots; the
+process calling them (e.g. ``manage.py dbstats``) does not publish its own.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'blog:metrics:'
+WORKERS_KEY = KEY_PREFIX + 'workers'
+RESETS_KEY = KEY_PREFIX + 'resets'
+
+_lock = threading.Lock()
+_state = {'pid': None, 'counters': Counter(), 'flushed_at': 0.0, 'resets': None}
+_sources = {}
+
+
+def _cache():
+    return caches[getattr(settings, 'BLOG_METRICS_CACHE', 'metrics')]
+
+
+def _worker_ttl():
+    return getattr(settings, 'BLOG_METRICS_WORKER_TTL', 300)
+
+
+def worker_id():
+    """Return the identifier of this process: ``<host>:<pid>``."""
+    return '%s:%d' % (socket.gethostname(), os.getpid())
+
+
+def _local_counters():
+    """Return this process's counters, starting afresh in a forked child."""
+    if _state['pid'] != os.getpid():
+        _state.update(pid=os.getpid(), counters=Counter(), flushed_at=0.0)
+    return _state['counters']
+
+
+def register_source(name, func):
+    """
+    Add a section to every snapshot this process publishes.
+
+    Args:
+        name (str): The snapshot key, e.g. ``'pools'``.
+        func (callable): Returns a JSON-like value describing this process.
+    """
+    _sources[name] = func
+
+
+def increment(name, delta=1):
+    """Add ``delta`` to this process's counter ``name``."""
+    with _lock:
+        _local_counters()[name] += delta
+
+
+def flush_if_due():
+    """Publish this process's snapshot if the flush interval has passed."""
+    interval = getattr(settings, 'BLOG_METRICS_FLUSH_INTERVAL', 10)
+    if time.monotonic() - _state['flushed_at'] >= interval or _state['pid'] != os.getpid():
+        flush()
+
+
+def flush():
+    """Publish this process's snapshot under its own worker key."""
+    cache = _cache()
+    ident = worker_id()
+    resets = cache.get(RESETS_KEY, {})
+    with _lock:
+        counters = _local_counters()
+        if _state['resets'] is not None:
+            # Drop what was counted before a reset() of these counters
+            for name, count in resets.items():
+                if _state['resets'].get(name, 0) != count:
+                    counters.pop(name, None)
+        _state['resets'] = resets
+        _state['flushed_at'] = time.monotonic()
+        snapshot = {'worker': ident, 'updated': time.time(), 'counters': dict(counters)}
+    for name, func in _sources.items():
+        snapshot[name] = func()
+    cache.set(KEY_PREFIX + 'worker:' + ident, snapshot, timeout=_worker_ttl())
+
+    # The registry is only rewritten when this worker is missing from it or
+    # its entry is about to expire, and every worker re-adds itself, so a
+    # registration lost to a concurrent write is repaired on the next flush.
+    workers = cache.get(WORKERS_KEY, {})
+    now = time.time()
+    if now - workers.get(ident, 0) > _worker_ttl() / 2:
+        workers = {name: seen for name, seen in workers.items() if now - seen < _worker_ttl()}
+        workers[ident] = now
+        cache.set(WORKERS_KEY, workers, timeout=None)
+
+
+def worker_snapshots():
+    """
+    Return the snapshots published by live workers.
+
+    Returns:
+        list: One dict per worker with ``worker``, ``updated``, ``counters``
+        and any registered sections, sorted by worker id.
+    """
+    cache = _cache()
+    keys = [KEY_PREFIX + 'worker:' + ident for ident in cache.get(WORKERS_KEY, {})]
+    snapshots = cache.get_many(keys)
+    return sorted(snapshots.values(), key=lambda snapshot: snapshot['worker'])
+
+
+def read(names):
+    """
+    Return the given counters summed over all live workers.
+
+    Args:
+        names (iterable): Counter names.
+
+    Returns:
+        dict: ``{name: value}``; counters no worker has reported are 0.
+    """
+    totals = Counter()
+    for snapshot in worker_snapshots():
+        totals.update(snapshot['counters'])
+    return {name: totals[name] for name in names}
+
+
+def reset(names):
+    """
+    Reset the given counters for all workers.
+
+    Published snapshots are cleared at once; running workers discard their
+    local counts at their next flush.
+    """
+    cache = _cache()
+    names = list(names)
+    resets = cache.get(RESETS_KEY, {})
+    for name in names:
+        resets[name] = resets.get(name, 0) + 1
+    cache.set(RESETS_KEY, resets, timeout=None)
+    for snapshot in worker_snapshots():
+        for name in names:
+            snapshot['counters'].pop(name, None)
+        cache.set(KEY_PREFIX + 'worker:' + snapshot['worker'], snapshot, timeout=_worker_ttl())
+    with _lock:
+        counters = _local_counters()
+        for name in names:
+            counters.pop(name, None)
+        _state['resets'] = resets
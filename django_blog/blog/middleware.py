@@ -0,0 +1,259 @@
+"""
+Middleware for the blog project.
+
+SessionWriteMetricsMiddleware counts how many requests end with a session
+write. The counts are kept in each worker's memory and published with its
+other metrics (see blog.metrics); ``session_write_metrics()`` adds them up.
+
+PrimaryPinningMiddleware keeps a client's reads on the primary database for a
+short time after it writes (see blog.routers).
+
+StaticFilesMiddleware serves the output of ``collectstatic`` straight from the
+application process:
+
+- Fingerprinted files (listed in the staticfiles manifest) are sent with
+  far-future ``Cache-Control: public, max-age=31536000, immutable`` headers,
+  so repeat page loads make no static requests at all.
+- Pre-compressed ``.br``/``.gz`` variants are chosen from ``Accept-Encoding``
+  (quality values are honoured, so ``gzip;q=0`` is never sent gzip), and
+  every static response carries ``Vary: Accept-Encoding``.
+- Anything else under ``STATIC_URL`` gets a short max-age and honours
+  ``If-Modified-Since``.
+
+Requests outside ``STATIC_URL``, or for files that are not in ``STATIC_ROOT``,
+are passed on unchanged.
+"""
+
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import metrics
+from .routers import PIN_COOKIE_NAME
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_MAX_AGE = 60
+
+# Content-Encoding token and file suffix, in order of preference.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into a mapping of coding to quality.
+
+    Args:
+        header (str): The raw header value, e.g. ``'gzip;q=0.8, br'``.
+
+    Returns:
+        dict: ``{coding: q}`` with lower-cased codings; malformed quality
+        values count as 0 (not acceptable).
+    """
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    return qualities
+
+
+def choose_encoding(header, available):
+    """
+    Pick the best content coding the client accepts.
+
+    Args:
+        header (str): The raw Accept-Encoding header.
+        available (iterable): ``(coding, suffix)`` pairs that exist on disk,
+            in order of preference.
+
+    Returns:
+        tuple: The chosen ``(coding, suffix)``, or None for the identity
+        coding. Codings with ``q=0`` are never chosen; ``*`` covers codings
+        that are not listed explicitly.
+    """
+    qualities = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding, suffix in available:
+        q = qualities.get(coding, qualities.get('*', 0.0))
+        if q > best_q:
+            best, best_q = (coding, suffix), q
+    return best
+
+
+SESSION_COUNTERS = (
+    'requests',
+    'session_writes',
+    'anonymous_session_writes',
+    'get_session_writes',
+)
+
+
+def session_write_metrics():
+    """
+    Return the session write counters summed over all workers.
+
+    Returns:
+        dict: The raw counters plus ``session_writes_per_request``.
+    """
+    counters = metrics.read(SESSION_COUNTERS)
+    requests = counters['requests']
+    counters['session_writes_per_request'] = (
+        round(counters['session_writes'] / requests, 3) if requests else None
+    )
+    return counters
+
+
+def reset_session_write_metrics():
+    """Reset the session write counters for all processes."""
+    metrics.reset(SESSION_COUNTERS)
+
+
+class SessionWriteMetricsMiddleware:
+    """
+    Count requests that write the session.
+
+    SessionMiddleware sets the session cookie exactly when it saves (or
+    flushes) the session, whatever the session engine, so the cookie on the
+    response is used as the signal. Place this before SessionMiddleware.
+
+    Counting only updates this process's in-memory counters; they reach the
+    metrics cache with the worker's periodic snapshot, so measuring session
+    writes adds no storage I/O to the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        wrote = settings.SESSION_COOKIE_NAME in response.cookies
+        user = getattr(request, 'user', None)
+        metrics.increment('requests')
+        if wrote:
+            metrics.increment('session_writes')
+            if user is None or not user.is_authenticated:
+                metrics.increment('anonymous_session_writes')
+            if request.method == 'GET':
+                metrics.increment('get_session_writes')
+        return response
+
+
+class PrimaryPinningMiddleware:
+    """
+    Pin a client's reads to the primary database for a short time after a write.
+
+    Any non-GET/HEAD request sets a cookie that lasts ``REPLICA_PIN_SECONDS``.
+    ``read_from_replica`` views skip the replicas while it is present.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files with long-lived cache headers.
+
+    Place this directly after SecurityMiddleware so static requests skip the
+    session, authentication and CSRF machinery.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_url = '/' + settings.STATIC_URL.lstrip('/') if settings.STATIC_URL else None
+        self.static_root = settings.STATIC_ROOT
+
+    def __call__(self, request):
+        if self.static_url and self.static_root and request.path.startswith(self.static_url):
+            response = self.serve(request, request.path[len(self.static_url):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def is_immutable(self, name):
+        """Return True if ``name`` is a content-hashed file from the manifest."""
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+        if not hasattr(self, '_immutable_names') or self._manifest_size != len(hashed_files):
+            self._immutable_names = set(hashed_files.values())
+            self._manifest_size = len(hashed_files)
+        return name in self._immutable_names
+
+    def serve(self, request, name):
+        """
+        Build the response for a static file.
+
+        Args:
+            request: The HTTP request object.
+            name (str): The path of the file relative to STATIC_ROOT.
+
+        Returns:
+            HttpResponse or None: None if the file does not exist.
+        """
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        try:
+            path = safe_join(self.static_root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        immutable = self.is_immutable(name)
+        if not immutable and not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime
+        ):
+            response = HttpResponseNotModified()
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+
+        content_type, _ = mimetypes.guess_type(path)
+        serve_path, encoding = path, None
+        chosen = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            [(token, suffix) for token, suffix in ENCODINGS if os.path.isfile(path + suffix)],
+        )
+        if chosen:
+            encoding = chosen[0]
+            serve_path = path + chosen[1]
+
+        response = FileResponse(open(serve_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        response.headers.pop('Content-Disposition', None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        if immutable:
+            response.headers['Cache-Control'] = 'public, max-age=%d, immutable' % IMMUTABLE_MAX_AGE
+        else:
+            response.headers['Cache-Control'] = 'public, max-age=%d' % DEFAULT_MAX_AGE
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+def create_digest_lock(apps, schema_editor):
+    JobLock = apps.get_model('blog', 'JobLock')
+    JobLock.objects.get_or_create(name='comment_digests')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_task_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLock',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.RunPython(create_digest_lock, migrations.RunPython.noop),
+    ]
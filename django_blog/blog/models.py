@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Tag(models.Model):
@@ -32,14 +33,27 @@ class Post(models.Model):
         title (str): The title of the blog post, limited to 200 characters.
         content (str): The content of the blog post.
         published_date (datetime): The date and time when the post was published.
+        updated_at (datetime): The date and time when the post was last modified,
+            used as the per-row version for conditional GET requests.
         author (User): The author of the post, linked to Django's User model.
         tags (Tag): Many-to-many relationship with tags for categorizing posts.
+        comment_count (int): Denormalized number of comments, maintained by
+            ``blog.signals`` with ``F()`` updates.
+        last_activity_at (datetime): When the post was published or last
+            commented on, used to sort by recent activity.
+        version (int): Incremented by every edit through ``PostUpdateView``,
+            which saves only if the post is still at the version the form was
+            loaded with (see ``blog.concurrency``).
     """
     title = models.CharField(max_length=200)
     content = models.TextField()
     published_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     tags = models.ManyToManyField(Tag, related_name='posts', blank=True)
+    comment_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    version = models.PositiveIntegerField(default=1)
     
     def __str__(self):
         """String representation of the Post model."""
@@ -48,6 +62,9 @@ class Post(models.Model):
     class Meta:
         """Meta options for the Post model."""
         ordering = ['-published_date']
+        indexes = [
+            models.Index(fields=['-last_activity_at'], name='blog_post_last_activity_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -73,4 +90,155 @@ class Comment(models.Model):
     
     class Meta:
         """Meta options for the Comment model."""
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+
+class RelatedPost(models.Model):
+    """
+    Model storing the precomputed top-K related posts for each post.
+    
+    Rows are maintained by ``blog.related`` from tag co-occurrence, so the
+    post detail page can show related posts with a single indexed lookup.
+    
+    Attributes:
+        post (Post): The post the recommendation is shown on.
+        related (Post): The recommended post.
+        score (int): The number of tags the two posts share.
+        rank (int): Position of the recommendation, starting at 0.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    
+    def __str__(self):
+        """String representation of the RelatedPost model."""
+        return f'{self.post_id} -> {self.related_id} ({self.score})'
+    
+    class Meta:
+        """Meta options for the RelatedPost model."""
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_unique_rank'),
+        ]
+
+
+
+class CommentDigest(models.Model):
+    """
+    Model recording a comment notification digest sent to a post's author.
+    
+    ``blog.notifications`` batches new comments per post into one digest.
+    The highest ``last_comment_id`` is the cursor for the next run, so
+    creating a comment writes nothing for notifications.
+    
+    Attributes:
+        post (Post): The post the comments were made on.
+        recipient (User): The post author who was notified.
+        comment_count (int): Number of comments in the digest.
+        last_comment_id (int): Primary key of the newest comment in the digest.
+        sent_at (datetime): The date and time when the digest was sent.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comment_digests')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_digests')
+    comment_count = models.PositiveIntegerField()
+    last_comment_id = models.BigIntegerField(db_index=True)
+    sent_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        """String representation of the CommentDigest model."""
+        return f'{self.comment_count} comment(s) on {self.post_id} for {self.recipient_id}'
+    
+    class Meta:
+        """Meta options for the CommentDigest model."""
+        ordering = ['-sent_at']
+
+class JobLock(models.Model):
+    """
+    Row locked for the duration of a periodic job so runs never overlap.
+    
+    A job locks its row with ``SELECT ... FOR UPDATE NOWAIT`` inside its
+    transaction; a second run that finds the row locked gives up at once. The
+    lock is released when the transaction ends, including when the process
+    dies.
+    
+    Attributes:
+        name (str): The job, e.g. ``'comment_digests'``.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    
+    def __str__(self):
+        """String representation of the JobLock model."""
+        return self.name
+
+class ContentVersion(models.Model):
+    """
+    Single-row counter of changes to the published content.
+    
+    ``blog.feeds`` bumps it with an F() update in the transaction that
+    changes a post, a tag or a post's tags, whichever process makes the
+    change, and derives the feed and sitemap ETags and cache keys from it.
+    
+    Attributes:
+        version (int): Incremented on every content change.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        """String representation of the ContentVersion model."""
+        return f'content version {self.version}'
+
+class Task(models.Model):
+    """
+    Model representing a deferred unit of work in the database-backed task queue.
+    
+    Rows are written by ``blog.queue.enqueue`` and claimed by the workers
+    started with ``python manage.py run_tasks``.
+    
+    Attributes:
+        name (str): Registered name of the task function (see ``blog.queue.task``).
+        kwargs (dict): JSON keyword arguments passed to the task function.
+        status (str): One of queued, running, done or failed.
+        attempts (int): Number of times the task has been started.
+        max_attempts (int): Attempts allowed before the task is marked failed.
+        run_at (datetime): Earliest time the task may run; pushed back on retry.
+        created_at (datetime): The date and time when the task was enqueued.
+        started_at (datetime): The date and time the latest attempt started.
+        heartbeat_at (datetime): Last sign of life from the worker running the
+            task; tasks whose heartbeat stops are recovered as stale.
+        finished_at (datetime): The date and time the task succeeded or failed.
+        last_error (str): Traceback of the latest failed attempt.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    def __str__(self):
+        """String representation of the Task model."""
+        return f'{self.name} #{self.pk} ({self.status})'
+    
+    class Meta:
+        """Meta options for the Task model."""
+        ordering = ['run_at', 'pk']
+        indexes = [
+            # Workers poll for the next due task in this order.
+            models.Index(fields=['status', 'run_at'], name='blog_task_status_run_at'),
+        ]
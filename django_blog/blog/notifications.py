@@ -0,0 +1,171 @@
+"""
+Batched comment notifications.
+
+Saving a comment does not notify anyone or write anything for notifications.
+``send_comment_digests()`` runs periodically instead, from cron or a
+long-running ``python manage.py send_comment_digests --loop``. Each run
+works through the comments newer than the cursor (the highest comment id
+already digested) in batches of ``BATCH_SIZE``, oldest first, and stops after
+``BLOG_COMMENT_DIGEST_MAX_COMMENTS``; the rest wait for the next run. For each
+batch it:
+
+- groups the comments by post, so all comments made on a post within one
+  window become one email to the post's author,
+- records a ``CommentDigest`` row per email, which advances the cursor past
+  the batch,
+- sends the emails over one connection of the configured ``EMAIL_BACKEND``
+  (console or file locally, SMTP in production).
+
+Each batch runs in one transaction that first locks the ``comment_digests``
+``JobLock`` row with ``SELECT ... FOR UPDATE NOWAIT``, so overlapping runs
+never read the same cursor: a run that finds the row locked stops. The rows
+are written before the emails are sent; if sending fails the transaction
+rolls back and the batch is sent by the next run, so a comment is never
+recorded as notified without its email having gone out.
+
+Authors are not notified about their own comments. Links in the emails are
+absolute, built from ``BLOG_SITE_URL``.
+"""
+
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import DatabaseError, transaction
+from django.db.models import F, Max
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Comment, CommentDigest, JobLock
+
+# Leave just-created comments for the next run, so comments still being
+# committed are not skipped by the cursor.
+SETTLE_SECONDS = 5
+MAX_COMMENTS_PER_DIGEST = 10
+BATCH_SIZE = 500
+LOCK_NAME = 'comment_digests'
+
+
+def digest_window():
+    """Return the number of seconds between digest runs."""
+    return getattr(settings, 'BLOG_COMMENT_DIGEST_WINDOW', 15 * 60)
+
+
+def max_comments_per_run():
+    """Return the number of comments one run digests at most."""
+    return getattr(settings, 'BLOG_COMMENT_DIGEST_MAX_COMMENTS', 5000)
+
+
+def site_url(path):
+    """Return the absolute URL of ``path`` on ``BLOG_SITE_URL``."""
+    return getattr(settings, 'BLOG_SITE_URL', 'http://localhost:8000').rstrip('/') + path
+
+
+def pending_comments(now=None, limit=BATCH_SIZE):
+    """
+    Return the oldest comments that still need to be digested.
+
+    Args:
+        now (datetime): Current time (default: ``timezone.now()``).
+        limit (int): Maximum number of comments to return.
+    """
+    now = now or timezone.now()
+    cursor = CommentDigest.objects.aggregate(last=Max('last_comment_id'))['last'] or 0
+    return (
+        Comment.objects.filter(pk__gt=cursor, created_at__lt=now - timedelta(seconds=SETTLE_SECONDS))
+        .exclude(author=F('post__author'))
+        .select_related('author', 'post__author')
+        .order_by('pk')[:limit]
+    )
+
+
+def build_digest(post, comments):
+    """Return the email for a batch of comments on ``post``."""
+    recipient = post.author
+    body = render_to_string('blog/email/comment_digest.txt', {
+        'recipient': recipient,
+        'post': post,
+        'comments': comments[:MAX_COMMENTS_PER_DIGEST],
+        'more': max(0, len(comments) - MAX_COMMENTS_PER_DIGEST),
+        'post_url': site_url(reverse('post_detail', kwargs={'pk': post.pk})),
+    })
+    noun = 'comment' if len(comments) == 1 else 'comments'
+    return EmailMessage(
+        subject=f'{len(comments)} new {noun} on "{post.title}"',
+        body=body,
+        to=[recipient.email],
+    )
+
+
+def lock_digest_run():
+    """
+    Lock the digest job row until the current transaction ends.
+
+    Returns:
+        bool: False if another run holds the lock.
+    """
+    try:
+        with transaction.atomic():
+            JobLock.objects.select_for_update(nowait=True).get(name=LOCK_NAME)
+    except DatabaseError:
+        return False
+    return True
+
+
+def send_digest_batch(comments):
+    """
+    Record and send the digests for one batch of comments, ordered by id.
+
+    The rows and the emails share one transaction: the rows are written
+    first and rolled back if sending fails.
+
+    Returns:
+        int: The number of digests recorded.
+    """
+    messages = []
+    digests = []
+    by_post = sorted(comments, key=lambda comment: comment.post_id)
+    for _, group in groupby(by_post, key=lambda comment: comment.post_id):
+        post_comments = list(group)
+        post = post_comments[0].post
+        if post.author.email:
+            messages.append(build_digest(post, post_comments))
+        digests.append(CommentDigest(
+            post=post,
+            recipient=post.author,
+            comment_count=len(post_comments),
+            last_comment_id=post_comments[-1].pk,
+        ))
+    with transaction.atomic():
+        CommentDigest.objects.bulk_create(digests)
+        if messages:
+            # One connection for the whole batch.
+            get_connection(fail_silently=False).send_messages(messages)
+    return len(digests)
+
+
+def send_comment_digests(now=None):
+    """
+    Send one digest per post with new comments.
+
+    Returns:
+        int: The number of digests recorded.
+    """
+    now = now or timezone.now()
+    # Migration 0012 creates the row; recreate it if it was deleted
+    JobLock.objects.get_or_create(name=LOCK_NAME)
+    recorded = 0
+    remaining = max_comments_per_run()
+    while remaining > 0:
+        # Overlapping runs would send the same comments twice.
+        with transaction.atomic():
+            if not lock_digest_run():
+                break
+            comments = list(pending_comments(now, min(BATCH_SIZE, remaining)))
+            if not comments:
+                break
+            recorded += send_digest_batch(comments)
+        remaining -= len(comments)
+    return recorded
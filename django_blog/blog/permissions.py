@@ -0,0 +1,54 @@
+"""
+Object-level permissions for the blog's edit and delete views.
+
+``UserPassesTestMixin`` views that check ownership in ``test_func`` usually
+call ``get_object()`` there and again in ``get()``/``post()``, loading the
+same row twice. ``OwnerRequiredMixin`` loads the object once per request
+(with the relations the view declares in ``queryset``), checks ownership
+against the foreign key column without fetching the owner, and hands that
+same instance to the form, the template and ``get_success_url()``.
+"""
+
+from django.contrib.auth.mixins import UserPassesTestMixin
+
+
+class ObjectPermissionMixin(UserPassesTestMixin):
+    """
+    ``UserPassesTestMixin`` for single-object views, with one object fetch.
+
+    Subclasses implement ``has_object_permission()``; ``get_object()`` is
+    memoized so the permission check and the generic view share the instance.
+    """
+
+    def get_object(self, queryset=None):
+        """Return the view's object, loading it only on the first call."""
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_permission_object'):
+            self._permission_object = super().get_object()
+        return self._permission_object
+
+    def has_object_permission(self, user, obj):
+        """Return whether ``user`` may act on ``obj``."""
+        raise NotImplementedError(
+            f'{type(self).__name__} must implement has_object_permission()'
+        )
+
+    def test_func(self):
+        """Check the object permission for the current user."""
+        return self.has_object_permission(self.request.user, self.get_object())
+
+
+class OwnerRequiredMixin(ObjectPermissionMixin):
+    """
+    Allow only the object's owner, identified by the ``owner_field`` foreign key.
+
+    Attributes:
+        owner_field (str): Name of the foreign key to the user model.
+    """
+    owner_field = 'author'
+
+    def has_object_permission(self, user, obj):
+        """Compare the owner's id with the user's, without loading the owner."""
+        owner_id = getattr(obj, obj._meta.get_field(self.owner_field).attname)
+        return user.is_authenticated and owner_id == user.pk
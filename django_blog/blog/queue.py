@@ -0,0 +1,294 @@
+"""
+Database-backed task queue for deferred side effects.
+
+Work that does not have to finish before the response is sent (tag creation,
+notifications, ...) is stored as a ``Task`` row and run by worker processes:
+
+    python manage.py run_tasks            # one worker; start several for more
+    python manage.py run_tasks --once     # drain the queue and exit
+    python manage.py run_tasks --stats    # print queue depth and latency
+
+Tasks are plain functions registered with ``@task`` (see ``blog.tasks``) and
+take JSON-serializable keyword arguments:
+
+    @task(name='blog.apply_post_tags', max_attempts=5)
+    def apply_post_tags(post_id, tag_names): ...
+
+    apply_post_tags.delay(post_id=post.pk, tag_names=['django'])
+
+The row is inserted in the caller's transaction, so a task never runs for a
+request that rolled back. Workers claim tasks with a conditional UPDATE
+(after ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it),
+so any number of workers can share the queue. Failed attempts are retried
+with exponential backoff until ``max_attempts`` is reached. No broker is
+needed; with ``BLOG_TASKS_EAGER = True`` tasks run inline after commit instead.
+
+While a task runs, a background thread refreshes its ``heartbeat_at`` every
+``HEARTBEAT_SECONDS``. Only tasks whose heartbeat is older than the stale
+timeout are treated as lost: they are requeued, or marked failed once they
+have used all their attempts, so a task that kills its worker is not retried
+forever and a long-running task is never started a second time.
+
+LibraryProject's ``relationship_app.queue`` is a copy of this module. The two
+projects are deployed separately and share no package, so a fix here has to
+be made there as well.
+"""
+
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 10
+# How often a running task's heartbeat_at is refreshed; the stale timeout
+# passed to work() must be several times longer.
+HEARTBEAT_SECONDS = 30
+
+_registry = {}
+
+
+def task(func=None, *, name=None, max_attempts=3):
+    """
+    Register a function as a task and give it a ``delay(**kwargs)`` helper.
+
+    Args:
+        name (str): Name stored in the queue (default: ``module.function``).
+        max_attempts (int): Attempts before the task is marked failed.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        _registry[task_name] = func
+        func.task_name = task_name
+        func.delay = lambda **kwargs: enqueue(task_name, max_attempts=max_attempts, **kwargs)
+        return func
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(name, max_attempts=3, countdown=0, **kwargs):
+    """
+    Queue the task registered as ``name``.
+
+    Args:
+        name (str): Registered task name.
+        max_attempts (int): Attempts before the task is marked failed.
+        countdown (int): Seconds to wait before the task may run.
+        **kwargs: JSON-serializable arguments for the task function.
+
+    Returns:
+        Task: The queued row, or None when ``BLOG_TASKS_EAGER`` is set.
+    """
+    if name not in _registry:
+        raise KeyError(f'Unknown task {name!r}')
+    if getattr(settings, 'BLOG_TASKS_EAGER', False):
+        transaction.on_commit(lambda: _registry[name](**kwargs))
+        return None
+    return Task.objects.create(
+        name=name,
+        kwargs=kwargs,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def claim_next_task():
+    """
+    Atomically mark the next due task as running and return it.
+
+    Returns:
+        Task: The claimed task, or None if nothing is due.
+    """
+    now = timezone.now()
+    due = Task.objects.filter(status=Task.QUEUED, run_at__lte=now).order_by('run_at', 'pk')
+    if connection.features.has_select_for_update_skip_locked:
+        due = due.select_for_update(skip_locked=True)
+    while True:
+        with transaction.atomic():
+            candidate = due.values_list('pk', flat=True).first()
+            if candidate is None:
+                return None
+            # Only one worker wins the status change, even without row locks.
+            claimed = Task.objects.filter(pk=candidate, status=Task.QUEUED).update(
+                status=Task.RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+            )
+        if claimed:
+            return Task.objects.get(pk=candidate)
+
+
+def retry_delay(attempts):
+    """Return the backoff before the next attempt after ``attempts`` attempts."""
+    return timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+class Heartbeat:
+    """
+    Refresh a running task's ``heartbeat_at`` from a background thread.
+
+    Use as a context manager around the task function. The thread uses its
+    own database connection and closes it when it stops.
+    """
+
+    def __init__(self, task_id, interval=None):
+        self.task_id = task_id
+        self.interval = HEARTBEAT_SECONDS if interval is None else interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f'task-heartbeat-{task_id}', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    Task.objects.filter(pk=self.task_id, status=Task.RUNNING).update(
+                        heartbeat_at=timezone.now(),
+                    )
+                except Exception:
+                    logger.warning('Heartbeat of task #%s failed', self.task_id, exc_info=True)
+                    close_old_connections()
+        finally:
+            connection.close()
+
+
+def run_task(task_row):
+    """
+    Run a claimed task and record the outcome.
+
+    Returns:
+        bool: True if the task succeeded.
+    """
+    func = _registry.get(task_row.name)
+    try:
+        if func is None:
+            raise KeyError(f'Unknown task {task_row.name!r}')
+        with Heartbeat(task_row.pk):
+            func(**task_row.kwargs)
+    except Exception:
+        task_row.last_error = traceback.format_exc()
+        if task_row.attempts < task_row.max_attempts:
+            task_row.status = Task.QUEUED
+            task_row.run_at = timezone.now() + retry_delay(task_row.attempts)
+        else:
+            task_row.status = Task.FAILED
+            task_row.finished_at = timezone.now()
+        logger.warning('Task %s failed (attempt %s/%s)', task_row,
+                       task_row.attempts, task_row.max_attempts, exc_info=True)
+        task_row.save(update_fields=['status', 'run_at', 'finished_at', 'last_error'])
+        return False
+
+    task_row.status = Task.DONE
+    task_row.finished_at = timezone.now()
+    task_row.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+def requeue_stale_tasks(timeout):
+    """
+    Recover tasks left running by a worker that died.
+
+    A task is stale when its heartbeat is older than ``timeout`` seconds.
+    Stale tasks with attempts left are requeued with the usual backoff; the
+    others are marked failed, so a task that crashes its worker every time
+    stops being retried.
+
+    Args:
+        timeout (int): Seconds without a heartbeat after which a running task
+            is considered lost.
+
+    Returns:
+        int: The number of tasks requeued or failed.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(status=Task.RUNNING, heartbeat_at__lt=now - timedelta(seconds=timeout))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED,
+        finished_at=now,
+        last_error=f'Worker lost: no heartbeat for {timeout} seconds.',
+    )
+    requeued = 0
+    for task_row in stale.filter(attempts__lt=F('max_attempts')).only('pk', 'attempts'):
+        requeued += Task.objects.filter(pk=task_row.pk, status=Task.RUNNING).update(
+            status=Task.QUEUED,
+            run_at=now + retry_delay(task_row.attempts),
+            last_error=f'Worker lost: no heartbeat for {timeout} seconds.',
+        )
+    if failed or requeued:
+        logger.warning('Recovered %s stale task(s): %s requeued, %s failed',
+                       failed + requeued, requeued, failed)
+    return failed + requeued
+
+
+def purge_finished_tasks(older_than):
+    """Delete tasks that succeeded more than ``older_than`` seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = Task.objects.filter(status=Task.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def work(once=False, sleep=1.0, stale_timeout=600, retention=86400):
+    """
+    Run tasks until stopped (or until the queue is empty with ``once``).
+
+    Returns:
+        int: The number of tasks processed.
+    """
+    processed = 0
+    last_maintenance = 0
+    while True:
+        if time.monotonic() - last_maintenance > 60:
+            requeue_stale_tasks(stale_timeout)
+            purge_finished_tasks(retention)
+            last_maintenance = time.monotonic()
+        task_row = claim_next_task()
+        if task_row is None:
+            if once:
+                return processed
+            time.sleep(sleep)
+            continue
+        run_task(task_row)
+        processed += 1
+
+
+def queue_metrics():
+    """
+    Return queue depth and latency figures.
+
+    ``oldest_due_seconds`` is how long the oldest due task has been waiting
+    (the current queueing delay); ``avg_wait_seconds`` is the average time
+    between enqueue and start over the tasks finished in the last hour.
+    """
+    now = timezone.now()
+    counts = dict.fromkeys([Task.QUEUED, Task.RUNNING, Task.DONE, Task.FAILED], 0)
+    for row in Task.objects.order_by().values('status').annotate(count=Count('pk')):
+        counts[row['status']] = row['count']
+
+    oldest_due = Task.objects.filter(status=Task.QUEUED, run_at__lte=now).aggregate(
+        oldest=Min('run_at'))['oldest']
+    avg_wait = Task.objects.filter(
+        finished_at__gte=now - timedelta(hours=1), started_at__isnull=False,
+    ).aggregate(wait=Avg(ExpressionWrapper(
+        F('started_at') - F('created_at'), output_field=DurationField())))['wait']
+
+    return {
+        'depth': counts[Task.QUEUED],
+        'running': counts[Task.RUNNING],
+        'done': counts[Task.DONE],
+        'failed': counts[Task.FAILED],
+        'oldest_due_seconds': round((now - oldest_due).total_seconds(), 3) if oldest_due else 0,
+        'avg_wait_seconds': round(avg_wait.total_seconds(), 3) if avg_wait else 0,
+    }
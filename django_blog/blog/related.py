@@ -0,0 +1,135 @@
+"""
+Related-post recommendations from tag co-occurrence.
+
+Two posts are related when they share tags; the score is the number of shared
+tags. The top-K related posts of every post are stored in ``RelatedPost`` so
+the detail page needs a single indexed lookup instead of a live self-join on
+the ``Post.tags`` through table.
+
+- ``rebuild_related_posts()`` recomputes everything from a sparse tag/post
+  co-occurrence matrix built in memory from one pass over the through table.
+  Run it with ``python manage.py build_related_posts``.
+- ``refresh_related_posts()`` recomputes a set of posts incrementally, with
+  one grouped aggregate query per batch of posts. The signal receivers in
+  ``blog.signals`` queue it (task ``blog.update_related_posts``) for a post
+  whose tags changed and for every post sharing one of its old or new tags,
+  so the request thread does not pay for it.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Post, RelatedPost
+
+BATCH_SIZE = 1000
+# Posts scored per aggregate query in refresh_related_posts().
+REFRESH_BATCH_SIZE = 200
+
+
+def related_posts_count():
+    """Return K, the number of related posts stored per post."""
+    return getattr(settings, 'BLOG_RELATED_POSTS', 5)
+
+
+def _top_k(scores, k):
+    """
+    Return the ``k`` best ``(related_id, score)`` pairs.
+
+    Ties are broken in favour of the newer (higher id) post.
+    """
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+
+
+def _entries(post_id, ranked):
+    return [
+        RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+        for rank, (related_id, score) in enumerate(ranked)
+    ]
+
+
+def rebuild_related_posts(k=None):
+    """
+    Recompute the related posts of every post.
+
+    Args:
+        k (int): Number of related posts to keep per post (default: BLOG_RELATED_POSTS).
+
+    Returns:
+        int: The number of RelatedPost rows written.
+    """
+    k = k or related_posts_count()
+    through = Post.tags.through
+
+    # Sparse incidence lists: tag -> posts and post -> tags.
+    posts_by_tag = defaultdict(list)
+    tags_by_post = defaultdict(list)
+    for post_id, tag_id in through.objects.values_list('post_id', 'tag_id').iterator():
+        posts_by_tag[tag_id].append(post_id)
+        tags_by_post[post_id].append(tag_id)
+
+    entries = []
+    written = 0
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        for post_id, tag_ids in tags_by_post.items():
+            # One row of the post/post co-occurrence matrix.
+            scores = Counter()
+            for tag_id in tag_ids:
+                scores.update(posts_by_tag[tag_id])
+            del scores[post_id]
+            entries.extend(_entries(post_id, _top_k(scores, k)))
+            if len(entries) >= BATCH_SIZE:
+                RelatedPost.objects.bulk_create(entries)
+                written += len(entries)
+                entries = []
+        RelatedPost.objects.bulk_create(entries)
+    return written + len(entries)
+
+
+def refresh_related_posts(post_ids, k=None):
+    """
+    Recompute the related posts of the given posts.
+
+    The posts are scored ``REFRESH_BATCH_SIZE`` at a time: one query joins
+    the through table (indexed on ``tag_id``) to itself and counts the shared
+    tags of every (post, related post) pair in the batch.
+
+    Args:
+        post_ids (iterable): Primary keys of the posts to refresh.
+        k (int): Number of related posts to keep per post (default: BLOG_RELATED_POSTS).
+    """
+    k = k or related_posts_count()
+    through = Post.tags.through
+    post_ids = sorted(set(post_ids))
+
+    for start in range(0, len(post_ids), REFRESH_BATCH_SIZE):
+        batch = post_ids[start:start + REFRESH_BATCH_SIZE]
+        scores = defaultdict(Counter)
+        pairs = (
+            through.objects.filter(tag__posts__in=batch)
+            .values_list('tag__posts', 'post_id')
+            .annotate(score=Count('tag_id'))
+            .order_by()
+        )
+        for post_id, related_id, score in pairs:
+            if related_id != post_id:
+                scores[post_id][related_id] = score
+        entries = []
+        for post_id, row in scores.items():
+            entries.extend(_entries(post_id, _top_k(row, k)))
+        with transaction.atomic():
+            RelatedPost.objects.filter(post_id__in=batch).delete()
+            RelatedPost.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+
+def posts_sharing_tags(tag_ids):
+    """Return the ids of posts tagged with any of ``tag_ids``."""
+    return set(
+        Post.tags.through.objects.filter(tag_id__in=tag_ids)
+        .values_list('post_id', flat=True)
+        .distinct()
+    )
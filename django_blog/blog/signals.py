@@ -0,0 +1,90 @@
+"""
+Signal receivers for the blog application.
+
+Queues a refresh of the precomputed related posts (see ``blog.related``)
+when ``Post.tags`` changes or a post is deleted, and invalidates the cached
+feeds and sitemaps (see ``blog.feeds``) in the same transaction when posts
+or tags change. Comment saves and deletes update the
+denormalized counters on ``Post`` (see ``blog.activity``) immediately.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .activity import comment_deleted, comment_saved
+from .feeds import bump_content_version
+from .models import Comment, Post, Tag
+from .tasks import update_related_posts
+
+
+def schedule_related_refresh(post_ids=(), tag_ids=()):
+    """
+    Queue a refresh of ``post_ids`` and of every post tagged with ``tag_ids``.
+
+    The posts sharing the tags are looked up by the task, not here.
+    """
+    if post_ids or tag_ids:
+        update_related_posts.delay(post_ids=sorted(post_ids), tag_ids=sorted(tag_ids))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Queue a related-post refresh after tags are added to or removed from a post.
+
+    A tag change affects the post itself and every post carrying one of the
+    added or removed tags. ``clear()`` does not report what was removed, so
+    the current values are captured in ``pre_clear``.
+    """
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_post_ids = set(instance.posts.values_list('pk', flat=True))
+        else:
+            instance._cleared_tag_ids = set(instance.tags.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # tag.posts.add()/remove(): only pairs involving this tag change score.
+        changed = getattr(instance, '_cleared_post_ids', set()) if action == 'post_clear' else pk_set
+        schedule_related_refresh(post_ids=changed or (), tag_ids={instance.pk})
+    else:
+        # post.tags.add()/remove(): only pairs involving this post and the
+        # changed tags change score.
+        changed = getattr(instance, '_cleared_tag_ids', set()) if action == 'post_clear' else pk_set
+        schedule_related_refresh(post_ids={instance.pk}, tag_ids=changed or ())
+    bump_content_version()
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    """Capture the tags of a post before its through rows are deleted."""
+    instance._deleted_tag_ids = set(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Refresh the posts that shared a tag with a deleted post."""
+    schedule_related_refresh(tag_ids=getattr(instance, '_deleted_tag_ids', set()))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_feeds(sender, **kwargs):
+    """Regenerate feeds and sitemaps after a post or tag is saved or deleted."""
+    bump_content_version()
+
+
+@receiver(post_save, sender=Comment)
+def comment_post_saved(sender, instance, created, **kwargs):
+    """Count new comments and record activity on the commented post."""
+    comment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_post_deleted(sender, instance, origin=None, **kwargs):
+    """Uncount deleted comments, except those deleted along with their post."""
+    comment_deleted(instance, origin)
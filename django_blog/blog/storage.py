@@ -0,0 +1,96 @@
+"""
+Static file storage for the blog project.
+
+``CompressedManifestStaticFilesStorage`` extends Django's manifest storage so
+that ``collectstatic`` becomes the static build step:
+
+1. Every file is copied to ``STATIC_ROOT`` and fingerprinted with a content
+   hash (``style.css`` -> ``style.5f2b...css``), with ``url()`` references in
+   CSS rewritten to the hashed names.
+2. A ``staticfiles.json`` manifest mapping original to hashed names is written.
+3. Text assets are pre-compressed to ``.gz`` (and ``.br`` when the optional
+   ``brotli`` package is installed) next to the hashed file.
+
+The compressed variants are served by ``blog.middleware.StaticFilesMiddleware``.
+"""
+
+import gzip
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that also writes gzip/brotli variants of hashed files.
+
+    When ``BLOG_STATIC_MANIFEST_OPTIONAL`` is set (settings.py sets it to
+    ``DEBUG``) and ``collectstatic`` has not produced a manifest yet, URLs
+    fall back to the original (unhashed) names so development and test runs
+    work without a build step. Otherwise a missing manifest raises
+    ValueError when a URL is built, so a deploy that skipped
+    ``collectstatic`` fails loudly instead of serving unhashed names.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map', '.xml')
+    # Compressing tiny files wastes more on headers than it saves.
+    compress_min_size = 256
+
+    def stored_name(self, name):
+        """Return the hashed name, or the original name if no manifest is required."""
+        if not self.hashed_files:
+            if getattr(settings, 'BLOG_STATIC_MANIFEST_OPTIONAL', False):
+                return name
+            raise ValueError(
+                "The staticfiles manifest %s was not found in %s; run "
+                "'manage.py collectstatic'." % (self.manifest_name, self.location)
+            )
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash files and write the manifest, then pre-compress the hashed files."""
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            for compressed_name in self.compress(hashed_name):
+                yield hashed_name, compressed_name, True
+
+    def compress(self, name):
+        """
+        Write compressed variants of a stored file.
+
+        Args:
+            name (str): The stored (hashed) file name.
+
+        Returns:
+            list: The names of the compressed files that were written. A variant
+            is only kept if it is smaller than the original.
+        """
+        if os.path.splitext(name)[1].lower() not in self.compress_extensions:
+            return []
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < self.compress_min_size:
+            return []
+
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+
+        written = []
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            written.append(compressed_name)
+        return written
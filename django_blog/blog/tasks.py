@@ -0,0 +1,48 @@
+"""
+Deferred tasks for the blog application (run by ``python manage.py run_tasks``).
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Post, Tag
+from .queue import task
+from .related import posts_sharing_tags, refresh_related_posts
+
+
+@task(name='blog.apply_post_tags', max_attempts=5)
+def apply_post_tags(post_id, tag_names):
+    """
+    Create any missing tags and set them as the tags of a post.
+
+    Args:
+        post_id (int): Primary key of the post.
+        tag_names (list): Tag names entered in ``PostForm``.
+
+    ``updated_at`` is bumped in the same transaction, so the post and list
+    ETags (``blog.conditional``) change with the post's tags.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    names = {name.lower() for name in tag_names}
+    existing = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    with transaction.atomic():
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in names - existing.keys()], ignore_conflicts=True,
+        )
+        post.tags.set(Tag.objects.filter(name__in=names))
+        Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+
+
+@task(name='blog.update_related_posts', max_attempts=5)
+def update_related_posts(post_ids, tag_ids):
+    """
+    Recompute the related posts affected by a tag change.
+
+    Args:
+        post_ids (list): Primary keys of posts whose tags changed.
+        tag_ids (list): Tags that were added or removed; every post that
+            carries one of them when the task runs is refreshed too.
+    """
+    refresh_related_posts(set(post_ids) | posts_sharing_tags(tag_ids))
@@ -1,3 +1,813 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import metrics
+from .db import _pool_metrics, connection_metrics, reset_metrics
+from .forms import PostForm
+from .middleware import parse_accept_encoding, reset_session_write_metrics, session_write_metrics
+from .models import Comment, CommentDigest, JobLock, Post, RelatedPost, Tag, Task
+from .notifications import send_comment_digests
+from .queue import Heartbeat, claim_next_task, requeue_stale_tasks, run_task, task, work
+from .related import refresh_related_posts
+from .storage import CompressedManifestStaticFilesStorage
+from .tasks import apply_post_tags
+
+
+class PostConditionalGetTests(TestCase):
+    """ETags of the post pages must change whenever the rendered page would."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='pass')
+        self.post = Post.objects.create(title='Post', content='Content', author=self.user)
+        self.list_url = reverse('post_list')
+        self.detail_url = reverse('post_detail', args=[self.post.pk])
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (self.list_url, self.detail_url):
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertNotIn('Last-Modified', response)
+
+    def test_detail_etag_changes_with_comments(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, content='Comment')
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_changes_on_delete(self):
+        other = Post.objects.create(title='Other', content='Content', author=self.user)
+        etag = self.client.get(self.list_url)['ETag']
+        other.delete()
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_no_etag_while_messages_are_pending(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('post_create'), {'title': 'New', 'content': 'Content'})
+        response = self.client.get(self.list_url)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'created successfully')
+
+
+class PostTagsConditionalGetTests(TestCase):
+    """Tag changes made by the task queue must change the page ETags."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='pass')
+        self.post = Post.objects.create(title='Post', content='Content', author=self.user)
+        Tag.objects.create(name='django')
+        apply_post_tags(self.post.pk, ['django'])
+
+    def assert_changed_after_tag_edit(self, url):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        apply_post_tags(self.post.pk, [])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_etag_changes_with_tags(self):
+        self.assert_changed_after_tag_edit(reverse('post_detail', args=[self.post.pk]))
+
+    def test_tag_page_etag_changes_with_tags(self):
+        self.assert_changed_after_tag_edit(reverse('tag_posts', args=['django']))
+
+
+@override_settings(BLOG_TASKS_EAGER=False)
+class FeedConditionalGetTests(TestCase):
+    """Feed and sitemap ETags follow the content version stored in the database."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='pass')
+        self.post = Post.objects.create(title='Post', content='Content', author=self.user)
+        Tag.objects.create(name='django')
+        Tag.objects.create(name='python')
+
+    def test_unchanged_feed_is_not_modified_after_one_query(self):
+        url = reverse('post_feed_rss')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_queued_tag_changes_change_the_etags(self):
+        urls = [reverse('tag_feed_atom', args=['python']), reverse('sitemap')]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        apply_post_tags.delay(post_id=self.post.pk, tag_names=['python'])
+        # The worker runs in another process with its own cache
+        with mock.patch('blog.feeds.cache', caches.create_connection('default')):
+            work(once=True)
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(self.client.get(urls[0]), 'Post')
+
+
+class StaticFilesTests(SimpleTestCase):
+    """collectstatic output is served hashed, pre-compressed and negotiated."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.hashed_name = staticfiles_storage.stored_name('css/auth.css')
+
+    def get(self, name, **headers):
+        return self.client.get(settings.STATIC_URL + name, **headers)
+
+    def test_hashed_files_are_immutable_and_compressed(self):
+        self.assertNotEqual(self.hashed_name, 'css/auth.css')
+        response = self.get(self.hashed_name, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_refused_and_unlisted_codings_get_identity(self):
+        for header in ('gzip;q=0', 'br;q=0, gzip; q=0.0', 'x-gzipped', 'identity', ''):
+            with self.subTest(header=header):
+                response = self.get(self.hashed_name, HTTP_ACCEPT_ENCODING=header)
+                self.assertNotIn('Content-Encoding', response)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_wildcard_accepts_gzip(self):
+        response = self.get(self.hashed_name, HTTP_ACCEPT_ENCODING='*;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_unhashed_files_are_revalidated(self):
+        response = self.get('css/auth.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.get('css/auth.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.8, BR, deflate;q=bad'),
+            {'gzip': 0.8, 'br': 1.0, 'deflate': 0.0},
+        )
+
+    def test_missing_manifest_fails_unless_optional(self):
+        with tempfile.TemporaryDirectory() as empty_root:
+            storage = CompressedManifestStaticFilesStorage(location=empty_root)
+            with override_settings(BLOG_STATIC_MANIFEST_OPTIONAL=False):
+                with self.assertRaisesMessage(ValueError, 'collectstatic'):
+                    storage.url('css/auth.css')
+            with override_settings(BLOG_STATIC_MANIFEST_OPTIONAL=True):
+                self.assertEqual(storage.url('css/auth.css'), '/static/css/auth.css')
+
+
+class PostAdminTests(TestCase):
+    """The admin must not overwrite counters maintained with F() updates."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='pass')
+        self.post = Post.objects.create(title='Post', content='Content', author=self.admin)
+        self.client.force_login(self.admin)
+
+    def test_counters_are_read_only(self):
+        url = reverse('admin:blog_post_change', args=[self.post.pk])
+        response = self.client.post(url, {
+            'title': 'Edited', 'content': 'Content', 'author': self.admin.pk, 'version': 7,
+            'comment_count': 99, 'last_activity_at_0': '2000-01-01', 'last_activity_at_1': '00:00:00',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'Edited')
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertNotEqual(self.post.last_activity_at.year, 2000)
+        # The version is read-only and incremented by every save
+        self.assertEqual(self.post.version, 2)
+
+    def test_save_keeps_concurrent_comment_count(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.admin, content='Comment')
+        stale.title = 'Edited'
+        site._registry[Post].save_model(None, stale, None, change=True)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.comment_count), ('Edited', 1))
+        self.assertEqual((stale.version, self.post.version), (2, 2))
+
+
+# Session, user, count, page of rows (related objects joined or prefetched in
+# one query) and the date hierarchy's range and dates.
+CHANGELIST_QUERY_BUDGET = 7
+
+
+class AdminChangelistQueryBudgetTests(TestCase):
+    """Admin changelists run a fixed number of queries however many rows there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='pass')
+        users = User.objects.bulk_create([User(username=f'user{i:03d}') for i in range(200)])
+        tags = Tag.objects.bulk_create([Tag(name=f'tag{i:02d}') for i in range(50)])
+        posts = Post.objects.bulk_create(
+            [Post(title=f'Post {i:04d}', content='Content', author=users[i % 200]) for i in range(2000)],
+            batch_size=500,
+        )
+        Post.tags.through.objects.bulk_create(
+            [Post.tags.through(post=post, tag=tags[(post.pk + n) % 50]) for post in posts for n in range(3)],
+            batch_size=1000,
+        )
+        Comment.objects.bulk_create(
+            [Comment(post=posts[i % 2000], author=users[i % 200], content='A comment') for i in range(3000)],
+            batch_size=1000,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_with_queries(self, name, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:blog_{name}_changelist'), data)
+        self.assertEqual(response.status_code, 200)
+        return response, queries.captured_queries
+
+    def test_changelists_stay_within_budget(self):
+        for name, count in (('post', 2000), ('comment', 3000), ('tag', 50)):
+            with self.subTest(name):
+                response, queries = self.get_with_queries(name)
+                self.assertEqual(response.context['cl'].result_count, count)
+                self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+
+    def test_filters_do_not_load_related_objects(self):
+        response, queries = self.get_with_queries('post', {'author': 'user007', 'tag': 'tag08'})
+        self.assertEqual(response.context['cl'].result_count, 10)
+        self.assertLessEqual(len(queries), CHANGELIST_QUERY_BUDGET)
+        self.assertFalse(any(q['sql'].startswith('SELECT "auth_user"."id"') and 'LIMIT' not in q['sql']
+                             for q in queries))
+
+
+@override_settings(BLOG_METRICS_FLUSH_INTERVAL=0)
+class SharedMetricsTestCase(TestCase):
+    """Point the metrics cache at a fresh file-based cache and start each test with empty counters."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache_settings = {
+            **settings.CACHES,
+            'metrics': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory.name,
+            },
+        }
+        override = override_settings(CACHES=cache_settings)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(caches['metrics'].close)
+        self.as_new_process()
+
+    def as_new_process(self):
+        """Give this process fresh local counters, as a newly started worker has."""
+        patcher = mock.patch.dict(metrics._state, {'pid': None, 'resets': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self, name, worker=None):
+        """Read a worker's published counter through a new cache client, as another process would."""
+        cache = caches.create_connection('metrics')
+        snapshot = cache.get(metrics.KEY_PREFIX + 'worker:' + (worker or metrics.worker_id()), {})
+        return snapshot.get('counters', {}).get(name, 0)
+
+    def publish_as(self, worker, pools=None, **counters):
+        """Publish a snapshot as the worker ``worker`` with the given counters."""
+        self.as_new_process()
+        for name, value in counters.items():
+            metrics.increment(name, value)
+        with mock.patch.object(metrics, 'worker_id', return_value=worker), \
+                mock.patch.dict(metrics._sources, {'pools': lambda: pools or {}}):
+            metrics.flush()
+
+
+class FakePool:
+    def __init__(self, **stats):
+        self.stats = stats
+
+    def get_stats(self):
+        return self.stats
+
+
+class ConnectionMetricsTests(SharedMetricsTestCase):
+    """Workers publish their own counters and pool statistics; dbstats adds them up."""
+
+    def test_requests_are_published_by_the_worker(self):
+        for _ in range(3):
+            self.client.get(reverse('post_list'))
+        self.assertEqual(self.published('requests_finished'), 3)
+        self.assertEqual(connection_metrics()['requests_finished'], 3)
+        self.assertEqual(connection_metrics()['workers'], 1)
+
+    @override_settings(BLOG_METRICS_FLUSH_INTERVAL=3600)
+    def test_requests_between_flushes_do_not_touch_the_cache(self):
+        with mock.patch.object(metrics, 'flush', wraps=metrics.flush) as flush:
+            for _ in range(3):
+                self.client.get(reverse('post_list'))
+        self.assertEqual(flush.call_count, 1)
+        self.assertEqual(self.published('requests_finished'), 1)
+
+    def test_snapshots_of_all_workers_are_added_up(self):
+        pool = FakePool(pool_min=2, pool_max=4, pool_size=4, pool_available=1,
+                        requests_num=10, requests_queued=2, requests_wait_ms=50)
+        self.publish_as('web-1:1', pools={'default': _pool_metrics(pool)}, requests_finished=4)
+        self.publish_as('web-2:2', pools={'default': _pool_metrics(pool)}, requests_finished=4,
+                        connections_opened=2)
+        stats = connection_metrics()
+        self.assertEqual((stats['workers'], stats['requests_finished']), (2, 8))
+        self.assertEqual(stats['connections_per_request'], 0.25)
+        self.assertEqual(stats['pool']['pool_in_use'], 6)
+        self.assertEqual(stats['pool']['requests_overflow'], 4)
+        self.assertEqual(stats['pool']['wait_ms_avg'], 5.0)
+        self.assertEqual(set(stats['worker_pools']), {'web-1:1', 'web-2:2'})
+
+        out = StringIO()
+        call_command('dbstats', database=['default'], stdout=out)
+        self.assertIn('requests_finished: 8', out.getvalue())
+        self.assertIn('worker web-2:2: in_use=3 available=1 overflow=2', out.getvalue())
+
+    def test_reset_clears_published_and_unpublished_counts(self):
+        self.publish_as('web-1:1', connections_opened=3)
+        metrics.increment('connections_opened')
+        reset_metrics()
+        self.assertEqual(connection_metrics()['connections_opened'], 0)
+        self.assertIsNone(connection_metrics()['connections_per_request'])
+        metrics.flush()
+        self.assertEqual(metrics.read(['connections_opened', 'unknown']), {'connections_opened': 0, 'unknown': 0})
+
+    def test_reset_reaches_running_workers(self):
+        self.publish_as('web-1:1', requests_finished=5)
+        # Another process resets the counters; this worker keeps its local
+        # counts until its next flush
+        with mock.patch.dict(metrics._state, {'resets': {}, 'counters': Counter()}):
+            reset_metrics()
+        self.assertEqual(metrics._state['counters']['requests_finished'], 5)
+        with mock.patch.object(metrics, 'worker_id', return_value='web-1:1'):
+            metrics.flush()
+        self.assertEqual(self.published('requests_finished', worker='web-1:1'), 0)
+
+
+class SessionWriteMetricsTests(SharedMetricsTestCase):
+    """Session writes are counted in memory and published with the worker snapshot."""
+
+    def test_session_writes_are_published(self):
+        self.client.get(reverse('post_list'))
+        User.objects.create_user('reader', password='pass')
+        self.client.post(reverse('login'), {'username': 'reader', 'password': 'pass'})
+        self.assertEqual(self.published('requests'), 2)
+        self.assertEqual(self.published('session_writes'), 1)
+        self.assertEqual(session_write_metrics(), {
+            'requests': 2,
+            'session_writes': 1,
+            'anonymous_session_writes': 0,
+            'get_session_writes': 0,
+            'session_writes_per_request': 0.5,
+        })
+        reset_session_write_metrics()
+        self.assertEqual(session_write_metrics()['requests'], 0)
+        # Resetting the session counters leaves the connection counters alone
+        self.assertEqual(connection_metrics()['requests_finished'], 2)
+
+    @override_settings(BLOG_METRICS_FLUSH_INTERVAL=3600)
+    def test_counting_adds_no_cache_io(self):
+        self.client.get(reverse('post_list'))
+        with mock.patch.object(metrics, '_cache') as cache:
+            for _ in range(3):
+                self.client.get(reverse('post_list'))
+        cache.assert_not_called()
+
+
+@task(name='blog.tests.noop')
+def noop_task():
+    pass
+
+
+@task(name='blog.tests.fail', max_attempts=3)
+def failing_task():
+    raise RuntimeError('boom')
+
+
+@override_settings(BLOG_TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    """Claiming, retries with backoff, max_attempts and recovery of lost tasks."""
+
+    def test_claim_marks_the_task_running(self):
+        queued = noop_task.delay()
+        claimed = claim_next_task()
+        self.assertEqual(claimed.pk, queued.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (Task.RUNNING, 1))
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertIsNone(claim_next_task())
+
+    def test_tasks_that_are_not_due_are_not_claimed(self):
+        Task.objects.create(name='blog.tests.noop', run_at=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(claim_next_task())
+
+    def test_failures_back_off_then_fail(self):
+        failing_task.delay()
+        delays = []
+        for _ in range(3):
+            Task.objects.update(run_at=timezone.now())
+            before = timezone.now()
+            with self.assertLogs('blog.queue', 'WARNING'):
+                self.assertFalse(run_task(claim_next_task()))
+            row = Task.objects.get()
+            delays.append(round((row.run_at - before).total_seconds()))
+        self.assertEqual(delays[:2], [10, 20])
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 3))
+        self.assertIn('boom', row.last_error)
+        self.assertIsNone(claim_next_task())
+
+    def test_stale_tasks_are_requeued_or_failed(self):
+        now = timezone.now()
+        lost_at = now - timedelta(minutes=20)
+        retry = Task.objects.create(name='blog.tests.noop', run_at=lost_at, status=Task.RUNNING,
+                                    attempts=1, started_at=lost_at, heartbeat_at=lost_at)
+        exhausted = Task.objects.create(name='blog.tests.noop', run_at=lost_at, status=Task.RUNNING,
+                                        attempts=3, started_at=lost_at, heartbeat_at=lost_at)
+        long_running = Task.objects.create(name='blog.tests.noop', run_at=lost_at, status=Task.RUNNING,
+                                           attempts=1, started_at=lost_at, heartbeat_at=now)
+        with self.assertLogs('blog.queue', 'WARNING'):
+            self.assertEqual(requeue_stale_tasks(600), 2)
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        long_running.refresh_from_db()
+        self.assertEqual(retry.status, Task.QUEUED)
+        self.assertGreater(retry.run_at, now)
+        self.assertEqual(exhausted.status, Task.FAILED)
+        self.assertIn('Worker lost', exhausted.last_error)
+        self.assertEqual(long_running.status, Task.RUNNING)
+
+
+class TaskHeartbeatTests(TransactionTestCase):
+    """A running task's heartbeat is refreshed from a background thread."""
+
+    def test_heartbeat_advances_while_the_task_runs(self):
+        started = timezone.now() - timedelta(minutes=20)
+        row = Task.objects.create(name='blog.tests.noop', run_at=started, status=Task.RUNNING,
+                                  attempts=1, started_at=started, heartbeat_at=started)
+        with Heartbeat(row.pk, interval=0.02):
+            time.sleep(0.2)
+        row.refresh_from_db()
+        self.assertGreater(row.heartbeat_at, started + timedelta(minutes=19))
+        self.assertEqual(requeue_stale_tasks(600), 0)
+
+
+@override_settings(BLOG_TASKS_EAGER=False)
+class RelatedPostRefreshTests(TestCase):
+    """Tag changes queue one batched related-post refresh instead of running it inline."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('author', password='pass')
+        self.tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='Content', author=self.user)
+            for i in range(3)
+        ]
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).values_list('related__title', 'score'))
+
+    def test_tag_changes_are_queued(self):
+        first, second, third = self.posts
+        first.tags.add(*self.tags)
+        second.tags.add(self.tags[0], self.tags[1])
+        third.tags.add(self.tags[2])
+        self.assertEqual(self.related(first), [])
+        work(once=True)
+        self.assertEqual(self.related(first), [('Post 1', 2), ('Post 2', 1)])
+        self.assertEqual(self.related(third), [('Post 0', 1)])
+
+        self.tags[2].posts.remove(third)
+        second.delete()
+        work(once=True)
+        self.assertEqual(self.related(first), [])
+        self.assertEqual(self.related(third), [])
+
+    def test_refresh_query_count_does_not_grow_with_posts(self):
+        for post in self.posts:
+            Post.tags.through.objects.create(post=post, tag=self.tags[0])
+        with self.assertNumQueries(5) as few:
+            refresh_related_posts([post.pk for post in self.posts])
+        more = [
+            Post.objects.create(title=f'More {i}', content='Content', author=self.user)
+            for i in range(20)
+        ]
+        Post.tags.through.objects.bulk_create(
+            [Post.tags.through(post=post, tag=self.tags[0]) for post in more]
+        )
+        with self.assertNumQueries(len(few.captured_queries)):
+            refresh_related_posts([post.pk for post in self.posts + more])
+        self.assertEqual(RelatedPost.objects.filter(post=self.posts[0]).count(), 5)
+
+
+@override_settings(BLOG_SITE_URL='https://blog.example.com/')
+class CommentDigestTests(TestCase):
+    """Digests link to the site absolutely and work through backlogs in bounded runs."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', email='author@example.com', password='pass')
+        self.reader = User.objects.create_user('reader', password='pass')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', content='Content', author=self.author)
+            for i in range(3)
+        ]
+        self.later = timezone.now() + timedelta(minutes=1)
+
+    def comment(self, post):
+        return Comment.objects.create(post=post, author=self.reader, content='A comment')
+
+    def test_digest_links_are_absolute(self):
+        self.comment(self.posts[0])
+        self.assertEqual(send_comment_digests(self.later), 1)
+        url = 'https://blog.example.com' + reverse('post_detail', args=[self.posts[0].pk])
+        self.assertIn(url, mail.outbox[0].body)
+
+    @override_settings(BLOG_COMMENT_DIGEST_MAX_COMMENTS=4)
+    def test_runs_are_limited_and_batches_advance_the_cursor(self):
+        for post in self.posts * 3:
+            self.comment(post)
+        with mock.patch('blog.notifications.BATCH_SIZE', 2):
+            self.assertEqual(send_comment_digests(self.later), 4)
+            # Two batches of two comments, each recorded before the next one
+            self.assertEqual(sum(CommentDigest.objects.values_list('comment_count', flat=True)), 4)
+            self.assertEqual(
+                CommentDigest.objects.order_by('-last_comment_id').first().last_comment_id,
+                Comment.objects.order_by('pk')[3].pk,
+            )
+            # The remaining five comments: four (two batches of two posts), then one
+            self.assertEqual(send_comment_digests(self.later), 4)
+            self.assertEqual(send_comment_digests(self.later), 1)
+            self.assertEqual(send_comment_digests(self.later), 0)
+        self.assertEqual(sum(CommentDigest.objects.values_list('comment_count', flat=True)), 9)
+
+    def test_failed_send_records_nothing(self):
+        self.comment(self.posts[0])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError('SMTP down')):
+            with self.assertRaises(ConnectionError):
+                send_comment_digests(self.later)
+        self.assertFalse(CommentDigest.objects.exists())
+        # The next run sends the batch that failed
+        self.assertEqual(send_comment_digests(self.later), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_locked_run_sends_nothing(self):
+        self.comment(self.posts[0])
+        locked = mock.Mock()
+        locked.get.side_effect = OperationalError('could not obtain lock on row')
+        with mock.patch.object(JobLock.objects, 'select_for_update', return_value=locked):
+            self.assertEqual(send_comment_digests(self.later), 0)
+        locked.get.assert_called_once_with(name='comment_digests')
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(CommentDigest.objects.exists())
+
+
+class PostActivityTests(TestCase):
+    """Comment receivers keep Post's counters current; the backfill recomputes them."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass')
+        self.post = Post.objects.create(title='Post', content='Content', author=self.author)
+
+    def comment(self, post=None):
+        return Comment.objects.create(post=post or self.post, author=self.author, content='A comment')
+
+    def test_comments_are_counted_and_uncounted(self):
+        first, second = self.comment(), self.comment()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.last_activity_at, second.updated_at)
+        first.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_last_activity_never_moves_back(self):
+        comment = self.comment()
+        Post.objects.filter(pk=self.post.pk).update(last_activity_at=comment.updated_at + timedelta(days=1))
+        comment.content = 'Edited'
+        comment.save()
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.last_activity_at, comment.updated_at)
+
+    def test_deleting_a_post_does_not_uncount_its_comments(self):
+        for _ in range(5):
+            self.comment()
+        other = Post.objects.create(title='Other', content='Content', author=self.author)
+        self.comment(other)
+        for delete in (self.post.delete, Post.objects.filter(pk=other.pk).delete):
+            with CaptureQueriesContext(connection) as queries:
+                delete()
+            counter_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "blog_post"')]
+            self.assertEqual(counter_updates, [])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_deleting_a_user_uncounts_their_comments_on_other_posts(self):
+        reader = User.objects.create_user('reader', password='pass')
+        Comment.objects.create(post=self.post, author=reader, content='A comment')
+        reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_backfill_recomputes_counters(self):
+        others = [Post.objects.create(title=f'Post {i}', content='Content', author=self.author) for i in range(3)]
+        comments = [self.comment(), self.comment(), self.comment(others[0])]
+        Post.objects.update(comment_count=42, last_activity_at=timezone.now() - timedelta(days=30))
+        out = StringIO()
+        call_command('backfill_post_activity', batch_size=2, stdout=out)
+        self.assertIn('Updated 4 post(s).', out.getvalue())
+        counts = dict(Post.objects.values_list('pk', 'comment_count'))
+        self.assertEqual(counts, {self.post.pk: 2, others[0].pk: 1, others[1].pk: 0, others[2].pk: 0})
+        self.post.refresh_from_db()
+        others[1].refresh_from_db()
+        self.assertEqual(self.post.last_activity_at, comments[1].updated_at)
+        self.assertEqual(others[1].last_activity_at, others[1].published_date)
+
+
+class TagAutocompleteTests(TestCase):
+    """Tag suggestions are keyset-paginated by name."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.bulk_create([Tag(name=f'django{i:02d}') for i in range(45)] + [Tag(name='python')])
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or reverse('tag_autocomplete'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_continue_without_gaps_or_repeats(self):
+        page = self.get(q='Django')
+        names = [tag['name'] for tag in page['results']]
+        pages = 1
+        while page['next']:
+            page = self.get(page['next'])
+            names += [tag['name'] for tag in page['results']]
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(names, [f'django{i:02d}' for i in range(45)])
+
+    def test_last_page_has_no_next(self):
+        page = self.get(q='django', after='django39')
+        self.assertEqual([tag['name'] for tag in page['results']], [f'django{i}' for i in range(40, 45)])
+        self.assertIsNone(page['next'])
+        # A page that is exactly full has no next link either
+        page = self.get(q='django', after='django24')
+        self.assertEqual(len(page['results']), 20)
+        self.assertIsNone(page['next'])
+
+    def test_cursor_need_not_be_an_existing_tag(self):
+        page = self.get(after='django44x')
+        self.assertEqual([tag['name'] for tag in page['results']], ['python'])
+        self.assertEqual(self.get(after='zzz'), {'results': [], 'next': None})
+
+    def test_invalid_cursor_is_rejected(self):
+        url = reverse('tag_autocomplete')
+        for params in ({'after': 'x' * 51}, {'after': 'django\x00'}, {'q': 'dj\x00'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid query.'})
+
+
+class PostFormTagsTests(TestCase):
+    """tags_input is parsed into a list of lowercase, de-duplicated names."""
+
+    def clean(self, tags_input):
+        form = PostForm(data={'title': 'Post', 'content': 'Content', 'tags_input': tags_input})
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.cleaned_data['tags_input']
+
+    def test_names_are_split_trimmed_and_lowercased(self):
+        self.assertEqual(self.clean(' Django,python ,, Web-Development , '), ['django', 'python', 'web-development'])
+
+    def test_duplicates_keep_first_position(self):
+        self.assertEqual(self.clean('python, Django, PYTHON, django'), ['python', 'django'])
+
+    def test_empty_input_means_no_tags(self):
+        self.assertEqual(self.clean(''), [])
+        self.assertEqual(self.clean(' , ,'), [])
+
+    def test_length_limits(self):
+        for tags_input, message in (('ok, x', 'too short'), ('ok, ' + 'x' * 51, 'too long')):
+            with self.subTest(tags_input=tags_input):
+                form = PostForm(data={'title': 'Post', 'content': 'Content', 'tags_input': tags_input})
+                self.assertFalse(form.is_valid())
+                self.assertIn(message, form.errors['tags_input'][0])
+
+
+@override_settings(BLOG_TASKS_EAGER=False)
+class PostEditConflictTests(TestCase):
+    """Saving a post edited by someone else since the form was loaded writes nothing."""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pass')
+        self.post = Post.objects.create(title='Original', content='Content', author=self.author)
+        self.url = reverse('post_update', args=[self.post.pk])
+        self.client.force_login(self.author)
+
+    def submit(self, version, title='Mine'):
+        return self.client.post(self.url, {'title': title, 'content': 'My content', 'tags_input': 'django',
+                                           'version': version})
+
+    def test_stale_version_conflicts(self):
+        self.assertEqual(self.client.get(self.url).context['form']['version'].value(), 1)
+        # Someone else saves first
+        self.assertEqual(self.submit(1, title='Theirs').status_code, 302)
+        Task.objects.all().delete()
+
+        response = self.submit(1)
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'changed by someone else', status_code=409)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.version), ('Theirs', 2))
+        # No tag update was queued either
+        self.assertFalse(Task.objects.exists())
+        # The form now carries the current version and keeps the submitted text
+        form = response.context['form']
+        self.assertEqual((form['version'].value(), form['title'].value()), (2, 'Mine'))
+
+        self.assertEqual(self.submit(2).status_code, 302)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.version), ('Mine', 3))
+
+
+class ObjectPermissionTests(TestCase):
+    """Owner-only views load their object once and refuse everyone else."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='pass')
+        self.other = User.objects.create_user('other', password='pass')
+        self.post = Post.objects.create(title='Post', content='Content', author=self.owner)
+        self.comment = Comment.objects.create(post=self.post, author=self.owner, content='A comment')
+        self.views = [
+            ('post_update', self.post, {'title': 'Edited', 'content': 'Edited', 'version': 1}),
+            ('post_delete', self.post, {}),
+            ('comment_update', self.comment, {'content': 'Edited'}),
+            ('comment_delete', self.comment, {}),
+        ]
+
+    def object_queries(self, obj, queries):
+        table = obj._meta.db_table
+        where = f'WHERE "{table}"."id" = {obj.pk}'
+        return [q['sql'] for q in queries if q['sql'].startswith('SELECT') and f'FROM "{table}"' in q['sql']
+                and where in q['sql']]
+
+    def test_owner_gets_the_object_in_one_query(self):
+        self.client.force_login(self.owner)
+        for name, obj, _ in self.views:
+            with self.subTest(name), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name, args=[obj.pk]))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['object'], obj)
+            self.assertEqual(len(self.object_queries(obj, queries)), 1)
+
+    def test_non_owner_is_forbidden(self):
+        self.client.force_login(self.other)
+        for name, obj, data in self.views:
+            url = reverse(name, args=[obj.pk])
+            with self.subTest(name):
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.client.get(url).status_code, 403)
+                self.assertEqual(len(self.object_queries(obj, queries)), 1)
+                self.assertEqual(self.client.post(url, data).status_code, 403)
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.post.title, self.comment.content), ('Post', 'A comment'))
+
+    def test_anonymous_users_are_sent_to_login(self):
+        for name, obj, data in self.views:
+            with self.subTest(name):
+                response = self.client.post(reverse(name, args=[obj.pk]), data)
+                self.assertEqual(response.status_code, 302)
+                self.assertIn(settings.LOGIN_URL, response['Location'])
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_missing_object_is_not_found(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('post_update', args=[0])).status_code, 404)
@@ -1,5 +1,6 @@
+from django.contrib.sitemaps.views import sitemap
 from django.urls import path
-from . import views
+from . import feeds, views
 
 urlpatterns = [
     # Blog post CRUD operations
@@ -18,6 +19,14 @@ urlpatterns = [
     # Tag and Search operations
     path('tags/<str:tag_name>/', views.TagPostListView.as_view(), name='tag_posts'),
     path('search/', views.search_posts, name='search_posts'),
+    path('tags/autocomplete.json', views.tag_autocomplete, name='tag_autocomplete'),
+
+    # Feeds and sitemap
+    path('feeds/rss/', feeds.cached_feed(feeds.LatestPostsFeed()), name='post_feed_rss'),
+    path('feeds/atom/', feeds.cached_feed(feeds.LatestPostsAtomFeed()), name='post_feed_atom'),
+    path('tags/<str:tag_name>/feed/rss/', feeds.cached_feed(feeds.TagPostsFeed()), name='tag_feed_rss'),
+    path('tags/<str:tag_name>/feed/atom/', feeds.cached_feed(feeds.TagPostsAtomFeed()), name='tag_feed_atom'),
+    path('sitemap.xml', feeds.cached_feed(sitemap), {'sitemaps': feeds.sitemaps}, name='sitemap'),
     
     # Authentication
     path('register/', views.register, name='register'),
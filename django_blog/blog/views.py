@@ -2,20 +2,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy, reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.db.models import Q
-from .models import Post, Comment, Tag
+from .models import Post, Comment, Tag, RelatedPost
 from .forms import CustomUserCreationForm, UserProfileForm, PostForm, CommentForm
+from .concurrency import VersionConflict
+from .conditional import post_detail_etag, post_collection_etag
+from .permissions import OwnerRequiredMixin
+from .routers import read_from_replica
+from . import flash
 
+TAG_AUTOCOMPLETE_PAGE_SIZE = 20
 
+
+@method_decorator(read_from_replica, name='dispatch')
+@method_decorator(condition(etag_func=post_collection_etag), name='get')
 class PostListView(ListView):
     """
     View to display a list of all blog posts with search functionality.
     Accessible to all users (no authentication required).
+    Reads are served by a replica when one is configured.
+    Supports conditional GET via a collection-level ETag.
     """
     model = Post
     template_name = 'blog/post_list.html'
@@ -23,6 +37,12 @@ class PostListView(ListView):
     ordering = ['-published_date']
     paginate_by = 10
     
+    def get_ordering(self):
+        """Sort by latest activity with ?sort=active (uses the last_activity_at index)."""
+        if self.request.GET.get('sort') == 'active':
+            return ['-last_activity_at', '-pk']
+        return super().get_ordering()
+    
     def get_queryset(self):
         """Filter posts based on search query."""
         queryset = super().get_queryset()
@@ -39,14 +59,17 @@ class PostListView(ListView):
         """Add search query and tags to context."""
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get('q', '')
+        context['sort'] = self.request.GET.get('sort', '')
         context['all_tags'] = Tag.objects.all().order_by('name')
         return context
 
 
+@method_decorator(condition(etag_func=post_detail_etag), name='get')
 class PostDetailView(DetailView):
     """
     View to display a single blog post in detail with comments.
     Accessible to all users (no authentication required).
+    Supports conditional GET via an ETag derived from the post and its comments.
     """
     model = Post
     template_name = 'blog/post_detail.html'
@@ -57,6 +80,11 @@ class PostDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         # Get all comments for this post
         context['comments'] = self.object.comments.all().order_by('created_at')
+        # Precomputed related posts: one lookup on the (post, rank) index
+        context['related_posts'] = [
+            entry.related
+            for entry in RelatedPost.objects.filter(post=self.object).select_related('related')
+        ]
         # Add comment form for authenticated users
         if self.request.user.is_authenticated:
             context['comment_form'] = CommentForm()
@@ -80,7 +108,7 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class PostUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
     """
     View to edit an existing blog post.
     Only the author of the post can edit it.
@@ -90,31 +118,40 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'blog/post_form.html'
     success_url = reverse_lazy('post_list')
     
-    def test_func(self):
-        """Check if the current user is the author of the post."""
-        post = self.get_object()
-        return self.request.user == post.author
-    
     def form_valid(self, form):
-        """Display success message after updating."""
+        """
+        Save the post and display a success message.
+
+        If someone else saved the post after this form was loaded, nothing is
+        written: the form is shown again with the submitted text and status
+        409. It now carries the current version, so saving again deliberately
+        replaces the other changes.
+        """
+        try:
+            self.object = form.save()
+        except VersionConflict:
+            data = form.data.copy()
+            data[form.add_prefix('version')] = Post.objects.filter(pk=self.object.pk).values_list(
+                'version', flat=True).get()
+            form = self.get_form_class()(data=data, instance=self.object)
+            form.is_valid()
+            form.add_error(None, 'This post was changed by someone else while you were editing it. '
+                                 'Saving again will replace their changes.')
+            return self.render_to_response(self.get_context_data(form=form), status=409)
         messages.success(self.request, 'Blog post updated successfully!')
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
 
-class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class PostDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
     """
     View to delete a blog post.
     Only the author of the post can delete it.
     """
     model = Post
+    queryset = Post.objects.select_related('author')
     template_name = 'blog/post_confirm_delete.html'
     success_url = reverse_lazy('post_list')
     
-    def test_func(self):
-        """Check if the current user is the author of the post."""
-        post = self.get_object()
-        return self.request.user == post.author
-    
     def delete(self, request, *args, **kwargs):
         """Display success message after deletion."""
         messages.success(request, 'Blog post deleted successfully!')
@@ -233,20 +270,16 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
-class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class CommentUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
     """
     View to edit an existing comment.
     Only the comment author can edit it.
     """
     model = Comment
+    queryset = Comment.objects.select_related('post__author')
     form_class = CommentForm
     template_name = 'blog/edit_comment.html'
     
-    def test_func(self):
-        """Check if the current user is the author of the comment."""
-        comment = self.get_object()
-        return self.request.user == comment.author
-    
     def form_valid(self, form):
         """Display success message after updating."""
         messages.success(self.request, 'Comment updated successfully!')
@@ -254,22 +287,18 @@ class CommentUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     
     def get_success_url(self):
         """Redirect to the post detail page after updating comment."""
-        return reverse('post_detail', kwargs={'pk': self.object.post.pk})
+        return reverse('post_detail', kwargs={'pk': self.object.post_id})
 
 
-class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
+class CommentDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
     """
     View to delete a comment.
     Only the comment author can delete it.
     """
     model = Comment
+    queryset = Comment.objects.select_related('author', 'post')
     template_name = 'blog/delete_comment.html'
     
-    def test_func(self):
-        """Check if the current user is the author of the comment."""
-        comment = self.get_object()
-        return self.request.user == comment.author
-    
     def delete(self, request, *args, **kwargs):
         """Display success message after deletion."""
         messages.success(request, 'Comment deleted successfully!')
@@ -277,7 +306,7 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     
     def get_success_url(self):
         """Redirect to the post detail page after deleting comment."""
-        return reverse('post_detail', kwargs={'pk': self.object.post.pk})
+        return reverse('post_detail', kwargs={'pk': self.object.post_id})
 
 
 @login_required
@@ -307,10 +336,12 @@ def add_comment(request, post_id):
 
 # Tag and Search Views
 
+@method_decorator(condition(etag_func=post_collection_etag), name='get')
 class TagPostListView(ListView):
     """
     View to display posts filtered by a specific tag.
     Accessible to all users (no authentication required).
+    Supports conditional GET via a collection-level ETag.
     """
     model = Post
     template_name = 'blog/tag_posts.html'
@@ -330,10 +361,12 @@ class TagPostListView(ListView):
         return context
 
 
+@read_from_replica
 def search_posts(request):
     """
     Function-based view for advanced search functionality.
     Allows searching by title, content, tags, and author.
+    Reads are served by a replica when one is configured.
     """
     query = request.GET.get('q', '')
     posts = []
@@ -348,14 +381,53 @@ def search_posts(request):
             Q(author__username__icontains=query)
         ).distinct().order_by('-published_date')
         
-        # Add search result count to messages
+        # Show the result count in this render only; persisting it through
+        # django.contrib.messages would cost a cookie/session write per search
         if posts:
-            messages.info(request, f'Found {posts.count()} post(s) matching "{query}"')
+            flash.info(request, f'Found {posts.count()} post(s) matching "{query}"')
         else:
-            messages.warning(request, f'No posts found matching "{query}"')
+            flash.warning(request, f'No posts found matching "{query}"')
     
     return render(request, 'blog/search_results.html', {
         'posts': posts,
         'query': query,
         'all_tags': all_tags
     })
+
+
+@require_GET
+@read_from_replica
+@cache_control(max_age=60)
+def tag_autocomplete(request):
+    """
+    JSON tag suggestions for the post form's tags input.
+
+    Returns tags whose name starts with ``?q=``, ordered by name. Tag names are
+    stored lowercase, so the case-sensitive prefix match can use the index on
+    ``name`` (on PostgreSQL Django adds a ``varchar_pattern_ops`` index for it).
+    Pages are keyset-paginated: ``next`` continues after the last name
+    returned (``?after=``) instead of using an offset, so every page is one
+    index range scan however deep it is.
+
+    Response: ``{"results": [{"id": 1, "name": "django"}, ...], "next": url or null}``;
+    an ``after`` longer than a tag name, or a NUL character in either
+    parameter, gets a 400.
+    """
+    prefix = request.GET.get('q', '').strip().lower()
+    after = request.GET.get('after', '')
+    max_length = Tag._meta.get_field('name').max_length
+    if len(after) > max_length or '\x00' in after or '\x00' in prefix:
+        return JsonResponse({'error': 'Invalid query.'}, status=400)
+    tags = Tag.objects.order_by('name')
+    if prefix:
+        tags = tags.filter(name__startswith=prefix)
+    if after:
+        tags = tags.filter(name__gt=after)
+    results = list(tags.values('id', 'name')[:TAG_AUTOCOMPLETE_PAGE_SIZE + 1])
+    next_url = None
+    if len(results) > TAG_AUTOCOMPLETE_PAGE_SIZE:
+        results = results[:TAG_AUTOCOMPLETE_PAGE_SIZE]
+        query = request.GET.copy()
+        query['after'] = results[-1]['name']
+        next_url = f"{request.path}?{query.urlencode()}"
+    return JsonResponse({'results': results, 'next': next_url})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,17 +38,22 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'blog',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves collectstatic output (hashed + pre-compressed) with far-future caching
+    'blog.middleware.StaticFilesMiddleware',
+    'blog.middleware.SessionWriteMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.PrimaryPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'django_blog.urls'
@@ -63,6 +69,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.inline_messages',
             ],
         },
     },
@@ -74,16 +81,143 @@ WSGI_APPLICATION = 'django_blog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'django_blog',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'localhost',
-        'PORT': '5432',
+# Connection handling is configured through environment variables:
+#   DJANGO_DB_ENGINE          'postgresql' (default) or 'sqlite' as a local stand-in
+#   DJANGO_DB_CONN_MAX_AGE    seconds to keep a connection open between requests
+#   DJANGO_DB_HEALTH_CHECKS   '1' to verify reused connections before each request
+#   DJANGO_DB_POOL_MAX_SIZE   > 0 enables psycopg 3's connection pool (PostgreSQL only)
+#   DJANGO_DB_POOL_MIN_SIZE   connections the pool keeps open when idle
+#   DJANGO_DB_POOL_TIMEOUT    seconds a request may wait for a pooled connection
+#   DJANGO_DB_REPLICAS        comma-separated read replicas: hosts (host or host:port)
+#                             for PostgreSQL, database files for SQLite
+# Pool and connection metrics are reported by `python manage.py dbstats`.
+
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'postgresql')
+DB_CONN_MAX_AGE = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '60'))
+DB_HEALTH_CHECKS = os.environ.get('DJANGO_DB_HEALTH_CHECKS', '1') == '1'
+DB_POOL_MAX_SIZE = int(os.environ.get('DJANGO_DB_POOL_MAX_SIZE', '0'))
+DB_POOL_MIN_SIZE = int(os.environ.get('DJANGO_DB_POOL_MIN_SIZE', '2'))
+DB_POOL_TIMEOUT = float(os.environ.get('DJANGO_DB_POOL_TIMEOUT', '10'))
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_HEALTH_CHECKS,
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': 'django_blog',
+            'USER': 'postgres',
+            'PASSWORD': 'postgres',
+            'HOST': 'localhost',
+            'PORT': '5432',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_HEALTH_CHECKS,
+        }
+    }
+    if DB_POOL_MAX_SIZE > 0:
+        # The pool replaces persistent connections; Django requires CONN_MAX_AGE = 0.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': DB_POOL_TIMEOUT,
+            },
+        }
+
+# Read replicas get a copy of the primary's settings with their own host (or
+# file). Reads from views decorated with blog.routers.read_from_replica are
+# spread across them; writes always go to 'default'. Test runs mirror the
+# replicas onto the test database.
+REPLICA_DATABASES = []
+for _index, _replica in enumerate(
+    filter(None, (name.strip() for name in os.environ.get('DJANGO_DB_REPLICAS', '').split(','))),
+    start=1,
+):
+    _alias = f'replica{_index}'
+    DATABASES[_alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DB_ENGINE == 'sqlite':
+        DATABASES[_alias]['NAME'] = BASE_DIR / _replica
+    else:
+        _host, _, _port = _replica.partition(':')
+        DATABASES[_alias]['HOST'] = _host
+        DATABASES[_alias]['PORT'] = _port or DATABASES['default']['PORT']
+    REPLICA_DATABASES.append(_alias)
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# Seconds a client's reads stay on the primary after it makes a write request.
+REPLICA_PIN_SECONDS = 10
+
+
+# Sessions
+# DJANGO_SESSION_ENGINE selects where sessions live: 'db' (default), 'cache',
+# 'cached_db' or 'signed_cookies'. 'cache' and 'signed_cookies' take session
+# reads and writes off the database entirely; the cache modes need a cache
+# shared by all workers (see CACHES). Messages are stored in a cookie first
+# so that flashing a message does not write the session.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('DJANGO_SESSION_ENGINE', 'db')
+MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+# The 'metrics' cache holds the per-worker snapshots reported by
+# `manage.py dbstats` (see blog/metrics.py) and must be readable by all
+# processes: Redis when configured, otherwise files under DJANGO_METRICS_DIR,
+# shared by the processes on one host. Each worker writes only its own key.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        },
+        'metrics': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'metrics': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_METRICS_DIR', BASE_DIR / 'metrics'),
+        },
+    }
+BLOG_METRICS_CACHE = 'metrics'
+# Workers count in memory and publish a snapshot at most this often (seconds);
+# snapshots of workers that stop publishing expire after BLOG_METRICS_WORKER_TTL.
+BLOG_METRICS_FLUSH_INTERVAL = int(os.environ.get('DJANGO_METRICS_FLUSH_INTERVAL', '10'))
+BLOG_METRICS_WORKER_TTL = 300
+
+
+# Task queue
+# Deferred work is stored in the blog_task table and run by
+# `python manage.py run_tasks`. Set DJANGO_TASKS_EAGER=1 to run tasks inline
+# after commit instead (no worker needed, e.g. in development).
+BLOG_TASKS_EAGER = os.environ.get('DJANGO_TASKS_EAGER', '0') == '1'
+
+
+# Email
+# Comment notifications are batched into digests every
+# BLOG_COMMENT_DIGEST_WINDOW seconds (see blog/notifications.py), at most
+# BLOG_COMMENT_DIGEST_MAX_COMMENTS comments per run. Links in emails are
+# absolute, on BLOG_SITE_URL.
+# DJANGO_EMAIL_BACKEND: 'console' (default), 'filebased' (writes to
+# EMAIL_FILE_PATH) or 'smtp'.
+EMAIL_BACKEND = 'django.core.mail.backends.%s.EmailBackend' % os.environ.get('DJANGO_EMAIL_BACKEND', 'console')
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+DEFAULT_FROM_EMAIL = os.environ.get('DJANGO_DEFAULT_FROM_EMAIL', 'blog@localhost')
+BLOG_COMMENT_DIGEST_WINDOW = int(os.environ.get('DJANGO_COMMENT_DIGEST_WINDOW', 15 * 60))
+BLOG_COMMENT_DIGEST_MAX_COMMENTS = int(os.environ.get('DJANGO_COMMENT_DIGEST_MAX_COMMENTS', 5000))
+BLOG_SITE_URL = os.environ.get('DJANGO_SITE_URL', 'http://localhost:8000')
 
 
 # Password validation
@@ -124,6 +258,21 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+# Build step: `python manage.py collectstatic` fingerprints every file with a
+# content hash, writes staticfiles.json and pre-compresses text assets.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Without a manifest, {% static %} falls back to unhashed names only while
+# DEBUG is on; otherwise it raises (see blog.storage).
+BLOG_STATIC_MANIFEST_OPTIONAL = DEBUG
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'blog.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
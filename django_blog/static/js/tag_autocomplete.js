@@ -0,0 +1,48 @@
+// Tag suggestions for the post form.
+// Completes the last comma-separated term of the tags input from the
+// tag_autocomplete endpoint, one page of matches at a time.
+function initializeTagAutocomplete() {
+    const input = document.querySelector('input[list="tag-suggestions"]');
+    const datalist = document.getElementById('tag-suggestions');
+    if (!input || !datalist) {
+        return;
+    }
+    const url = input.dataset.autocompleteUrl;
+    let timer = null;
+    let controller = null;
+
+    function fetchSuggestions() {
+        const terms = input.value.split(',');
+        const prefix = terms.pop().trim();
+        if (!prefix) {
+            datalist.innerHTML = '';
+            return;
+        }
+        const entered = terms.map((term) => term.trim()).filter(Boolean);
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        fetch(`${url}?q=${encodeURIComponent(prefix)}`, {signal: controller.signal})
+            .then((response) => response.json())
+            .then((data) => {
+                datalist.innerHTML = '';
+                data.results
+                    .filter((tag) => !entered.includes(tag.name))
+                    .forEach((tag) => {
+                        // Each option is the whole input value with the last term completed
+                        const option = document.createElement('option');
+                        option.value = entered.concat(tag.name).join(', ');
+                        datalist.appendChild(option);
+                    });
+            })
+            .catch(() => {});
+    }
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(fetchSuggestions, 200);
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initializeTagAutocomplete);